@@ -1,12 +1,15 @@
 from django.contrib import admin
 from abilities.models import Ability, AbilityImage
+from utils.admin import PrevalidatedSaveAdminMixin
 
 
 @admin.register(Ability)
-class AbilityAdmin(admin.ModelAdmin):
+class AbilityAdmin(PrevalidatedSaveAdminMixin, admin.ModelAdmin):
     list_display = ("name", "character", "type", "energy_cost", "skill_point_cost")
     search_fields = ("name", "character__name")
     list_filter = ("type",)
 
 
-admin.site.register(AbilityImage)
+@admin.register(AbilityImage)
+class AbilityImageAdmin(PrevalidatedSaveAdminMixin, admin.ModelAdmin):
+    pass
@@ -1,45 +1,36 @@
-import os
-
 from django.db import models
 from django.db.models import Model
-from django.utils.text import slugify
 from rest_framework.exceptions import ValidationError
 
-from utils.mixins import HashedFileModelMixin, TimeStampedModelMixin
-from utils.model_utils import register_file_cleanup_signals
-
-
-def ability_main_image_path(instance, filename):
-    """Upload path for the main ability image (used in Ability model)"""
-    character_name = slugify(instance.character.name)
-    character_path = slugify(instance.character.path)
-    ability_type = slugify(instance.type)
-    extension = filename.split(".")[-1]
-    return os.path.join(
-        "characters",
-        character_path,
-        character_name,
-        "abilities",
-        f"{ability_type}.{extension}",
-    )
-
-
-def ability_image_path(instance, filename):
-    """Upload path for alternate ability images (used in AbilityImage model)"""
-    character_name = slugify(instance.ability.character.name)
-    ability_name = slugify(instance.ability.name)
-    ability_type = slugify(instance.ability.type)
-    image_type = instance.type
-    extension = filename.split(".")[-1]
-    return os.path.join(
-        "characters",
-        character_name,
-        "abilities",
-        f"{ability_type}-{ability_name}-{image_type}.{extension}",
-    )
-
-
-class Ability(TimeStampedModelMixin, Model):
+from utils.mixins import (
+    HashedFileModelMixin,
+    TimeStampedModelMixin,
+    TrackedFieldsModelMixin,
+    ValidatedModelMixin,
+)
+from characters.models import Character
+from utils.model_utils import (
+    register_catalog_version_signals,
+    register_file_cleanup_signals,
+)
+from utils.upload_paths import UploadPath
+
+ability_main_image_path = UploadPath(
+    "characters/{character.path}/{character.name}/abilities/{type}.{ext}"
+)
+
+ability_image_path = UploadPath(
+    "characters/{ability.character.name}/abilities/{ability.type}-{ability.name}-{type}.{ext}"
+)
+
+
+class Ability(
+    HashedFileModelMixin,
+    TrackedFieldsModelMixin,
+    ValidatedModelMixin,
+    TimeStampedModelMixin,
+    Model,
+):
     ABILITY_TYPES = [
         ("basic", "Basic Attack"),
         ("skill", "Skill"),
@@ -57,6 +48,9 @@ class Ability(TimeStampedModelMixin, Model):
         ("aoe", "Area of Effect"),
     ]
 
+    # Search entries are refreshed when these change
+    tracked_fields = ("name",)
+
     character = models.ForeignKey(
         "characters.Character", on_delete=models.CASCADE, related_name="abilities"
     )
@@ -64,6 +58,11 @@ class Ability(TimeStampedModelMixin, Model):
     image = models.ImageField(
         upload_to=ability_main_image_path, blank=True, null=True
     )  # Main ability image
+    image_hash = models.CharField(
+        max_length=64, blank=True, null=True, editable=False, db_index=True
+    )
+    # Width of the image for its srcset, recorded with the hash
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
     type = models.CharField(max_length=16, choices=ABILITY_TYPES)
     energy_cost = models.IntegerField(null=True, blank=True)  # For ultimates
     skill_point_cost = models.SmallIntegerField(null=True, blank=True)  # For skills
@@ -83,16 +82,23 @@ class Ability(TimeStampedModelMixin, Model):
         if self.type not in dict(self.ABILITY_TYPES):
             raise ValidationError(f"Invalid ability type: {self.type}")
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
-
     class Meta:
         verbose_name = "Ability"
         verbose_name_plural = "Abilities"
-
-
-class AbilityImage(TimeStampedModelMixin, Model):
+        unique_together = ("character", "name")
+        indexes = [
+            models.Index(fields=["type", "id"], name="ability_type_id_idx"),
+            models.Index(fields=["targeting", "id"], name="ability_targeting_id_idx"),
+        ]
+
+
+class AbilityImage(
+    HashedFileModelMixin,
+    TrackedFieldsModelMixin,
+    ValidatedModelMixin,
+    TimeStampedModelMixin,
+    Model,
+):
     IMAGE_TYPES = [
         ("basic", "Basic Attack"),
         ("skill", "Skill"),
@@ -105,15 +111,14 @@ class AbilityImage(TimeStampedModelMixin, Model):
         Ability, on_delete=models.CASCADE, related_name="images"
     )
     image = models.ImageField(upload_to=ability_image_path)
+    image_hash = models.CharField(
+        max_length=64, blank=True, null=True, editable=False, db_index=True
+    )
     type = models.CharField(max_length=16, choices=IMAGE_TYPES, default="basic")
 
     def __str__(self):
         return f"{self.ability.name} - {self.get_type_display()} Image"
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
-
     class Meta:
         verbose_name = "Ability Image"
         verbose_name_plural = "Ability Images"
@@ -121,3 +126,4 @@ class AbilityImage(TimeStampedModelMixin, Model):
 
 register_file_cleanup_signals(Ability, ["image"])
 register_file_cleanup_signals(AbilityImage, ["image"])
+register_catalog_version_signals(Ability, [Ability, Character])
@@ -1,8 +1,25 @@
 from rest_framework import serializers
 from abilities.models import Ability
+from utils.serializers import ImageSrcsetField
 
 
 class AbilitySerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source="image")
+
     class Meta:
         model = Ability
-        fields = ["name", "image", "type"]
+        fields = ["name", "image", "image_srcset", "type"]
+
+
+class AbilityDetailSerializer(AbilitySerializer):
+    class Meta(AbilitySerializer.Meta):
+        fields = [
+            "id",
+            "character",
+            *AbilitySerializer.Meta.fields,
+            "targeting",
+            "energy_cost",
+            "skill_point_cost",
+            "energy_regeneration",
+            "break_effect",
+        ]
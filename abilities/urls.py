@@ -1,6 +1,12 @@
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
 from abilities import views
 
+router = DefaultRouter()
+router.register(r"abilities", views.AbilityViewSet)
+
 urlpatterns = [
     path("", views.index, name="abilities-index"),
+    path("", include(router.urls)),
 ]
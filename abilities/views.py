@@ -1,5 +1,35 @@
 from django.shortcuts import render
+from rest_framework import viewsets
+from rest_framework.permissions import AllowAny, IsAdminUser
+
+from abilities.models import Ability
+from abilities.serializers import AbilityDetailSerializer
+from utils.views import (
+    CatalogCacheMixin,
+    ConditionalGetMixin,
+    PrefetchQuerysetMixin,
+    PrevalidatedSaveMixin,
+)
 
 
 def index(request):
     return render(request, "abilities/index.html", {})
+
+
+class AbilityViewSet(
+    ConditionalGetMixin,
+    CatalogCacheMixin,
+    PrefetchQuerysetMixin,
+    PrevalidatedSaveMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Ability.objects.all()
+    serializer_class = AbilityDetailSerializer
+    filter_fields = ("type", "targeting")
+
+    def get_permissions(self):
+        if self.action in ["create", "update", "partial_update", "destroy"]:
+            self.permission_classes = [IsAdminUser]
+        else:
+            self.permission_classes = [AllowAny]
+        return [permission() for permission in self.permission_classes]
@@ -0,0 +1,72 @@
+"""
+Benchmarks for the Silver Rail API.
+
+Each benchmark is a standalone script that runs against a throwaway test database,
+never the configured one:
+
+    python -m benchmarks.bench_pagination
+"""
+
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+
+@contextmanager
+def benchmark_database(settings_module="silverrail.test_settings"):
+    """
+    Set up Django and a throwaway test database for the duration of a benchmark.
+
+    Args:
+        settings_module (str): The settings module to benchmark against.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+
+    import django
+
+    django.setup()
+
+    from django.test.utils import (
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def measure(func, repeat=20, warmup=2):
+    """
+    Time a callable.
+
+    Args:
+        func (Callable): The callable to time.
+        repeat (int): How many timed runs to do.
+        warmup (int): How many untimed runs to do first.
+
+    Returns:
+        dict: The median, p99 and minimum run time in milliseconds.
+    """
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        "median": statistics.median(timings),
+        "p99": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        "min": timings[0],
+    }
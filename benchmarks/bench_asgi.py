@@ -0,0 +1,208 @@
+"""
+Throughput and latency of the read endpoints under WSGI and ASGI.
+
+Fills the catalog with teams and keeps 500 concurrent clients requesting pages of
+characters and team compositions, then reports requests per second and latency for:
+
+- the viewsets under WSGI, served by a pool of threads like a threaded server,
+- the viewsets under ASGI, where each request runs in a thread through sync_to_async,
+- the async views under ASGI.
+
+Responses aren't cached, every request reads the database. The applications are
+driven in-process through httpx transports. The in-memory test database answers
+without any I/O wait, ``--db-latency`` adds a delay to every query like the round trip
+to a database server:
+
+    python -m benchmarks.bench_asgi --clients 500 --seconds 10 --db-latency 2
+
+To load real servers started on the configured database instead, pass their URLs:
+
+    gunicorn silverrail.wsgi -k gthread --threads 32 -b :8000 &
+    uvicorn silverrail.asgi:application --port 8001 &
+    python -m benchmarks.bench_asgi --wsgi-url http://localhost:8000 \\
+        --asgi-url http://localhost:8001
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import benchmark_database
+
+ENDPOINTS = {
+    "characters": (
+        "/characters/characters/?page_size=50",
+        "/characters/async/characters/?page_size=50",
+    ),
+    "compositions": (
+        "/teams/compositions/?page_size=20",
+        "/teams/async/compositions/?page_size=20",
+    ),
+}
+
+
+def create_teams(count):
+    from abilities.models import Ability
+    from characters.models import Character
+    from lightcones.models import Lightcone
+    from relics.models import Relic
+    from teams.models import Team, TeamCharacter
+
+    relics = Relic.objects.bulk_create(
+        Relic(name=f"Relic {slot}", set_name="Thunder", slot=slot)
+        for slot in ("head", "hands", "body", "feet")
+    )
+    teams = Team.objects.bulk_create(Team(name=f"Team {i}") for i in range(count))
+    characters = Character.objects.bulk_create(
+        Character(name=f"Character {i}", type="fire", path="hunt", rarity=5)
+        for i in range(count * 4)
+    )
+    Ability.objects.bulk_create(
+        Ability(character=character, name=f"{kind} {i}", type=kind)
+        for i, character in enumerate(characters)
+        for kind in ("basic", "skill", "ultimate")
+    )
+    lightcones = Lightcone.objects.bulk_create(
+        Lightcone(name=f"Lightcone {i}", path="hunt", rarity=5, ability="Ability")
+        for i in range(count * 4)
+    )
+    members = TeamCharacter.objects.bulk_create(
+        TeamCharacter(team=teams[i // 4], character=character, lightcone=lightcone)
+        for i, (character, lightcone) in enumerate(zip(characters, lightcones))
+    )
+    TeamCharacter.relics.through.objects.bulk_create(
+        TeamCharacter.relics.through(teamcharacter=member, relic=relic)
+        for member in members
+        for relic in relics
+    )
+
+
+def add_query_latency(milliseconds):
+    """Sleep before every query of every new connection, releasing the GIL."""
+    from django.db.backends.signals import connection_created
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(milliseconds / 1000)
+        return execute(sql, params, many, context)
+
+    def add_wrapper(connection, **kwargs):
+        connection.execute_wrappers.append(delay)
+
+    connection_created.connect(add_wrapper, weak=False)
+
+
+async def load(get, url, clients, seconds):
+    """Keep ``clients`` requests in flight for ``seconds`` and time each of them."""
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await get(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies) / elapsed,
+        "median": latencies[len(latencies) // 2],
+        "p99": latencies[int(len(latencies) * 0.99)],
+        "errors": errors,
+    }
+
+
+def get_clients(args):
+    """Build an async ``get(url)`` for each server."""
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.clients)
+    timeout = httpx.Timeout(60)
+    if args.wsgi_url and args.asgi_url:
+        wsgi = httpx.AsyncClient(base_url=args.wsgi_url, limits=limits, timeout=timeout)
+        asgi = httpx.AsyncClient(base_url=args.asgi_url, limits=limits, timeout=timeout)
+        return wsgi.get, asgi.get
+
+    from django.core.asgi import get_asgi_application
+    from django.core.wsgi import get_wsgi_application
+
+    wsgi = httpx.Client(
+        transport=httpx.WSGITransport(app=get_wsgi_application()),
+        base_url="http://testserver",
+    )
+    pool = ThreadPoolExecutor(max_workers=args.threads)
+
+    async def wsgi_get(url):
+        return await asyncio.get_running_loop().run_in_executor(pool, wsgi.get, url)
+
+    asgi = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=get_asgi_application()),
+        base_url="http://testserver",
+        timeout=timeout,
+    )
+    return wsgi_get, asgi.get
+
+
+async def run(args):
+    wsgi_get, asgi_get = get_clients(args)
+
+    print(
+        f"{args.clients} clients, {args.seconds:g} s per run,"
+        f" {args.db_latency:g} ms query latency"
+    )
+    print(
+        f"{'':>13} {'':>16} {'requests/s':>11} {'median ms':>10}"
+        f" {'p99 ms':>8} {'errors':>7}"
+    )
+    for endpoint, (sync_url, async_url) in ENDPOINTS.items():
+        for label, get, url in (
+            ("wsgi viewset", wsgi_get, sync_url),
+            ("asgi viewset", asgi_get, sync_url),
+            ("asgi async view", asgi_get, async_url),
+        ):
+            result = await load(get, url, args.clients, args.seconds)
+            print(
+                f"{endpoint:>13} {label:>16} {result['requests']:>11.0f}"
+                f" {result['median']:>10.1f} {result['p99']:>8.1f}"
+                f" {result['errors']:>7}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--teams", type=int, default=500)
+    parser.add_argument(
+        "--threads", type=int, default=32, help="Threads serving WSGI in-process"
+    )
+    parser.add_argument(
+        "--db-latency", type=float, default=0, help="Milliseconds added to queries"
+    )
+    parser.add_argument("--wsgi-url", help="Base URL of a running WSGI server")
+    parser.add_argument("--asgi-url", help="Base URL of a running ASGI server")
+    args = parser.parse_args()
+
+    if args.wsgi_url and args.asgi_url:
+        asyncio.run(run(args))
+        return
+
+    from django.test import override_settings
+
+    with benchmark_database(), override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    ):
+        create_teams(args.teams)
+        if args.db_latency:
+            add_query_latency(args.db_latency)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Cost of autocompleting a prefix.
+
+Fills the catalog with generated names and times the in-process prefix index against
+the equivalent ``icontains`` queries on each model, and the cost of rebuilding the
+index of one kind after a change:
+
+    python -m benchmarks.bench_autocomplete --rows 100000
+"""
+
+import argparse
+
+from benchmarks import benchmark_database, measure
+from benchmarks.bench_search import create_catalog
+
+PREFIXES = ["k", "sil", "kafkver", "wo"]
+
+
+def run(rows):
+    from django.db.models import Q
+
+    from catalog.autocomplete import autocompleter
+    from catalog.search import SEARCH_MODELS
+
+    create_catalog(rows)
+
+    def complete_index(prefix):
+        return lambda: autocompleter.complete(prefix, limit=10)
+
+    def complete_icontains(prefix):
+        # A name starting with the prefix, or a later word starting with it
+        return lambda: [
+            list(
+                model.objects.filter(
+                    Q(**{f"{field}__istartswith": prefix})
+                    | Q(**{f"{field}__icontains": f" {prefix}"})
+                ).values_list("pk", field)[:10]
+            )
+            for model, field, _ in SEARCH_MODELS.values()
+        ]
+
+    timing = measure(lambda: (autocompleter.reset(), autocompleter.complete("k")), 3)
+    print(f"{rows} rows, building every index: {timing['median']:.1f} ms")
+    timing = measure(
+        lambda: (autocompleter.mark_stale("character"), autocompleter.complete("k")), 5
+    )
+    print(f"rebuilding one kind: {timing['median']:.1f} ms")
+
+    print(f"{'':>10} {'':>10} {'median us':>10} {'p99 us':>8}")
+    for prefix in PREFIXES:
+        for method, func in (
+            ("index", complete_index(prefix)),
+            ("icontains", complete_icontains(prefix)),
+        ):
+            timing = measure(func, repeat=200 if method == "index" else 20)
+            print(
+                f"{prefix:>10} {method:>10}"
+                f" {timing['median'] * 1000:>10.1f} {timing['p99'] * 1000:>8.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        run(args.rows)
+
+
+if __name__ == "__main__":
+    main()
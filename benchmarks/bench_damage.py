@@ -0,0 +1,47 @@
+"""
+Throughput of the damage engine on batches of candidate builds.
+
+Compares one vectorized call against evaluating each build on its own:
+
+    python -m benchmarks.bench_damage --builds 10000
+"""
+
+import argparse
+import os
+
+from benchmarks import measure
+
+
+def run(build_count):
+    import numpy as np
+
+    from stats.engine import STAT_COUNT, STAT_INDEX, evaluate_builds
+
+    rng = np.random.default_rng(0)
+    builds = rng.uniform(0, 1, size=(build_count, STAT_COUNT))
+    builds[:, STAT_INDEX["atk"]] *= 4000
+
+    batch = measure(lambda: evaluate_builds(builds, "fire", 2.0), repeat=10)
+    single = measure(
+        lambda: [evaluate_builds(build, "fire", 2.0) for build in builds], repeat=3
+    )
+    print(f"{build_count} builds")
+    print(f"  batch:    {batch['median']:10.3f} ms")
+    print(f"  per build:{single['median']:10.3f} ms")
+    print(f"  speedup:  {single['median'] / batch['median']:10.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--builds", type=int, default=10000)
+    args = parser.parse_args()
+
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "silverrail.test_settings")
+    django.setup()
+    run(args.builds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Memory and time of the catalog export as the catalog grows.
+
+Fills the catalog with characters, each with three abilities and a few stats, plus as
+many relics and lightcones, then reads the whole NDJSON export and reports its size,
+the time it took and the peak memory allocated while it ran, against serializing every
+character at once:
+
+    python -m benchmarks.bench_export --sizes 1000 5000 20000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from benchmarks import benchmark_database
+
+
+def fill_catalog(count):
+    from abilities.models import Ability
+    from characters.models import Character
+    from lightcones.models import Lightcone
+    from relics.models import Relic
+    from stats.storage import set_stats
+
+    Character.objects.all().delete()
+    Relic.objects.all().delete()
+    Lightcone.objects.all().delete()
+    characters = Character.objects.bulk_create(
+        Character(name=f"Character {i}", type="fire", path="hunt", rarity=5)
+        for i in range(count)
+    )
+    Ability.objects.bulk_create(
+        Ability(character=character, name=f"{kind} {i}", type=kind)
+        for i, character in enumerate(characters)
+        for kind in ("basic", "skill", "ultimate")
+    )
+    Relic.objects.bulk_create(
+        Relic(name=f"Relic {i}", set_name=f"Set {i}", slot="head", effect="." * 100)
+        for i in range(count)
+    )
+    Lightcone.objects.bulk_create(
+        Lightcone(name=f"Lightcone {i}", path="hunt", rarity=5, ability="." * 200)
+        for i in range(count)
+    )
+    set_stats({c: {"hp": 1000.0, "atk": 500.0, "spd": 100.0} for c in characters})
+
+
+def run(func):
+    """Run ``func`` and return its result, its time in ms and its peak memory in MiB."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    args = parser.parse_args()
+
+    with benchmark_database():
+        from catalog.export import iter_export
+        from catalog.serializers import ExportCharacterSerializer
+        from characters.models import Character
+
+        def stream():
+            return sum(len(chunk) for chunk in iter_export("ndjson"))
+
+        def at_once():
+            queryset = Character.objects.prefetch_related("abilities")
+            return len(ExportCharacterSerializer(queryset, many=True).data)
+
+        print(
+            f"{'objects':>8} {'export MB':>10} {'stream ms':>10} {'stream MiB':>11}"
+            f" {'at once ms':>11} {'at once MiB':>12}"
+        )
+        for size in args.sizes:
+            fill_catalog(size)
+            length, stream_ms, stream_peak = run(stream)
+            _, once_ms, once_peak = run(at_once)
+            print(
+                f"{size:>8} {length / 1e6:>10.1f} {stream_ms:>10.0f}"
+                f" {stream_peak:>11.1f} {once_ms:>11.0f} {once_peak:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Throughput of the game data importer.
+
+Generates a dump of characters with four abilities each plus relics and lightcones,
+then imports it into an empty database and again over the imported rows:
+
+    python -m benchmarks.bench_import --rows 10000
+"""
+
+import argparse
+import io
+import json
+import time
+
+from benchmarks import benchmark_database
+
+PATHS = ["destruction", "hunt", "erudition", "harmony", "nihility", "preservation"]
+TYPES = ["physical", "fire", "ice", "lightning", "wind", "quantum", "imaginary"]
+ABILITY_TYPES = ["basic", "skill", "ultimate", "talent"]
+SLOTS = ["head", "hands", "chest", "feet", "orb", "rope"]
+
+
+def generate_dump(row_count):
+    records = []
+    characters = row_count // 6
+    for i in range(characters):
+        name, path = f"Character {i}", PATHS[i % len(PATHS)]
+        records.append(
+            {
+                "model": "character",
+                "name": name,
+                "path": path,
+                "type": TYPES[i % len(TYPES)],
+                "rarity": 4 + i % 2,
+            }
+        )
+        records.extend(
+            {
+                "model": "ability",
+                "character": [name, path],
+                "name": f"{name} {ability_type}",
+                "type": ability_type,
+            }
+            for ability_type in ABILITY_TYPES
+        )
+    for i in range(row_count - len(records)):
+        if i % 2:
+            records.append(
+                {
+                    "model": "relic",
+                    "name": f"Relic {i}",
+                    "set_name": f"Set {i // len(SLOTS)}",
+                    "slot": SLOTS[i % len(SLOTS)],
+                }
+            )
+        else:
+            records.append(
+                {
+                    "model": "lightcone",
+                    "name": f"Lightcone {i}",
+                    "path": PATHS[i % len(PATHS)],
+                    "rarity": 4,
+                    "ability": "Increases ATK.",
+                }
+            )
+    return "\n".join(json.dumps(record) for record in records)
+
+
+def run(row_count, batch_size):
+    from utils.gamedata import GameDataImporter, iter_records
+
+    dump = generate_dump(row_count)
+    print(f"{row_count} records, batch size {batch_size}")
+    print(f"{'pass':>8} {'seconds':>8} {'rows/s':>8} {'errors':>7}")
+    for label in ("insert", "update"):
+        started = time.perf_counter()
+        importer = GameDataImporter(batch_size=batch_size).run(
+            iter_records(io.StringIO(dump))
+        )
+        elapsed = time.perf_counter() - started
+        print(
+            f"{label:>8} {elapsed:>8.2f} {importer.records / elapsed:>8.0f} "
+            f"{len(importer.errors):>7}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        run(args.rows, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
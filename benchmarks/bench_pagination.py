@@ -0,0 +1,88 @@
+"""
+Page latency of the team list as the teams table grows.
+
+Compares the keyset pagination used by the API against OFFSET pagination at the
+first, middle and last page of the table:
+
+    python -m benchmarks.bench_pagination --sizes 10000 100000 1000000
+"""
+
+import argparse
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks import benchmark_database, measure
+
+
+def insert_teams(count, batch_size=10000):
+    from teams.models import Team
+
+    existing = Team.objects.count()
+    for start in range(existing, count, batch_size):
+        Team.objects.bulk_create(
+            [
+                Team(name=f"Team {i}")
+                for i in range(start, min(start + batch_size, count))
+            ]
+        )
+
+
+def run(sizes, page_size):
+    from rest_framework.pagination import Cursor, LimitOffsetPagination
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from teams.models import Team
+    from teams.serializers import TeamSerializer
+    from utils.pagination import IdCursorPagination
+    from utils.views import optimize_queryset_for_serializer
+
+    factory = APIRequestFactory()
+    queryset = optimize_queryset_for_serializer(Team.objects.all(), TeamSerializer)
+
+    def get_page(paginator, params):
+        request = Request(factory.get("/teams/teams/", params))
+        page = paginator.paginate_queryset(queryset, request)
+        return TeamSerializer(page, many=True).data
+
+    def cursor_after(team_id):
+        # The same cursor a "next" link starting after team_id would carry
+        paginator = IdCursorPagination()
+        paginator.base_url = "/teams/teams/"
+        url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=team_id))
+        return parse_qs(urlparse(url).query)["cursor"][0]
+
+    print(f"{'rows':>9} {'page':>6} {'keyset ms':>10} {'offset ms':>10}")
+    for size in sizes:
+        insert_teams(size)
+        ids = Team.objects.order_by("id").values_list("id", flat=True)
+        for label, offset in (
+            ("first", 0),
+            ("middle", size // 2),
+            ("last", size - page_size),
+        ):
+            keyset_params = {"page_size": page_size}
+            if offset:
+                keyset_params["cursor"] = cursor_after(ids[offset - 1])
+            offset_params = {"limit": page_size, "offset": offset}
+
+            keyset = measure(lambda: get_page(IdCursorPagination(), keyset_params))
+            offset = measure(lambda: get_page(LimitOffsetPagination(), offset_params))
+            print(
+                f"{size:>9} {label:>6} {keyset['median']:>10.3f} {offset['median']:>10.3f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10000, 100000, 1000000]
+    )
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        run(sorted(args.sizes), args.page_size)
+
+
+if __name__ == "__main__":
+    main()
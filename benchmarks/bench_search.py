@@ -0,0 +1,129 @@
+"""
+Cost of catalog search.
+
+Fills the catalog with generated characters, abilities, relics and lightcones, and
+times the search index against ``icontains`` queries on each model for partial names,
+typos and effect text:
+
+    python -m benchmarks.bench_search --rows 100000
+"""
+
+import argparse
+import random
+
+from benchmarks import benchmark_database, measure
+
+SYLLABLES = [
+    "ka", "fk", "sil", "ver", "wo", "lf", "ach", "er", "on", "bla", "de",
+    "jing", "liu", "dan", "heng", "ru", "an", "mei", "hua", "yo", "sei", "ra",
+]  # fmt: skip
+
+QUERIES = {
+    "partial name": "silv",
+    "typo": "kafak",
+    "effect text": "lightning dmg",
+    "short prefix": "ka",
+}
+
+
+def make_name(rng, words=2):
+    return " ".join(
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).title()
+        for _ in range(words)
+    )
+
+
+def create_catalog(rows, seed=0):
+    from abilities.models import Ability
+    from catalog.search import rebuild_search_index
+    from characters.models import Character
+    from lightcones.models import Lightcone
+    from relics.models import Relic
+
+    rng = random.Random(seed)
+    count = rows // 4
+    characters = Character.objects.bulk_create(
+        Character(name=f"{make_name(rng)} {i}", type="fire", path="hunt", rarity=5)
+        for i in range(count)
+    )
+    Ability.objects.bulk_create(
+        Ability(character=characters[i], name=make_name(rng, 3), type="skill")
+        for i in range(count)
+    )
+    Relic.objects.bulk_create(
+        Relic(
+            name=make_name(rng, 3),
+            set_name=f"{make_name(rng)} {i}",
+            slot="head",
+            effect=f"Increases {rng.choice(['Lightning', 'Fire', 'Ice'])} DMG by 10%.",
+        )
+        for i in range(count)
+    )
+    Lightcone.objects.bulk_create(
+        Lightcone(
+            name=f"{make_name(rng, 3)} {i}",
+            path="hunt",
+            rarity=5,
+            ability="Increases the wearer's CRIT Rate by 18%.",
+        )
+        for i in range(count)
+    )
+    rebuild_search_index(batch_size=5000)
+
+
+def run(rows):
+    from django.db.models import Q
+
+    from abilities.models import Ability
+    from catalog.search import search
+    from characters.models import Character
+    from lightcones.models import Lightcone
+    from relics.models import Relic
+
+    create_catalog(rows)
+
+    def search_index(query):
+        return lambda: search(query, limit=20)
+
+    def search_icontains(query):
+        lookups = {
+            Character: Q(name__icontains=query),
+            Ability: Q(name__icontains=query),
+            Relic: Q(name__icontains=query)
+            | Q(set_name__icontains=query)
+            | Q(effect__icontains=query),
+            Lightcone: Q(name__icontains=query) | Q(ability__icontains=query),
+        }
+        return lambda: [
+            list(model.objects.filter(lookup).values_list("pk", "name")[:20])
+            for model, lookup in lookups.items()
+        ]
+
+    print(f"{rows} rows")
+    print(f"{'':>14} {'':>10} {'results':>8} {'median ms':>10} {'p99 ms':>8}")
+    for label, query in QUERIES.items():
+        for method, func in (
+            ("index", search_index(query)),
+            ("icontains", search_icontains(query)),
+        ):
+            results = func()
+            if method == "icontains":
+                results = [row for rows in results for row in rows]
+            timing = measure(func)
+            print(
+                f"{label:>14} {method:>10} {len(results):>8}"
+                f" {timing['median']:>10.2f} {timing['p99']:>8.2f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        run(args.rows)
+
+
+if __name__ == "__main__":
+    main()
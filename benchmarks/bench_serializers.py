@@ -0,0 +1,157 @@
+"""
+Time to read and render 1000 catalog objects with the serializers and with rows.
+
+For characters (each with three abilities), relics and lightcones, all with images,
+compares reading model instances and rendering them with the ``ModelSerializer`` and
+``JSONRenderer``, as the viewsets did, against reading ``values()`` rows and rendering
+them with a ``RowSerializer`` and ``render_json()``, with and without orjson.
+
+Images are served from the file system, or with ``--storage s3`` from an S3 storage
+with unsigned URLs like the MinIO and S3 profiles, without connecting to it:
+
+    python -m benchmarks.bench_serializers --objects 1000 --storage s3
+"""
+
+import argparse
+from unittest import mock
+
+from benchmarks import benchmark_database, measure
+
+STORAGES = {
+    "filesystem": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "s3": {
+        "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
+        "OPTIONS": {
+            "bucket_name": "silverrail",
+            "region_name": "us-east-1",
+            "access_key": "key",
+            "secret_key": "secret",
+            "endpoint_url": "http://localhost:9000",
+            "addressing_style": "path",
+            "custom_domain": None,
+            "querystring_auth": False,
+        },
+    },
+}
+
+
+def fill_catalog(count):
+    from abilities.models import Ability
+    from characters.models import Character
+    from lightcones.models import Lightcone
+    from relics.models import Relic
+
+    characters = Character.objects.bulk_create(
+        Character(
+            name=f"Character {i}",
+            image=f"characters/hunt/character-{i}/main.png",
+            type="fire",
+            path="hunt",
+            rarity=5,
+        )
+        for i in range(count)
+    )
+    Ability.objects.bulk_create(
+        Ability(
+            character=character,
+            name=f"{kind} {i}",
+            image=f"abilities/character-{i}/{kind}.png",
+            type=kind,
+        )
+        for i, character in enumerate(characters)
+        for kind in ("basic", "skill", "ultimate")
+    )
+    Relic.objects.bulk_create(
+        Relic(
+            name=f"Relic {i}",
+            image=f"relics/set-{i}/head.png",
+            set_name=f"Set {i}",
+            slot="head",
+            effect="Increases Lightning DMG by 10%.",
+        )
+        for i in range(count)
+    )
+    Lightcone.objects.bulk_create(
+        Lightcone(
+            name=f"Lightcone {i}",
+            image=f"lightcones/hunt/lightcone-{i}.png",
+            path="hunt",
+            rarity=5,
+            ability="Increases DMG dealt by the wearer by 24%.",
+        )
+        for i in range(count)
+    )
+
+
+def run(count, repeat):
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from characters.serializers import CharacterSerializer
+    from lightcones.serializers import LightconeSerializer
+    from relics.serializers import RelicSerializer
+    from utils import serializers
+    from utils.serializers import RowSerializer, render_json
+    from utils.views import optimize_queryset_for_serializer
+
+    request = Request(APIRequestFactory().get("/"))
+    context = {"request": request}
+
+    def render_serializer(serializer_class):
+        queryset = optimize_queryset_for_serializer(
+            serializer_class.Meta.model.objects.all(), serializer_class
+        )
+        data = serializer_class(queryset, many=True, context=context).data
+        return JSONRenderer().render(data)
+
+    def render_rows(serializer_class):
+        row_serializer = RowSerializer(serializer_class, context=context)
+        rows = serializer_class.Meta.model.objects.values(*row_serializer.columns)
+        data = row_serializer.to_representation(rows)
+        return render_json(data, exact=row_serializer.exact)
+
+    print(
+        f"{'':>11} {'serializer ms':>14} {'rows ms':>8} {'rows json ms':>13}"
+        f" {'speedup':>8}"
+    )
+    for label, serializer_class in (
+        ("characters", CharacterSerializer),
+        ("relics", RelicSerializer),
+        ("lightcones", LightconeSerializer),
+    ):
+        assert render_rows(serializer_class) == render_serializer(serializer_class)
+        serializer = measure(lambda: render_serializer(serializer_class), repeat)
+        rows = measure(lambda: render_rows(serializer_class), repeat)
+        with mock.patch.object(serializers, "orjson", None):
+            rows_json = measure(lambda: render_rows(serializer_class), repeat)
+        scale = 1000 / count
+        print(
+            f"{label:>11} {serializer['median'] * scale:>14.1f}"
+            f" {rows['median'] * scale:>8.1f} {rows_json['median'] * scale:>13.1f}"
+            f" {serializer['median'] / rows['median']:>7.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--storage", choices=sorted(STORAGES), default="filesystem")
+    args = parser.parse_args()
+
+    from django.test import override_settings
+
+    with benchmark_database(), override_settings(
+        MEDIA_URL="/media/",
+        STORAGES={
+            "default": STORAGES[args.storage],
+            "staticfiles": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        },
+    ):
+        fill_catalog(args.objects)
+        run(args.objects, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
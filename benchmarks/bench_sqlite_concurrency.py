@@ -0,0 +1,125 @@
+"""
+Concurrent reads and writes against a SQLite database file.
+
+One writer commits batches of rows in a loop while reader threads fetch the latest
+page, as gunicorn workers serving the catalog during an import would. Runs once with
+SQLite's default rollback journal and once with the configured ``SQLITE_PRAGMAS``, and
+reports how long reads wait behind the writer:
+
+    python -m benchmarks.bench_sqlite_concurrency --readers 8 --seconds 5
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+def connect(path, pragmas):
+    connection = sqlite3.connect(
+        path, timeout=20, isolation_level=None, check_same_thread=False
+    )
+    for name, value in pragmas.items():
+        connection.execute(f"PRAGMA {name}={value}")
+    return connection
+
+
+def run(pragmas, readers, seconds, batch_size):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "db.sqlite3"
+        setup = connect(path, pragmas)
+        setup.execute(
+            "CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT, payload BLOB)"
+        )
+        setup.executemany(
+            "INSERT INTO item (name, payload) VALUES (?, ?)",
+            ((f"Item {i}", os.urandom(256)) for i in range(10000)),
+        )
+        setup.close()
+
+        stop = threading.Event()
+        latencies, errors, writes = [], [], [0]
+
+        def write():
+            connection = connect(path, pragmas)
+            while not stop.is_set():
+                connection.execute("BEGIN IMMEDIATE")
+                # Rows are generated by SQLite, the writer doesn't hold the GIL
+                connection.execute(
+                    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n"
+                    " WHERE i < ?) INSERT INTO item (name, payload)"
+                    " SELECT 'New item', randomblob(256) FROM n",
+                    [batch_size],
+                )
+                connection.execute("COMMIT")
+                writes[0] += 1
+            connection.close()
+
+        def read():
+            connection = connect(path, pragmas)
+            timings = []
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    connection.execute(
+                        "SELECT id, name FROM item ORDER BY id DESC LIMIT 50"
+                    ).fetchall()
+                except sqlite3.OperationalError as e:
+                    errors.append(str(e))
+                timings.append((time.perf_counter() - start) * 1000)
+            latencies.extend(timings)
+            connection.close()
+
+        threads = [threading.Thread(target=write)] + [
+            threading.Thread(target=read) for _ in range(readers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    latencies.sort()
+    return {
+        "reads": len(latencies),
+        "writes": writes[0],
+        "median": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99)],
+        "max": latencies[-1],
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--batch-size", type=int, default=20000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "silverrail.settings")
+    from django.conf import settings
+
+    print(
+        f"{'':>16} {'reads':>8} {'writes':>7} {'median ms':>10}"
+        f" {'p99 ms':>8} {'max ms':>8} {'errors':>7}"
+    )
+    for label, pragmas in (
+        ("rollback journal", {}),
+        ("configured", settings.SQLITE_PRAGMAS),
+    ):
+        result = run(pragmas, args.readers, args.seconds, args.batch_size)
+        print(
+            f"{label:>16} {result['reads']:>8} {result['writes']:>7}"
+            f" {result['median']:>10.2f} {result['p99']:>8.2f}"
+            f" {result['max']:>8.2f} {result['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Read and write cost of the two stat storage modes.
+
+Writes a full stat set for every object, then reads all of them back and reads a
+single object's stats, once with one Stat row per stat and once with packed StatVectors:
+
+    python -m benchmarks.bench_stat_storage --objects 10000
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks import benchmark_database, measure
+
+
+def run(object_count):
+    from characters.models import Character
+    from stats.models import STAT_INDEX, Stat, StatVector
+    from stats.storage import get_stat_vectors, set_stats
+
+    # Stats are keyed by content type and pk only, the characters don't need to exist
+    characters = [Character(pk=pk) for pk in range(1, object_count + 1)]
+
+    rng = np.random.default_rng(0)
+    stats = {
+        character: dict(zip(STAT_INDEX, rng.uniform(0, 1000, len(STAT_INDEX))))
+        for character in characters
+    }
+
+    print(f"{object_count} objects, {len(STAT_INDEX)} stats each")
+    print(
+        f"{'mode':>7} {'write all ms':>13} {'read all ms':>12} {'read one ms':>12} {'rows':>8}"
+    )
+    for storage, model in (("rows", Stat), ("packed", StatVector)):
+
+        def write():
+            model.objects.all().delete()
+            set_stats(stats, storage=storage)
+
+        write_timing = measure(write, repeat=3, warmup=0)
+        read_all = measure(lambda: get_stat_vectors(characters, storage), repeat=5)
+        read_one = measure(lambda: get_stat_vectors(characters[:1], storage), repeat=50)
+        print(
+            f"{storage:>7} {write_timing['median']:>13.1f} {read_all['median']:>12.1f} "
+            f"{read_one['median']:>12.3f} {model.objects.count():>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=10000)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        run(args.objects)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Cost of rendering a page of team cards.
+
+Compares the composition endpoint, which loads a page of teams with a fixed query
+plan, against rendering the same response from an unoptimized queryset, where every
+member, character, lightcone, relic list and ability list is fetched on its own:
+
+    python -m benchmarks.bench_team_composition --teams 50
+"""
+
+import argparse
+
+from benchmarks import benchmark_database, measure
+
+
+def create_teams(count, members=4, relics=6):
+    from abilities.models import Ability
+    from characters.models import Character
+    from lightcones.models import Lightcone
+    from relics.models import Relic
+    from teams.models import Team, TeamCharacter
+
+    relic_pool = Relic.objects.bulk_create(
+        Relic(name=f"Relic {slot}", set_name="Thunder", slot=slot)
+        for slot, _ in Relic.SLOTS[:relics]
+    )
+    characters = Character.objects.bulk_create(
+        Character(name=f"Character {i}", type="fire", path="destruction", rarity=5)
+        for i in range(count * members)
+    )
+    Ability.objects.bulk_create(
+        Ability(character=character, name=name, type=type)
+        for character in characters
+        for name, type in (
+            ("Strike", "basic"),
+            ("Blaze", "skill"),
+            ("Inferno", "ultimate"),
+        )
+    )
+    lightcones = Lightcone.objects.bulk_create(
+        Lightcone(name=f"Lightcone {i}", rarity=5, path="destruction", ability="...")
+        for i in range(count * members)
+    )
+    teams = Team.objects.bulk_create(Team(name=f"Team {i}") for i in range(count))
+    team_characters = TeamCharacter.objects.bulk_create(
+        TeamCharacter(
+            team=teams[i // members],
+            character=characters[i],
+            lightcone=lightcones[i],
+        )
+        for i in range(count * members)
+    )
+    TeamCharacter.relics.through.objects.bulk_create(
+        TeamCharacter.relics.through(teamcharacter=member, relic=relic)
+        for member in team_characters
+        for relic in relic_pool
+    )
+
+
+def run(teams):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIRequestFactory
+
+    from teams.models import Team
+    from teams.serializers import TeamCompositionSerializer
+    from teams.views import TeamCompositionViewSet
+
+    create_teams(teams)
+    factory = APIRequestFactory()
+    view = TeamCompositionViewSet.as_view({"get": "list"})
+
+    def get_page():
+        response = view(factory.get("/teams/compositions/", {"page_size": teams}))
+        assert len(response.data["results"]) == teams
+        return response.data
+
+    def get_unoptimized():
+        return TeamCompositionSerializer(
+            Team.objects.order_by("id")[:teams], many=True
+        ).data
+
+    print(f"{'':>12} {'queries':>8} {'median ms':>10} {'p99 ms':>8}")
+    for label, func in (("composition", get_page), ("unoptimized", get_unoptimized)):
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        timing = measure(func)
+        print(
+            f"{label:>12} {len(queries):>8} {timing['median']:>10.2f} {timing['p99']:>8.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--teams", type=int, default=50)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        run(args.teams)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class CatalogConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "catalog"
+
+    def ready(self):
+        import catalog.signals
+        from catalog.search import create_search_index
+
+        post_migrate.connect(create_search_index, sender=self)
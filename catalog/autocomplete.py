@@ -0,0 +1,191 @@
+"""
+Type-ahead over catalog names, served from memory.
+
+Every process keeps a sorted array of lowercased name keys per kind of object and
+finds the names starting with a prefix by bisection, without a database round trip.
+Each word of a name is a key too, so "wolf" completes "Silver Wolf".
+
+A kind is indexed on first use and reindexed when its model's catalog version moves.
+Saves and deletes in this process mark the kind stale right away through signals,
+changes made by other processes are noticed from the catalog version at most
+``AUTOCOMPLETE_CHECK_INTERVAL_SECONDS`` later. Only the kinds that changed are rebuilt.
+
+Memory is bounded: keys are truncated to ``AUTOCOMPLETE_KEY_LENGTH`` characters and a
+kind holds at most ``AUTOCOMPLETE_MAX_KEYS`` keys, dropping word keys first.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from catalog.search import SEARCH_MODELS
+from utils.cache import get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(value: str) -> str:
+    return " ".join(value.lower().split())
+
+
+class PrefixIndex:
+    """
+    Sorted name keys of one kind of catalog object.
+
+    Args:
+        rows (Iterable[Tuple[int, str]]): The ids and names of the objects.
+        version (int): The catalog version the rows were read at.
+        key_length (int): Keys are truncated to this length.
+        max_keys (int): The most keys to hold.
+    """
+
+    __slots__ = ("keys", "ids", "names", "version", "key_length")
+
+    def __init__(self, rows, version, key_length, max_keys):
+        self.version = version
+        self.key_length = key_length
+        self.names = {}
+        name_keys, word_keys = [], []
+        dropped = None
+        # The limit is applied while reading, so only the names that keep a key are
+        # ever held
+        for pk, name in rows:
+            if len(name_keys) == max_keys:
+                dropped = f"the first {max_keys} name"
+                break
+            self.names[pk] = name
+            normalized = normalize(name)
+            name_keys.append((normalized[:key_length], pk))
+            start = normalized.find(" ") + 1
+            while start:
+                word_keys.append((normalized[start : start + key_length], pk))
+                start = normalized.find(" ", start) + 1
+            # Later names take the place of word keys
+            overflow = len(name_keys) + len(word_keys) - max_keys
+            if overflow > 0:
+                del word_keys[len(word_keys) - overflow :]
+                dropped = dropped or "name"
+
+        if dropped:
+            logger.warning(
+                "Autocomplete index over %s keys, only %s keys are kept",
+                max_keys,
+                dropped,
+            )
+
+        pairs = sorted(name_keys + word_keys)
+        self.keys = [key for key, _ in pairs]
+        self.ids = [pk for _, pk in pairs]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def complete(self, prefix: str, limit: int) -> List[tuple]:
+        """
+        Find the names with a word starting with a normalized prefix.
+
+        Returns:
+            List[Tuple[str, int, str]]: The matching keys, ids and names, in key order.
+        """
+        key = prefix[: self.key_length]
+        # Truncated keys can match names that only share the first characters
+        check = len(prefix) > self.key_length
+        matches, seen = [], set()
+        index = bisect_left(self.keys, key)
+        while index < len(self.keys) and len(matches) < limit:
+            if not self.keys[index].startswith(key):
+                break
+            pk = self.ids[index]
+            name = self.names[pk]
+            if pk not in seen and (not check or prefix in normalize(name)):
+                seen.add(pk)
+                matches.append((self.keys[index], pk, name))
+            index += 1
+        return matches
+
+
+class Autocompleter:
+    """
+    The prefix indexes of every kind of catalog object in this process.
+    """
+
+    def __init__(self):
+        self.indexes: Dict[str, PrefixIndex] = {}
+        self.stale = set()
+        self.checked = {}
+        self.lock = threading.Lock()
+
+    def mark_stale(self, kind: str):
+        """Reindex a kind at its next use."""
+        self.stale.add(kind)
+
+    def reset(self):
+        """Drop every index, they are rebuilt at their next use."""
+        self.indexes, self.stale, self.checked = {}, set(), {}
+
+    def get_index(self, kind: str) -> PrefixIndex:
+        """Get the index of a kind, building or rebuilding it if it's out of date."""
+        index = self.indexes.get(kind)
+        now = time.monotonic()
+        if (
+            index is not None
+            and kind not in self.stale
+            and now - self.checked.get(kind, 0)
+            < settings.AUTOCOMPLETE_CHECK_INTERVAL_SECONDS
+        ):
+            return index
+
+        model_class, name_field, _ = SEARCH_MODELS[kind]
+        with self.lock:
+            stale = kind in self.stale
+            self.stale.discard(kind)
+            self.checked[kind] = now
+            version = get_catalog_version(model_class)
+            index = self.indexes.get(kind)
+            if stale or index is None or index.version != version:
+                index = PrefixIndex(
+                    model_class.objects.values_list("pk", name_field).iterator(),
+                    version,
+                    settings.AUTOCOMPLETE_KEY_LENGTH,
+                    settings.AUTOCOMPLETE_MAX_KEYS,
+                )
+                self.indexes[kind] = index
+        return index
+
+    def complete(
+        self, prefix: str, kinds: Optional[Iterable[str]] = None, limit=10
+    ) -> List[Dict]:
+        """
+        Complete a prefix to catalog names.
+
+        Args:
+            prefix (str): What the user typed so far.
+            kinds (Iterable[str], optional): Only complete these kinds of objects.
+            limit (int): The maximum number of results.
+
+        Returns:
+            List[Dict]: Names starting with the prefix first, then names with a later
+            word starting with it, each alphabetically. Each has its ``kind``, ``id``
+            and ``name``.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        matches = []
+        for kind in kinds or SEARCH_MODELS:
+            for key, pk, name in self.get_index(kind).complete(prefix, limit):
+                matches.append(
+                    (not normalize(name).startswith(prefix), key, kind, pk, name)
+                )
+        matches.sort()
+        return [
+            {"kind": kind, "id": pk, "name": name}
+            for _, _, kind, pk, name in matches[:limit]
+        ]
+
+
+autocompleter = Autocompleter()
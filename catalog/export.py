@@ -0,0 +1,295 @@
+"""
+Streaming export of the whole catalog.
+
+Characters with their abilities, relics and lightcones are read ``CATALOG_EXPORT_CHUNK_SIZE``
+rows at a time with ``QuerySet.iterator()``, the abilities and stats of each chunk with
+one query each, and every chunk is encoded and handed on before the next one is read.
+Memory stays the same however large the catalog is.
+
+Two formats are written, ``ndjson`` with one object per line and a ``kind`` on each,
+and ``json``, a single document with a list per kind. Either can be compressed on the
+fly with gzip, or brotli when the ``brotli`` extra is installed
+(``poetry install --extras brotli``).
+
+A gzipped snapshot of each format is kept in ``CATALOG_EXPORT_DIR`` for the current
+catalog version, named after the versions of the exported models. Exports write it as
+they stream when it's missing, so it's rebuilt by the first export after a change, or
+ahead of time by ``manage.py export_catalog --snapshot``.
+"""
+
+import gzip
+import hashlib
+import os
+import tempfile
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils import encoders, json
+
+from abilities.models import Ability
+from catalog.serializers import ExportCharacterSerializer, ExportLightconeSerializer
+from characters.models import Character
+from lightcones.models import Lightcone
+from relics.models import Relic
+from relics.serializers import RelicSerializer
+from stats.models import STAT_INDEX, Stat
+from stats.storage import get_stat_vectors
+from utils.cache import get_catalog_version
+from utils.views import optimize_queryset_for_serializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+# Each kind of record, its section in the JSON document and its serializer
+EXPORT_SECTIONS = {
+    "character": ("characters", ExportCharacterSerializer),
+    "relic": ("relics", RelicSerializer),
+    "lightcone": ("lightcones", ExportLightconeSerializer),
+}
+
+# Models whose catalog versions an export depends on
+EXPORT_VERSION_MODELS = [Character, Ability, Relic, Lightcone, Stat]
+
+
+def get_encodings():
+    """The content encodings that can be written, preferred first."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def get_accepted_encodings(accept_encoding: str) -> List[str]:
+    """
+    Find the content encodings that can be written and that a client accepts.
+
+    Args:
+        accept_encoding (str): The ``Accept-Encoding`` header.
+
+    Returns:
+        List[str]: ``"br"`` and ``"gzip"`` if accepted, preferred first.
+    """
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return [
+        encoding
+        for encoding in get_encodings()
+        if encoding in accepted or "*" in accepted
+    ]
+
+
+def get_export_version() -> str:
+    """Get a digest of the catalog versions of every exported model."""
+    versions = [get_catalog_version(model) for model in EXPORT_VERSION_MODELS]
+    return hashlib.md5(repr(versions).encode()).hexdigest()[:16]
+
+
+def encode(data) -> str:
+    return json.dumps(
+        data, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(",", ":")
+    )
+
+
+def iter_records(kind: str, chunk_size: int) -> Iterator[list]:
+    """
+    Read the records of one kind, a chunk at a time.
+
+    Args:
+        kind (str): One of ``EXPORT_SECTIONS``.
+        chunk_size (int): The number of rows read per query.
+
+    Yields:
+        list: The serialized records of each chunk, each with its ``stats``.
+    """
+    _, serializer_class = EXPORT_SECTIONS[kind]
+    queryset = optimize_queryset_for_serializer(
+        serializer_class.Meta.model.objects.order_by("pk"), serializer_class
+    )
+    chunk = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) == chunk_size:
+            yield serialize_chunk(chunk, serializer_class)
+            chunk = []
+    if chunk:
+        yield serialize_chunk(chunk, serializer_class)
+
+
+def serialize_chunk(objects, serializer_class) -> list:
+    vectors = get_stat_vectors(objects)
+    # Without a request image URLs are left as the storage gives them, the same for
+    # every client, so exports can be shared through snapshots
+    records = serializer_class(objects, many=True).data
+    for obj, record in zip(objects, records):
+        vector = vectors[(type(obj), obj.pk)]
+        # Stats that aren't set read as 0, only the others are written
+        record["stats"] = {
+            stat_type: value
+            for stat_type, value in zip(STAT_INDEX, vector.tolist())
+            if value
+        }
+    return records
+
+
+def iter_export(
+    export_format: str = "ndjson", chunk_size: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Encode the whole catalog.
+
+    Args:
+        export_format (str): ``"ndjson"`` or ``"json"``.
+        chunk_size (int, optional): Rows read per query. Defaults to
+            ``CATALOG_EXPORT_CHUNK_SIZE``.
+
+    Yields:
+        bytes: The UTF-8 encoded export, one chunk of records at a time.
+    """
+    chunk_size = chunk_size or settings.CATALOG_EXPORT_CHUNK_SIZE
+    if export_format == "json":
+        yield b"{"
+    for index, (kind, (section, _)) in enumerate(EXPORT_SECTIONS.items()):
+        if export_format == "json":
+            yield f'{"," if index else ""}"{section}":['.encode()
+        first = True
+        for records in iter_records(kind, chunk_size):
+            if export_format == "json":
+                text = ",".join(encode(record) for record in records)
+                yield (text if first else f",{text}").encode()
+            else:
+                yield "".join(
+                    f"{encode({'kind': kind, **record})}\n" for record in records
+                ).encode()
+            first = False
+        if export_format == "json":
+            yield b"]"
+    if export_format == "json":
+        yield b"}"
+
+
+def compress(chunks: Iterable[bytes], encoding: Optional[str]) -> Iterator[bytes]:
+    """
+    Compress a stream of chunks as it goes.
+
+    Args:
+        chunks (Iterable[bytes]): The content.
+        encoding (str, optional): ``"gzip"`` or ``"br"``, None passes the chunks through.
+    """
+    if encoding is None:
+        yield from chunks
+        return
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=settings.CATALOG_EXPORT_BROTLI_QUALITY)
+        compress_chunk, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(
+            settings.CATALOG_EXPORT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+        compress_chunk, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        data = compress_chunk(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def get_snapshot_path(export_format: str, version: str) -> Path:
+    return Path(settings.CATALOG_EXPORT_DIR) / f"catalog-{version}.{export_format}.gz"
+
+
+def open_snapshot(export_format: str, version: str) -> Optional[BinaryIO]:
+    """Open the snapshot of a format at a version, if it was written."""
+    try:
+        return open(get_snapshot_path(export_format, version), "rb")
+    except FileNotFoundError:
+        return None
+
+
+def iter_snapshot(file: BinaryIO, decompress=True, block_size=64 * 1024):
+    """Read an open snapshot, uncompressed or as stored, and close it."""
+    reader = gzip.GzipFile(fileobj=file) if decompress else file
+    with file, reader:
+        while block := reader.read(block_size):
+            yield block
+
+
+def iter_with_snapshot(
+    chunks: Iterable[bytes], export_format: str, version: str
+) -> Iterator[bytes]:
+    """
+    Pass an export through while writing it to the snapshot of its version.
+
+    The snapshot only replaces older ones once the export was read to the end, an
+    export that's interrupted leaves nothing behind. Only the snapshot of the current
+    catalog version is kept then, so an export that finishes after the catalog
+    changed doesn't remove the snapshot of the newer version.
+    """
+    directory = Path(settings.CATALOG_EXPORT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = get_snapshot_path(export_format, version)
+    file = tempfile.NamedTemporaryFile(
+        dir=directory, prefix=f".{path.name}.", delete=False
+    )
+    try:
+        with file, gzip.GzipFile(
+            fileobj=file, mode="wb", compresslevel=settings.CATALOG_EXPORT_GZIP_LEVEL
+        ) as snapshot:
+            for chunk in chunks:
+                snapshot.write(chunk)
+                yield chunk
+        os.replace(file.name, path)
+    except BaseException:
+        os.unlink(file.name)
+        raise
+    remove_snapshots(
+        export_format, keep=get_snapshot_path(export_format, get_export_version())
+    )
+
+
+def write_snapshot(export_format: str) -> Path:
+    """
+    Write the snapshot of a format for the current catalog version.
+
+    Returns:
+        Path: The snapshot.
+    """
+    version = get_export_version()
+    for _ in iter_with_snapshot(iter_export(export_format), export_format, version):
+        pass
+    return get_snapshot_path(export_format, version)
+
+
+def remove_snapshots(export_format: str, keep: Optional[Path] = None) -> int:
+    """Delete the snapshots of a format, except ``keep``."""
+    removed = 0
+    for path in Path(settings.CATALOG_EXPORT_DIR).glob(f"catalog-*.{export_format}.gz"):
+        if path != keep:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renderer for ``?format=ndjson`` and ``Accept: application/x-ndjson``. Exports are
+    streamed, so it only renders error responses, as one line.
+    """
+
+    media_type = EXPORT_FORMATS["ndjson"]
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f"{encode(data)}\n".encode()
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.export import (
+    EXPORT_FORMATS,
+    compress,
+    get_encodings,
+    iter_export,
+    write_snapshot,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the characters with their abilities, the relics and the lightcones, "
+        "with their stats, as NDJSON or a JSON document, or rewrite the snapshots."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=list(EXPORT_FORMATS), default="ndjson", dest="format"
+        )
+        parser.add_argument(
+            "--output", "-o", help="File to write to, standard output by default."
+        )
+        parser.add_argument(
+            "--compress", choices=get_encodings(), help="Compress the output."
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, help="Rows read per query.", default=None
+        )
+        parser.add_argument(
+            "--snapshot",
+            action="store_true",
+            help="Write the snapshots of every format for the current catalog version "
+            "and delete the older ones, instead of exporting.",
+        )
+
+    def handle(self, *args, **options):
+        if options["snapshot"]:
+            for export_format in EXPORT_FORMATS:
+                path = write_snapshot(export_format)
+                self.stdout.write(self.style.SUCCESS(f"Wrote {path}."))
+            return
+        if options["compress"] and not options["output"]:
+            raise CommandError("Compressed exports need an --output file.")
+
+        chunks = compress(
+            iter_export(options["format"], chunk_size=options["chunk_size"]),
+            options["compress"],
+        )
+        if options["output"]:
+            with open(options["output"], "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending="")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from catalog.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite the search entries of every character, ability, relic and lightcone."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Objects indexed per batch."
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} catalog objects."))
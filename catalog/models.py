@@ -0,0 +1,39 @@
+from django.db import models
+from django.db.models import Model
+from django.db.models.functions import Lower
+
+
+class SearchEntry(Model):
+    """
+    One searchable catalog object, the documents of the search index.
+
+    ``name`` is what results are ranked on, ``text`` holds the other searchable fields
+    of the object. Kept up to date by the signals in ``catalog.signals``, rebuilt with
+    ``manage.py rebuild_search_index``. The index itself is created by
+    ``catalog.search.create_search_index`` after migrations.
+    """
+
+    KINDS = [
+        ("character", "Character"),
+        ("ability", "Ability"),
+        ("relic", "Relic"),
+        ("lightcone", "Lightcone"),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KINDS)
+    object_id = models.PositiveBigIntegerField()
+    name = models.CharField(max_length=128)
+    text = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.name}"
+
+    class Meta:
+        verbose_name = "Search Entry"
+        verbose_name_plural = "Search Entries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "object_id"], name="search_entry_object_unique"
+            )
+        ]
+        indexes = [models.Index(Lower("name"), name="search_entry_name_lower")]
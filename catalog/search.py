@@ -0,0 +1,387 @@
+"""
+Search across characters, abilities, relics and lightcones.
+
+Every searchable object has a ``SearchEntry`` row, indexed according to the database:
+
+* SQLite: an FTS5 table with the trigram tokenizer, kept in sync with the entries by
+  triggers. A query of three or more characters matches any substring of a name or
+  text.
+* PostgreSQL: ``pg_trgm`` GIN indexes on names and texts, which serve both substring
+  matches and similarity matches.
+
+Other databases fall back to unindexed substring matches.
+
+Names starting with the query are read first from an index on the lowercased names, so
+an exact name or a prefix is never crowded out by the many names that merely contain a
+short query.
+
+Candidates are ranked in Python: an exact name first, then names starting with the
+query, names containing it, and texts containing it, each ordered by the trigram
+similarity of the name to the query. When too few names contain the query, names
+sharing trigrams with it are added, so "kafak" still finds "Kafka".
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from abilities.models import Ability
+from catalog.models import SearchEntry
+from characters.models import Character
+from lightcones.models import Lightcone
+from relics.models import Relic
+
+# Kind -> (model, name field, other searchable fields)
+SEARCH_MODELS = {
+    "character": (Character, "name", ()),
+    "ability": (Ability, "name", ()),
+    "relic": (Relic, "name", ("set_name", "effect")),
+    "lightcone": (Lightcone, "name", ("ability",)),
+}
+
+# Candidates fetched per query before ranking
+CANDIDATE_LIMIT = 200
+
+# Candidates that don't contain the query need this similarity, like pg_trgm's ``%``
+SIMILARITY_THRESHOLD = 0.3
+
+SQLITE_INDEX_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS catalog_searchentry_fts USING fts5(
+        name, text, content='catalog_searchentry', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_searchentry_fts_insert
+    AFTER INSERT ON catalog_searchentry BEGIN
+        INSERT INTO catalog_searchentry_fts (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_searchentry_fts_delete
+    AFTER DELETE ON catalog_searchentry BEGIN
+        INSERT INTO catalog_searchentry_fts (catalog_searchentry_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_searchentry_fts_update
+    AFTER UPDATE ON catalog_searchentry BEGIN
+        INSERT INTO catalog_searchentry_fts (catalog_searchentry_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO catalog_searchentry_fts (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+]
+
+POSTGRESQL_INDEX_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE INDEX IF NOT EXISTS catalog_searchentry_name_trgm
+    ON catalog_searchentry USING gin (name gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS catalog_searchentry_text_trgm
+    ON catalog_searchentry USING gin (text gin_trgm_ops)
+    """,
+]
+
+
+def create_search_index(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Create the search index of the database if it doesn't exist, run after migrations.
+
+    Args:
+        using (str): The database alias.
+    """
+    search_connection = connections[using]
+    statements = {
+        "sqlite": SQLITE_INDEX_SQL,
+        "postgresql": POSTGRESQL_INDEX_SQL,
+    }.get(search_connection.vendor, [])
+    with search_connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def get_search_kind(model_class) -> Optional[str]:
+    """Get the kind of search entry for a model, if it's searchable."""
+    for kind, (model, _, _) in SEARCH_MODELS.items():
+        if model is model_class:
+            return kind
+    return None
+
+
+def get_search_fields(model_class) -> List[str]:
+    """Get the fields of a searchable model that its search entry is built from."""
+    _, name_field, text_fields = SEARCH_MODELS[get_search_kind(model_class)]
+    return [name_field, *text_fields]
+
+
+def index_objects(model_class, objects) -> int:
+    """
+    Write the search entries of some saved objects as they are in memory, with one
+    upsert.
+
+    Args:
+        model_class (Type[Model]): A searchable model.
+        objects (Iterable[Model]): The objects to index.
+
+    Returns:
+        int: How many entries were written.
+    """
+    kind = get_search_kind(model_class)
+    name_field, *text_fields = get_search_fields(model_class)
+    entries = [
+        SearchEntry(
+            kind=kind,
+            object_id=instance.pk,
+            name=getattr(instance, name_field),
+            text="\n".join(
+                value for value in (getattr(instance, f) for f in text_fields) if value
+            ),
+        )
+        for instance in objects
+    ]
+    if entries:
+        SearchEntry.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=["kind", "object_id"],
+            update_fields=["name", "text"],
+        )
+    return len(entries)
+
+
+def update_search_index(model_class, pks: Iterable[int]) -> int:
+    """
+    Write the search entries of some objects loaded from the database, and remove the
+    entries of the ones that no longer exist.
+
+    Args:
+        model_class (Type[Model]): A searchable model.
+        pks (Iterable[int]): The objects to index.
+
+    Returns:
+        int: How many entries were written.
+    """
+    pks = set(pks)
+    objects = list(
+        model_class.objects.filter(pk__in=pks).only(*get_search_fields(model_class))
+    )
+    missing = pks - {instance.pk for instance in objects}
+    if missing:
+        remove_from_search_index(model_class, missing)
+    return index_objects(model_class, objects)
+
+
+def remove_from_search_index(model_class, pks: Iterable[int]):
+    """Remove the search entries of some objects."""
+    SearchEntry.objects.filter(
+        kind=get_search_kind(model_class), object_id__in=list(pks)
+    ).delete()
+
+
+def rebuild_search_index(models=None, batch_size=1000) -> int:
+    """
+    Rewrite the search entries of every object of some models in batches.
+
+    Args:
+        models (Iterable[Type[Model]], optional): Defaults to every searchable model.
+        batch_size (int): Objects indexed per batch.
+
+    Returns:
+        int: How many entries were written.
+    """
+    models = list(models or [model for model, _, _ in SEARCH_MODELS.values()])
+    count = 0
+    for model_class in models:
+        SearchEntry.objects.filter(kind=get_search_kind(model_class)).delete()
+        pks = list(model_class.objects.order_by("pk").values_list("pk", flat=True))
+        for start in range(0, len(pks), batch_size):
+            count += update_search_index(model_class, pks[start : start + batch_size])
+    return count
+
+
+def get_trigrams(value: str) -> set:
+    """Get the trigrams of each word of a value, padded like ``pg_trgm`` does."""
+    trigrams = set()
+    for word in re.findall(r"\w+", value.lower()):
+        word = f"  {word} "
+        trigrams.update(word[i : i + 3] for i in range(len(word) - 2))
+    return trigrams
+
+
+def word_similarity(query: str, value: str) -> float:
+    """
+    Get the share of the trigrams of a query found in a value, from 0 to 1, close to
+    ``pg_trgm``'s ``word_similarity``, so long names aren't penalized.
+    """
+    query_trigrams = get_trigrams(query)
+    if not query_trigrams:
+        return 0.0
+    return len(query_trigrams & get_trigrams(value)) / len(query_trigrams)
+
+
+def get_rank(query: str, name: str, in_text: bool) -> float:
+    """
+    Score a candidate name for a lowercased query, higher is better.
+
+    How the query is contained sets the integer part, the similarity of the name to the
+    query the fraction, so a candidate that only looks alike never outranks a match.
+    """
+    name = name.lower()
+    score = word_similarity(query, name)
+    if name == query:
+        score += 5
+    elif name.startswith(query):
+        score += 4
+    elif any(word.startswith(query) for word in name.split()):
+        score += 3
+    elif query in name:
+        score += 2
+    elif in_text:
+        score += 1
+    return score
+
+
+def get_prefix_candidates(query: str, kinds: List[str]):
+    """
+    Get the entries whose lowercased name starts with a query, in alphabetical order so
+    an exact name comes first, as candidate rows.
+    """
+    # The range is read from the index, startswith drops what a collation sorts into it
+    queryset = (
+        SearchEntry.objects.annotate(lower_name=Lower("name"))
+        .filter(
+            lower_name__gte=query,
+            lower_name__lt=query[:-1] + chr(ord(query[-1]) + 1),
+            lower_name__startswith=query,
+        )
+        .order_by("lower_name")
+    )
+    if kinds:
+        queryset = queryset.filter(kind__in=kinds)
+    return queryset.values_list("id", "kind", "object_id", "name")[:CANDIDATE_LIMIT]
+
+
+def _quote_fts(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _find_sqlite_candidates(cursor, query, kinds, limit):
+    kind_sql = f" AND e.kind IN ({', '.join(['%s'] * len(kinds))})" if kinds else ""
+    sql = (
+        "SELECT e.id, e.kind, e.object_id, e.name"
+        " FROM catalog_searchentry_fts f"
+        " JOIN catalog_searchentry e ON e.id = f.rowid"
+        f" WHERE catalog_searchentry_fts MATCH %s{kind_sql}"
+    )
+
+    # Names containing the query, then texts containing it. Every match is equally
+    # good to the index, ranking them would cost more than reading them
+    cursor.execute(
+        f"{sql} LIMIT %s", [f"name : {_quote_fts(query)}", *kinds, CANDIDATE_LIMIT]
+    )
+    rows = [(*row, False) for row in cursor.fetchall()]
+    if len(rows) < limit:
+        cursor.execute(
+            f"{sql} LIMIT %s", [f"text : {_quote_fts(query)}", *kinds, limit]
+        )
+        rows += [(*row, True) for row in cursor.fetchall()]
+
+    # Names sharing the most trigrams with the query, for typos
+    if len(rows) < limit:
+        trigrams = {
+            word[i : i + 3]
+            for word in re.findall(r"\w+", query)
+            for i in range(len(word) - 2)
+        }
+        if trigrams:
+            match = "name : (" + " OR ".join(map(_quote_fts, sorted(trigrams))) + ")"
+            cursor.execute(
+                f"{sql} ORDER BY bm25(catalog_searchentry_fts) LIMIT %s",
+                [match, *kinds, CANDIDATE_LIMIT],
+            )
+            rows += [(*row, False) for row in cursor.fetchall()]
+    return rows
+
+
+def _find_postgresql_candidates(cursor, query, kinds, limit):
+    kind_sql = " AND kind = ANY(%s)" if kinds else ""
+    pattern = "%" + re.sub(r"([\\%_])", r"\\\1", query) + "%"
+    cursor.execute(
+        "SELECT id, kind, object_id, name, strpos(lower(text), %s) > 0"
+        " FROM catalog_searchentry"
+        f" WHERE (%s <%% name OR name ILIKE %s OR text ILIKE %s){kind_sql}"
+        " ORDER BY word_similarity(%s, name) DESC LIMIT %s",
+        [query, query, pattern, pattern, *([kinds] if kinds else []), query]
+        + [CANDIDATE_LIMIT],
+    )
+    return cursor.fetchall()
+
+
+def _find_candidates(query, kinds):
+    # Names or texts containing the query, without an index
+    queryset = SearchEntry.objects.filter(
+        Q(name__icontains=query) | Q(text__icontains=query)
+    )
+    if kinds:
+        queryset = queryset.filter(kind__in=kinds)
+    return [
+        (*row, query not in row[3].lower())
+        for row in queryset.values_list("id", "kind", "object_id", "name")[
+            :CANDIDATE_LIMIT
+        ]
+    ]
+
+
+def search(query: str, kinds: Optional[Iterable[str]] = None, limit=20) -> List[Dict]:
+    """
+    Find catalog objects by name, or by the text of relic effects and lightcone
+    abilities, tolerating typos.
+
+    Args:
+        query (str): What the user typed.
+        kinds (Iterable[str], optional): Only find these kinds of objects.
+        limit (int): The maximum number of results.
+
+    Returns:
+        List[Dict]: The best results first, each with its ``kind``, ``id``, ``name``
+        and ``score``.
+    """
+    query = " ".join(query.lower().split())
+    kinds = sorted(set(kinds or ()))
+    if not query:
+        return []
+
+    # The trigram tokenizer can't match fewer than three characters
+    rows = [(*row, False) for row in get_prefix_candidates(query, kinds)]
+    if connection.vendor == "sqlite" and len(query) >= 3:
+        with connection.cursor() as cursor:
+            rows += _find_sqlite_candidates(cursor, query, kinds, limit)
+    elif connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            rows += _find_postgresql_candidates(cursor, query, kinds, limit)
+    else:
+        rows += _find_candidates(query, kinds)
+
+    results = {}
+    for entry_id, kind, object_id, name, in_text in rows:
+        score = get_rank(query, name, in_text)
+        if entry_id not in results and score >= SIMILARITY_THRESHOLD:
+            results[entry_id] = {
+                "kind": kind,
+                "id": object_id,
+                "name": name,
+                "score": round(score, 4),
+            }
+    return sorted(
+        results.values(), key=lambda result: (-result["score"], len(result["name"]))
+    )[:limit]
@@ -0,0 +1,54 @@
+from rest_framework import serializers
+
+from abilities.serializers import AbilityDetailSerializer
+from catalog.models import SearchEntry
+from characters.serializers import CharacterSerializer
+from lightcones.serializers import LightconeSerializer
+
+
+class SearchRequestSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=128, trim_whitespace=True)
+    kind = serializers.CharField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=20)
+
+    def validate_kind(self, value):
+        """Take a comma-separated list of kinds."""
+        kinds = [kind for kind in value.split(",") if kind]
+        invalid = set(kinds) - set(dict(SearchEntry.KINDS))
+        if invalid:
+            raise serializers.ValidationError(
+                f"Invalid kinds: {', '.join(sorted(invalid))}"
+            )
+        return kinds
+
+
+class AutocompleteRequestSerializer(SearchRequestSerializer):
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
+class SearchResultSerializer(serializers.Serializer):
+    kind = serializers.CharField()
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    score = serializers.FloatField()
+
+
+class ExportAbilitySerializer(AbilityDetailSerializer):
+    class Meta(AbilityDetailSerializer.Meta):
+        fields = [
+            field
+            for field in AbilityDetailSerializer.Meta.fields
+            if field != "character"
+        ]
+
+
+class ExportCharacterSerializer(CharacterSerializer):
+    abilities = ExportAbilitySerializer(many=True, read_only=True)
+
+    class Meta(CharacterSerializer.Meta):
+        fields = ["id", *CharacterSerializer.Meta.fields]
+
+
+class ExportLightconeSerializer(LightconeSerializer):
+    class Meta(LightconeSerializer.Meta):
+        fields = ["id", *LightconeSerializer.Meta.fields]
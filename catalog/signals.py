@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from abilities.models import Ability
+from catalog.autocomplete import autocompleter
+from catalog.search import (
+    get_search_fields,
+    get_search_kind,
+    index_objects,
+    remove_from_search_index,
+)
+from characters.models import Character
+from lightcones.models import Lightcone
+from relics.models import Relic
+
+
+def mark_autocomplete_stale(model_class):
+    # A rebuild before the commit would read the old names
+    kind = get_search_kind(model_class)
+    transaction.on_commit(lambda: autocompleter.mark_stale(kind))
+
+
+@receiver(post_save, sender=Character)
+@receiver(post_save, sender=Ability)
+@receiver(post_save, sender=Relic)
+@receiver(post_save, sender=Lightcone)
+def update_search_entry(sender, instance, created, raw=False, **kwargs):
+    # Only the searchable fields end up in the entry
+    if not raw and (created or instance.has_changed(get_search_fields(sender))):
+        index_objects(sender, [instance])
+        mark_autocomplete_stale(sender)
+
+
+@receiver(post_delete, sender=Character)
+@receiver(post_delete, sender=Ability)
+@receiver(post_delete, sender=Relic)
+@receiver(post_delete, sender=Lightcone)
+def remove_search_entry(sender, instance, **kwargs):
+    remove_from_search_index(sender, [instance.pk])
+    mark_autocomplete_stale(sender)
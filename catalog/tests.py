@@ -0,0 +1,465 @@
+import gzip
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from abilities.models import Ability
+from catalog.autocomplete import PrefixIndex, autocompleter
+from catalog.export import (
+    EXPORT_FORMATS,
+    get_export_version,
+    get_snapshot_path,
+    iter_export,
+    iter_records,
+    iter_with_snapshot,
+    write_snapshot,
+)
+from catalog.models import SearchEntry
+from catalog.search import (
+    CANDIDATE_LIMIT,
+    get_prefix_candidates,
+    rebuild_search_index,
+    search,
+    word_similarity,
+)
+from characters.models import Character
+from lightcones.models import Lightcone
+from relics.models import Relic
+from stats.storage import set_stats
+from utils.cache import bump_catalog_version
+from utils.gamedata import GameDataImporter
+from utils.mixins import prevalidated
+from utils.testing import QueryPlanAssertionsMixin
+
+
+class SearchIndexTests(QueryPlanAssertionsMixin, TestCase):
+
+    def setUp(self):
+        self.kafka = Character.objects.create(
+            name="Kafka", type="lightning", path="nihility", rarity=5
+        )
+        self.silver_wolf = Character.objects.create(
+            name="Silver Wolf", type="quantum", path="nihility", rarity=5
+        )
+        Ability.objects.create(
+            character=self.kafka, name="Midnight Tumult", type="basic"
+        )
+        Relic.objects.create(
+            name="Band's Polarized Sunglasses",
+            set_name="Band of Sizzling Thunder",
+            slot="head",
+            effect="Increases Lightning DMG by 10%.",
+        )
+        Lightcone.objects.create(
+            name="Patience Is All You Need",
+            path="nihility",
+            rarity=5,
+            ability="Increases DMG dealt by the wearer by 24%.",
+        )
+
+    def get_names(self, query, **kwargs):
+        return [result["name"] for result in search(query, **kwargs)]
+
+    def test_objects_are_indexed_on_save(self):
+        self.assertEqual(
+            set(SearchEntry.objects.values_list("kind", flat=True)),
+            {"character", "ability", "relic", "lightcone"},
+        )
+
+    def test_partial_names_match(self):
+        self.assertEqual(self.get_names("sil")[0], "Silver Wolf")
+        self.assertEqual(self.get_names("kafk"), ["Kafka"])
+        self.assertEqual(self.get_names("ka"), ["Kafka"])
+
+    def test_typos_are_tolerated(self):
+        self.assertEqual(self.get_names("kafak")[0], "Kafka")
+        self.assertEqual(self.get_names("slver wolf")[0], "Silver Wolf")
+
+    def test_effect_text_matches_rank_after_names(self):
+        Character.objects.create(
+            name="Lightning Lord", type="lightning", path="destruction", rarity=5
+        )
+        self.assertEqual(
+            self.get_names("lightning dmg"),
+            ["Band's Polarized Sunglasses", "Lightning Lord"],
+        )
+        self.assertEqual(
+            self.get_names("lightning")[:2],
+            ["Lightning Lord", "Band's Polarized Sunglasses"],
+        )
+
+    def test_kinds_limit_results(self):
+        self.assertEqual(
+            self.get_names("increases", kinds=["lightcone"]),
+            ["Patience Is All You Need"],
+        )
+
+    def test_entries_follow_edits_and_deletes(self):
+        self.kafka.name = "Kafka Prime"
+        self.kafka.save()
+        self.assertEqual(self.get_names("prime"), ["Kafka Prime"])
+
+        self.kafka.delete()
+        self.assertEqual(self.get_names("kafka"), [])
+        self.assertEqual(self.get_names("midnight"), [])
+
+    def test_unsearched_field_edits_are_not_reindexed(self):
+        self.kafka.rarity = 4
+        with self.assertNumQueries(1), prevalidated():
+            self.kafka.save()
+
+    def test_rebuild(self):
+        SearchEntry.objects.all().delete()
+        self.assertEqual(rebuild_search_index(batch_size=2), 5)
+        self.assertEqual(self.get_names("wolf"), ["Silver Wolf"])
+
+    def test_imports_are_indexed(self):
+        GameDataImporter().run(
+            [
+                {
+                    "model": "character",
+                    "name": "Acheron",
+                    "path": "nihility",
+                    "type": "lightning",
+                    "rarity": 5,
+                },
+                {
+                    "model": "relic",
+                    "name": "Thief's Myriad-Faced Mask",
+                    "set_name": "Thief",
+                    "slot": "head",
+                },
+            ]
+        )
+        self.assertEqual(self.get_names("acheron"), ["Acheron"])
+        self.assertEqual(self.get_names("myriad"), ["Thief's Myriad-Faced Mask"])
+
+    def test_sqlite_index_is_used(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite only")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT rowid FROM catalog_searchentry_fts"
+                " WHERE catalog_searchentry_fts MATCH '\"wolf\"'"
+            )
+            self.assertEqual(len(cursor.fetchall()), 1)
+
+    def test_prefixes_are_not_crowded_out(self):
+        SearchEntry.objects.bulk_create(
+            SearchEntry(kind="relic", object_id=1000 + i, name=f"Silk Weaver {i}")
+            for i in range(CANDIDATE_LIMIT + 100)
+        )
+        SearchEntry.objects.create(kind="relic", object_id=999, name="Sil")
+        self.assertEqual(self.get_names("sil")[0], "Sil")
+        self.assertEqual(self.get_names("sil", kinds=["relic"])[0], "Sil")
+        self.assertEqual(self.get_names("silv")[0], "Silver Wolf")
+        self.assertUsesIndex(get_prefix_candidates("sil", []))
+
+    def test_word_similarity(self):
+        self.assertEqual(word_similarity("kafka", "Kafka"), 1.0)
+        self.assertEqual(word_similarity("wolf", "Silver Wolf"), 1.0)
+        self.assertGreater(
+            word_similarity("kafak", "kafka"), word_similarity("kafak", "wolf")
+        )
+
+
+class SearchEndpointTests(APITestCase):
+
+    def setUp(self):
+        Character.objects.create(
+            name="Kafka", type="lightning", path="nihility", rarity=5
+        )
+        Lightcone.objects.create(
+            name="Patience Is All You Need", path="nihility", rarity=5, ability="..."
+        )
+
+    def test_search(self):
+        response = self.client.get(reverse("search"), {"q": "kafk"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["query"], "kafk")
+        result = response.data["results"][0]
+        self.assertEqual(result["kind"], "character")
+        self.assertEqual(result["name"], "Kafka")
+        self.assertEqual(result["id"], Character.objects.get().pk)
+
+    def test_kind_and_limit(self):
+        response = self.client.get(
+            reverse("search"), {"q": "a", "kind": "lightcone", "limit": 1}
+        )
+        self.assertEqual(
+            [r["name"] for r in response.data["results"]], ["Patience Is All You Need"]
+        )
+
+    def test_invalid_parameters(self):
+        for params in ({}, {"q": "kafka", "kind": "weapon"}, {"q": "a", "limit": 500}):
+            response = self.client.get(reverse("search"), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AutocompleteTests(TestCase):
+
+    def setUp(self):
+        autocompleter.reset()
+        self.kafka = Character.objects.create(
+            name="Kafka", type="lightning", path="nihility", rarity=5
+        )
+        Character.objects.create(
+            name="Silver Wolf", type="quantum", path="nihility", rarity=5
+        )
+        Ability.objects.create(
+            character=self.kafka, name="Midnight Tumult", type="basic"
+        )
+        Lightcone.objects.create(
+            name="Patience Is All You Need", path="nihility", rarity=5, ability="..."
+        )
+
+    def get_names(self, prefix, **kwargs):
+        return [result["name"] for result in autocompleter.complete(prefix, **kwargs)]
+
+    def test_names_and_later_words_are_completed(self):
+        self.assertEqual(self.get_names("ka"), ["Kafka"])
+        self.assertEqual(self.get_names("  SILVER   w"), ["Silver Wolf"])
+        self.assertEqual(self.get_names("wolf"), ["Silver Wolf"])
+        self.assertEqual(self.get_names("all you"), ["Patience Is All You Need"])
+        self.assertEqual(self.get_names("x"), [])
+
+    def test_names_starting_with_the_prefix_come_first(self):
+        Relic.objects.create(name="Tumult Band", set_name="Band", slot="head")
+        self.assertEqual(self.get_names("tum"), ["Tumult Band", "Midnight Tumult"])
+
+    def test_kinds_and_limit(self):
+        self.assertEqual(self.get_names("m", kinds=["ability"]), ["Midnight Tumult"])
+        self.assertEqual(len(self.get_names("", limit=1)), 0)
+        Character.objects.create(name="Kafka II", type="fire", path="hunt", rarity=4)
+        self.assertEqual(self.get_names("kaf", limit=1), ["Kafka"])
+
+    def test_lookups_are_served_from_memory(self):
+        self.get_names("ka")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_names("kaf"), ["Kafka"])
+
+    def test_only_changed_kinds_are_rebuilt(self):
+        self.get_names("ka")
+        lightcones = autocompleter.indexes["lightcone"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kafka.name = "Kafka Prime"
+            self.kafka.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_names("prime"), ["Kafka Prime"])
+        self.assertIs(autocompleter.indexes["lightcone"], lightcones)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kafka.delete()
+        self.assertEqual(self.get_names("ka"), [])
+
+    @override_settings(AUTOCOMPLETE_CHECK_INTERVAL_SECONDS=0)
+    def test_catalog_version_changes_are_picked_up(self):
+        self.get_names("ka")
+        # As another process would, without this process' signals
+        Character.objects.filter(pk=self.kafka.pk).update(name="Kafka Prime")
+        bump_catalog_version(Character)
+        self.assertEqual(self.get_names("prime"), ["Kafka Prime"])
+
+    def test_imports_mark_kinds_stale_once_committed(self):
+        self.get_names("ka")
+        record = {"model": "character", "name": "Acheron", "path": "nihility"}
+        with self.captureOnCommitCallbacks() as callbacks:
+            GameDataImporter().run([{**record, "type": "lightning", "rarity": 5}])
+            self.assertNotIn("character", autocompleter.stale)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get_names("ach"), ["Acheron"])
+
+    def test_memory_is_bounded(self):
+        rows = [(1, "Silver Wolf"), (2, "Midnight Tumult Of The Night"), (3, "Kafka")]
+        with self.assertLogs("catalog.autocomplete", "WARNING"):
+            index = PrefixIndex(rows, version=1, key_length=4, max_keys=5)
+        self.assertEqual(len(index), 5)
+        self.assertTrue(all(len(key) <= 4 for key in index.keys))
+        self.assertEqual([pk for _, pk, _ in index.complete("kafka", 10)], [3])
+        self.assertEqual([pk for _, pk, _ in index.complete("silver wolf", 10)], [1])
+        self.assertEqual(index.complete("silk", 10), [])
+
+        # Names past the limit aren't kept
+        with self.assertLogs("catalog.autocomplete", "WARNING"):
+            index = PrefixIndex(rows, version=1, key_length=4, max_keys=2)
+        self.assertEqual(
+            index.names, {1: "Silver Wolf", 2: "Midnight Tumult Of The Night"}
+        )
+        self.assertEqual(index.complete("kafka", 10), [])
+
+    def test_endpoint(self):
+        response = self.client.get(reverse("autocomplete"), {"q": "ka"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"],
+            [{"kind": "character", "id": self.kafka.pk, "name": "Kafka"}],
+        )
+        response = self.client.get(reverse("autocomplete"), {"q": "ka", "kind": "x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CatalogExportTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_override = override_settings(CATALOG_EXPORT_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.kafka = Character.objects.create(
+            name="Kafka", type="lightning", path="nihility", rarity=5
+        )
+        Ability.objects.create(
+            character=self.kafka, name="Midnight Tumult", type="basic"
+        )
+        Relic.objects.create(
+            name="Band's Polarized Sunglasses",
+            set_name="Band of Sizzling Thunder",
+            slot="head",
+        )
+        Lightcone.objects.create(
+            name="Patience Is All You Need", path="nihility", rarity=5, ability="..."
+        )
+        set_stats({self.kafka: {"hp": 1086.0, "atk": 679.0}})
+
+    def get_export(self, **extra):
+        response = self.client.get(reverse("catalog-export"), **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_ndjson(self):
+        response, content = self.get_export()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        records = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(
+            [record["kind"] for record in records], ["character", "relic", "lightcone"]
+        )
+        character = records[0]
+        self.assertEqual(character["name"], "Kafka")
+        self.assertEqual(character["abilities"][0]["name"], "Midnight Tumult")
+        self.assertEqual(character["stats"], {"hp": 1086.0, "atk": 679.0})
+        self.assertEqual(records[1]["stats"], {})
+
+    def test_json_document(self):
+        response, content = self.get_export(QUERY_STRING="format=json")
+        self.assertEqual(response["Content-Type"], "application/json")
+        data = json.loads(content)
+        self.assertEqual(list(data), ["characters", "relics", "lightcones"])
+        self.assertEqual(data["characters"][0]["abilities"][0]["type"], "basic")
+        self.assertEqual(data["lightcones"][0]["name"], "Patience Is All You Need")
+
+    def test_chunks_match_a_single_read(self):
+        for i in range(4):
+            Character.objects.create(
+                name=f"Character {i}", type="fire", path="hunt", rarity=4
+            )
+        for export_format in EXPORT_FORMATS:
+            with self.subTest(export_format):
+                chunks = list(iter_export(export_format, chunk_size=2))
+                self.assertEqual(
+                    b"".join(chunks),
+                    b"".join(iter_export(export_format, chunk_size=100)),
+                )
+        self.assertEqual(len(list(iter_records("character", 2))), 3)
+
+    def test_gzip(self):
+        _, content = self.get_export()
+        response, compressed = self.get_export(HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(compressed), content)
+
+        response, _ = self.get_export(HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_snapshot_is_written_and_served(self):
+        _, content = self.get_export()
+        snapshots = list(self.directory.glob("catalog-*.ndjson.gz"))
+        self.assertEqual(len(snapshots), 1)
+        self.assertEqual(gzip.decompress(snapshots[0].read_bytes()), content)
+
+        with self.assertNumQueries(0):
+            response, compressed = self.get_export(HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(compressed, snapshots[0].read_bytes())
+        self.assertEqual(int(response["Content-Length"]), len(compressed))
+        self.assertEqual(self.get_export()[1], content)
+
+    def test_catalog_changes_replace_the_snapshot(self):
+        _, content = self.get_export()
+        old = next(self.directory.glob("catalog-*.ndjson.gz"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            set_stats({self.kafka: {"hp": 1200.0}})
+        _, changed = self.get_export()
+        self.assertNotEqual(changed, content)
+        self.assertIn(b'"hp":1200.0', changed)
+        snapshots = list(self.directory.glob("catalog-*.ndjson.gz"))
+        self.assertEqual(len(snapshots), 1)
+        self.assertNotEqual(snapshots[0], old)
+
+        self.kafka.name = "Kafka (Trailblazer)"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kafka.save()
+        self.assertIn(b"Trailblazer", self.get_export()[1])
+
+    def test_late_exports_keep_the_newer_snapshot(self):
+        # An export of an older version finishing after the current one was written
+        current = write_snapshot("ndjson")
+        list(iter_with_snapshot(iter_export("ndjson"), "ndjson", "0" * 16))
+        self.assertEqual(list(self.directory.glob("catalog-*.ndjson.gz")), [current])
+
+    def test_interrupted_export_leaves_no_snapshot(self):
+        response = self.client.get(reverse("catalog-export"))
+        next(iter(response.streaming_content))
+        response.close()
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_not_modified(self):
+        response, _ = self.get_export()
+        response = self.client.get(
+            reverse("catalog-export"), HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(
+            reverse("catalog-export"),
+            HTTP_IF_NONE_MATCH=response["ETag"],
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    async def test_streams_under_asgi(self):
+        response = await self.async_client.get(reverse("catalog-export"))
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.splitlines()), 3)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("export_catalog", "--format", "json", stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["relics"][0]["slot"], "head")
+
+        path = self.directory / "catalog.ndjson.gz"
+        call_command(
+            "export_catalog", "-o", str(path), "--compress", "gzip", stderr=StringIO()
+        )
+        self.assertEqual(len(gzip.decompress(path.read_bytes()).splitlines()), 3)
+
+        call_command("export_catalog", "--snapshot", stdout=StringIO())
+        version = get_export_version()
+        for export_format in EXPORT_FORMATS:
+            self.assertTrue(get_snapshot_path(export_format, version).exists())
@@ -0,0 +1,136 @@
+import os
+
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from catalog.autocomplete import autocompleter
+from catalog.export import (
+    EXPORT_FORMATS,
+    NDJSONRenderer,
+    compress,
+    get_accepted_encodings,
+    get_export_version,
+    iter_export,
+    iter_snapshot,
+    iter_with_snapshot,
+    open_snapshot,
+)
+from catalog.search import search
+from catalog.serializers import (
+    AutocompleteRequestSerializer,
+    SearchRequestSerializer,
+    SearchResultSerializer,
+)
+from utils.views import get_streaming_content
+
+
+class SearchView(APIView):
+    """
+    Search characters, abilities, relics and lightcones by name, and relics and
+    lightcones by effect text. Takes ``q``, an optional comma-separated ``kind`` and
+    ``limit``.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        serializer = SearchRequestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        results = search(
+            serializer.validated_data["q"],
+            kinds=serializer.validated_data.get("kind"),
+            limit=serializer.validated_data["limit"],
+        )
+        return Response(
+            {
+                "query": serializer.validated_data["q"],
+                "results": SearchResultSerializer(results, many=True).data,
+            }
+        )
+
+
+class AutocompleteView(APIView):
+    """
+    Complete what the user typed to character, ability, relic and lightcone names,
+    from an in-process index. Takes ``q``, an optional comma-separated ``kind`` and
+    ``limit``.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        serializer = AutocompleteRequestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        # The results are plain dicts already, serializing them again would cost more
+        # than finding them
+        results = autocompleter.complete(
+            serializer.validated_data["q"],
+            kinds=serializer.validated_data.get("kind"),
+            limit=serializer.validated_data["limit"],
+        )
+        return Response({"query": serializer.validated_data["q"], "results": results})
+
+
+class CatalogExportView(APIView):
+    """
+    The whole catalog in one streamed response: characters with their abilities,
+    relics and lightcones, each with its stats. NDJSON by default, ``?format=json``
+    for a single document. Compressed with brotli or gzip when the client accepts it.
+
+    The gzipped snapshot of the current catalog version is sent as is when there is
+    one, otherwise the export is read from the database and written to the snapshot.
+    """
+
+    permission_classes = [AllowAny]
+    renderer_classes = [NDJSONRenderer, JSONRenderer]
+
+    def get(self, request):
+        export_format = request.accepted_renderer.format
+        version = get_export_version()
+        encodings = get_accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        snapshot = open_snapshot(export_format, version)
+        if snapshot is not None and "gzip" in encodings:
+            encoding = "gzip"
+        else:
+            encoding = encodings[0] if encodings else None
+
+        etag = quote_etag(f"{version}-{export_format}-{encoding or 'identity'}")
+        response = get_conditional_response(request._request, etag=etag)
+        if response is not None:
+            if snapshot is not None:
+                snapshot.close()
+            response["ETag"] = etag
+            return response
+
+        if snapshot is None:
+            content = compress(
+                iter_with_snapshot(iter_export(export_format), export_format, version),
+                encoding,
+            )
+        elif encoding == "gzip":
+            content = iter_snapshot(snapshot, decompress=False)
+        else:
+            content = compress(iter_snapshot(snapshot), encoding)
+
+        response = StreamingHttpResponse(
+            get_streaming_content(request, content),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        if snapshot is not None and encoding == "gzip":
+            response["Content-Length"] = os.fstat(snapshot.fileno()).st_size
+        if encoding:
+            response["Content-Encoding"] = encoding
+        response["ETag"] = etag
+        return response
+
+    @property
+    def default_response_headers(self):
+        headers = super().default_response_headers
+        # Replaces the Vary header of the response
+        headers["Vary"] = "Accept, Accept-Encoding"
+        return headers
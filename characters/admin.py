@@ -2,6 +2,7 @@ from django.contrib import admin
 from characters.models import Character
 from abilities.models import Ability
 from .models import Character, CharacterImage
+from utils.admin import PrevalidatedSaveAdminMixin
 
 
 class AbilityInline(admin.TabularInline):
@@ -11,7 +12,7 @@ class AbilityInline(admin.TabularInline):
 
 
 @admin.register(Character)
-class CharacterAdmin(admin.ModelAdmin):
+class CharacterAdmin(PrevalidatedSaveAdminMixin, admin.ModelAdmin):
     inlines = [AbilityInline]
     list_display = ("name", "rarity", "type")
     search_fields = ("name",)
@@ -22,4 +23,6 @@ class CharacterAdmin(admin.ModelAdmin):
         return [AbilityInline]
 
 
-admin.site.register(CharacterImage)
+@admin.register(CharacterImage)
+class CharacterImageAdmin(PrevalidatedSaveAdminMixin, admin.ModelAdmin):
+    pass
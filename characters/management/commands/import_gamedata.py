@@ -0,0 +1,62 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.gamedata import GameDataError, GameDataImporter, iter_records
+
+
+class Command(BaseCommand):
+    help = "Import characters, abilities, relics and lightcones from a JSON or JSON Lines dump."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="The dump to import, '-' reads stdin.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Records of one model validated and upserted together.",
+        )
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Roll back the whole import if any record is invalid.",
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        importer = GameDataImporter(
+            batch_size=options["batch_size"], progress=self.report_progress
+        )
+        try:
+            if options["path"] == "-":
+                importer.run(iter_records(sys.stdin), strict=options["strict"])
+            else:
+                with open(options["path"], encoding="utf-8") as stream:
+                    importer.run(iter_records(stream), strict=options["strict"])
+        except (OSError, GameDataError) as e:
+            raise CommandError(e)
+
+        for model, key, message in importer.errors[:20]:
+            self.stderr.write(f"{model} {key}: {message}")
+        if len(importer.errors) > 20:
+            self.stderr.write(f"... and {len(importer.errors) - 20} more errors")
+
+        total = sum(importer.imported.values())
+        summary = ", ".join(
+            f"{count} {name}" for name, count in importer.imported.items()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {total} of {importer.records} records ({summary or 'nothing'}) "
+                f"in {importer.elapsed:.2f}s, {total / max(importer.elapsed, 1e-9):.0f} rows/s."
+            )
+        )
+
+    def report_progress(self, importer):
+        if self.verbosity < 2:
+            return
+        total = sum(importer.imported.values())
+        self.stdout.write(
+            f"{importer.records} records read, {total} imported "
+            f"({total / max(importer.elapsed, 1e-9):.0f} rows/s)"
+        )
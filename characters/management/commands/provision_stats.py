@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from characters.default_stats import DEFAULT_STATS
+from characters.models import Character
+from stats.provisioning import provision_default_stats
+
+
+class Command(BaseCommand):
+    help = "Create default stats for characters that don't have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "ids", nargs="*", type=int, help="Only provision these character ids."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Rows per INSERT, defaults to the database's limit.",
+        )
+
+    def handle(self, *args, **options):
+        characters = Character.objects.only("pk")
+        if options["ids"]:
+            characters = characters.filter(pk__in=options["ids"])
+
+        count = provision_default_stats(
+            characters, DEFAULT_STATS, batch_size=options["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Provisioned default stats for {count} characters.")
+        )
@@ -1,37 +1,33 @@
-import os
 from django.db import models
 from django.db.models import Model
-from django.utils.text import slugify
 from rest_framework.exceptions import ValidationError
-from django.db.models.signals import post_save
-from django.dispatch import receiver
 
-from utils.mixins import HashedFileModelMixin, TimeStampedModelMixin
-from utils.model_utils import register_file_cleanup_signals
-
-
-def character_main_image_path(instance, filename):
-    """Upload path for main character image"""
-    character_name = slugify(instance.name)
-    character_path = slugify(instance.path)
-    extension = filename.split(".")[-1]
-    return os.path.join(
-        "characters", character_path, character_name, f"main.{extension}"
-    )
-
-
-def character_image_path(instance, filename):
-    """Upload path for extra character images"""
-    character_name = slugify(instance.character.name)
-    character_path = slugify(instance.character.path)
-    image_type = instance.type
-    extension = filename.split(".")[-1]
-    return os.path.join(
-        "characters", character_path, character_name, f"{image_type}.{extension}"
-    )
-
-
-class Character(TimeStampedModelMixin, Model):
+from utils.mixins import (
+    HashedFileModelMixin,
+    TimeStampedModelMixin,
+    TrackedFieldsModelMixin,
+    ValidatedModelMixin,
+)
+from utils.model_utils import (
+    register_catalog_version_signals,
+    register_file_cleanup_signals,
+)
+from utils.upload_paths import UploadPath
+
+character_main_image_path = UploadPath("characters/{path}/{name}/main.{ext}")
+
+character_image_path = UploadPath(
+    "characters/{character.path}/{character.name}/{type}.{ext}"
+)
+
+
+class Character(
+    HashedFileModelMixin,
+    TrackedFieldsModelMixin,
+    ValidatedModelMixin,
+    TimeStampedModelMixin,
+    Model,
+):
     TYPES = [
         ("fire", "Fire"),
         ("ice", "Ice"),
@@ -58,10 +54,18 @@ class Character(TimeStampedModelMixin, Model):
         (5, "5 Star"),
     ]
 
+    # Team summaries and search entries are refreshed when these change
+    tracked_fields = ("name", "type", "path", "rarity")
+
     name = models.CharField(max_length=128)
     image = models.ImageField(
         upload_to=character_main_image_path, blank=True, null=True
     )
+    image_hash = models.CharField(
+        max_length=64, blank=True, null=True, editable=False, db_index=True
+    )
+    # Width of the image for its srcset, recorded with the hash
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
     type = models.CharField(max_length=24, choices=TYPES)
     path = models.CharField(max_length=24, choices=PATHS)
     rarity = models.PositiveSmallIntegerField(choices=RARITIES)
@@ -79,27 +83,22 @@ class Character(TimeStampedModelMixin, Model):
         if not self.name.strip():
             raise ValidationError("Name cannot be empty.")
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
-
-
-# Add a post_save signal to handle hashing after the file is saved
-# @receiver(post_save, sender=Character)
-# def update_character_hash(sender, instance, created, **kwargs):
-#     # Only generate hash if image exists and hash doesn't
-#     if instance.image and not instance.image_hash:
-#         try:
-#             # Generate hash
-#             hash_value = instance.generate_file_hash("image")
-#             # Update only the hash field to avoid recursion
-#             if hash_value:
-#                 type(instance).objects.filter(pk=instance.pk).update(image_hash=hash_value)
-#         except Exception as e:
-#             logger.error(f"Error updating hash for {instance}: {e}")
-
-
-class CharacterImage(TimeStampedModelMixin, Model):
+    class Meta:
+        unique_together = ("name", "path")
+        indexes = [
+            models.Index(fields=["type", "id"], name="character_type_id_idx"),
+            models.Index(fields=["path", "id"], name="character_path_id_idx"),
+            models.Index(fields=["rarity", "id"], name="character_rarity_id_idx"),
+        ]
+
+
+class CharacterImage(
+    HashedFileModelMixin,
+    TrackedFieldsModelMixin,
+    ValidatedModelMixin,
+    TimeStampedModelMixin,
+    Model,
+):
     IMAGE_TYPES = [
         ("full_cg", "Full CG"),
         ("headshot", "Headshot"),
@@ -112,6 +111,9 @@ class CharacterImage(TimeStampedModelMixin, Model):
         Character, on_delete=models.CASCADE, related_name="images"
     )
     image = models.ImageField(upload_to=character_image_path)
+    image_hash = models.CharField(
+        max_length=64, blank=True, null=True, editable=False, db_index=True
+    )
     type = models.CharField(max_length=16, choices=IMAGE_TYPES, default="extra")
 
     def __str__(self):
@@ -121,24 +123,7 @@ class CharacterImage(TimeStampedModelMixin, Model):
         verbose_name = "Character Image"
         verbose_name_plural = "Character Images"
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
-
-
-# Do the same for CharacterImage
-# @receiver(post_save, sender=CharacterImage)
-# def update_character_image_hash(sender, instance, created, **kwargs):
-#     if instance.image and not instance.image_hash:
-#         try:
-#             hash_value = instance.generate_file_hash("image")
-#             if hash_value:
-#                 type(instance).objects.filter(pk=instance.pk).update(
-#                     image_hash=hash_value
-#                 )
-#         except Exception as e:
-#             logger.error(f"Error updating hash for {instance}: {e}")
-
 
 register_file_cleanup_signals(Character, ["image"])
 register_file_cleanup_signals(CharacterImage, ["image"])
+register_catalog_version_signals(Character)
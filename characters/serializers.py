@@ -1,11 +1,21 @@
 from rest_framework import serializers
 from characters.models import Character
 from abilities.serializers import AbilitySerializer
+from utils.serializers import ImageSrcsetField
 
 
 class CharacterSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source="image")
     abilities = AbilitySerializer(many=True, read_only=True)
 
     class Meta:
         model = Character
-        fields = ["name", "image", "type", "path", "rarity", "abilities"]
+        fields = [
+            "name",
+            "image",
+            "image_srcset",
+            "type",
+            "path",
+            "rarity",
+            "abilities",
+        ]
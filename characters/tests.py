@@ -1,6 +1,18 @@
+from io import StringIO
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.exceptions import ValidationError
 from rest_framework.test import APITestCase
+from abilities.models import Ability
+from characters.default_stats import DEFAULT_STATS
 from characters.models import Character
+from stats.models import Stat, StatVector
+from stats.provisioning import provision_default_stats
 from users.models import SilverRailUser
 from rest_framework import status
 from django.urls import reverse
@@ -66,6 +78,7 @@ class CharacterModelTests(APITestCase):
 class CharacterAPITests(APITestCase):
 
     def setUp(self):
+        cache.clear()
         self.character = Character.objects.create(
             name="Hero", type="fire", path="destruction", rarity=5
         )
@@ -147,3 +160,111 @@ class CharacterAPITests(APITestCase):
         response = self.client.delete(self.character_url)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(Character.objects.count(), 1)
+
+
+class CharacterQueryCountTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.character_list_url = reverse("character-list")
+
+    @staticmethod
+    def create_characters(count, abilities_per_character):
+        start = Character.objects.count()
+        for i in range(start, start + count):
+            character = Character.objects.create(
+                name=f"Hero {i}", type="fire", path="destruction", rarity=5
+            )
+            for j in range(abilities_per_character):
+                Ability.objects.create(
+                    character=character, name=f"Ability {j}", type="skill"
+                )
+
+    def test_list_query_count_is_constant(self):
+        # One conditional GET aggregate, one query for the characters and one for
+        # all of their abilities
+        self.create_characters(1, 1)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.character_list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_characters(10, 5)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.character_list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 11)
+        self.assertEqual(len(response.data["results"][-1]["abilities"]), 5)
+
+    def test_retrieve_query_count_is_constant(self):
+        self.create_characters(1, 8)
+        character = Character.objects.get()
+        url = reverse("character-detail", kwargs={"pk": character.pk})
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["abilities"]), 8)
+
+    def test_list_only_loads_serialized_columns(self):
+        self.create_characters(1, 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.character_list_url)
+        _, character_query, ability_query = (q["sql"] for q in queries.captured_queries)
+        self.assertNotIn('"modified"', character_query)
+        self.assertNotIn('"energy_cost"', ability_query)
+        self.assertIn('"character_id"', ability_query)
+
+
+class CharacterStatProvisioningTests(TestCase):
+
+    @staticmethod
+    def bulk_create_characters(count):
+        return Character.objects.bulk_create(
+            [
+                Character(name=f"Hero {i}", type="fire", path="destruction", rarity=5)
+                for i in range(count)
+            ]
+        )
+
+    def test_new_character_gets_default_stats(self):
+        character = Character.objects.create(
+            name="Hero", type="fire", path="destruction", rarity=5
+        )
+        stats = Stat.objects.filter(object_id=character.pk)
+        self.assertEqual(stats.count(), len(DEFAULT_STATS))
+        self.assertEqual(stats.get(stat_type="critdmg").stat_category, "advanced")
+
+    def test_many_characters_are_provisioned_with_one_insert(self):
+        characters = self.bulk_create_characters(5)
+        # SAVEPOINT, SELECT, INSERT and RELEASE SAVEPOINT, the content type is cached
+        ContentType.objects.get_for_model(Character)
+        with self.assertNumQueries(4):
+            self.assertEqual(provision_default_stats(characters, DEFAULT_STATS), 5)
+        self.assertEqual(Stat.objects.count(), 5 * len(DEFAULT_STATS))
+
+    def test_provisioning_is_idempotent(self):
+        characters = self.bulk_create_characters(3)
+        self.assertEqual(provision_default_stats(characters[:2], DEFAULT_STATS), 2)
+        Stat.objects.filter(stat_type="atk").update(value=500)
+        self.assertEqual(provision_default_stats(characters, DEFAULT_STATS), 1)
+        self.assertEqual(Stat.objects.count(), 3 * len(DEFAULT_STATS))
+        self.assertEqual(
+            Stat.objects.get(object_id=characters[0].pk, stat_type="atk").value, 500
+        )
+
+    @override_settings(STAT_STORAGE="packed")
+    def test_packed_storage_gets_one_vector_per_character(self):
+        characters = self.bulk_create_characters(3)
+        self.assertEqual(provision_default_stats(characters, DEFAULT_STATS), 3)
+        self.assertEqual(provision_default_stats(characters, DEFAULT_STATS), 0)
+        self.assertEqual(StatVector.objects.count(), 3)
+        self.assertEqual(Stat.objects.count(), 0)
+
+    def test_provision_stats_command(self):
+        characters = self.bulk_create_characters(4)
+        call_command("provision_stats", characters[0].pk, stdout=StringIO())
+        self.assertEqual(Stat.objects.count(), len(DEFAULT_STATS))
+        stdout = StringIO()
+        call_command("provision_stats", stdout=stdout)
+        self.assertEqual(Stat.objects.count(), 4 * len(DEFAULT_STATS))
+        self.assertIn("for 3 characters", stdout.getvalue())
@@ -8,4 +8,14 @@ router.register(r"characters", views.CharacterViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
+    path(
+        "async/characters/",
+        views.AsyncCharacterView.as_view(),
+        name="character-async-list",
+    ),
+    path(
+        "async/characters/<int:pk>/",
+        views.AsyncCharacterView.as_view(),
+        name="character-async-detail",
+    ),
 ]
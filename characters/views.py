@@ -3,11 +3,28 @@ from rest_framework.permissions import AllowAny, IsAdminUser
 
 from characters.models import Character
 from characters.serializers import CharacterSerializer
+from utils.views import (
+    AsyncReadOnlyView,
+    CatalogCacheMixin,
+    ConditionalGetMixin,
+    PrefetchQuerysetMixin,
+    PrevalidatedSaveMixin,
+    RowListMixin,
+)
 
 
-class CharacterViewSet(viewsets.ModelViewSet):
+class CharacterViewSet(
+    ConditionalGetMixin,
+    CatalogCacheMixin,
+    RowListMixin,
+    PrefetchQuerysetMixin,
+    PrevalidatedSaveMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Character.objects.all()
     serializer_class = CharacterSerializer
+    conditional_relations = ("abilities",)
+    filter_fields = ("type", "path", "rarity")
 
     def get_permissions(self):
         if self.action in ["create", "update", "partial_update", "destroy"]:
@@ -15,3 +32,9 @@ class CharacterViewSet(viewsets.ModelViewSet):
         else:
             self.permission_classes = [AllowAny]
         return [permission() for permission in self.permission_classes]
+
+
+class AsyncCharacterView(AsyncReadOnlyView):
+    queryset = Character.objects.all()
+    serializer_class = CharacterSerializer
+    filter_fields = CharacterViewSet.filter_fields
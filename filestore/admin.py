@@ -0,0 +1,17 @@
+from django.contrib import admin
+from filestore.models import FileReference, StorageJob
+
+
+@admin.register(FileReference)
+class FileReferenceAdmin(admin.ModelAdmin):
+    list_display = ("path", "refcount", "released")
+    search_fields = ("path",)
+    readonly_fields = ("path", "refcount", "released")
+
+
+@admin.register(StorageJob)
+class StorageJobAdmin(admin.ModelAdmin):
+    list_display = ("kind", "status", "attempts", "run_after", "finished")
+    list_filter = ("kind", "status")
+    search_fields = ("idempotency_key",)
+    readonly_fields = ("created", "finished", "locked_at", "last_error")
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class FilestoreConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "filestore"
+
+    def ready(self):
+        import filestore.handlers
@@ -0,0 +1,54 @@
+"""
+Handlers for the built-in storage job kinds.
+"""
+
+from django.apps import apps
+from django.utils import timezone
+
+from filestore.jobs import register_job_handler
+from filestore.models import FileReference
+from filestore.references import get_grace_period, sweep_released_files
+from utils.images import generate_derivatives
+
+
+@register_job_handler("delete_files")
+def delete_files(jobs):
+    """Delete released files, in one batched storage request for the whole group."""
+    paths = {job.payload["path"] for job in jobs}
+    sweep_released_files(paths=paths)
+
+    # Rows a sweep couldn't delete are still there, rows referenced again are kept on purpose
+    remaining = set(
+        FileReference.objects.filter(
+            path__in=paths,
+            refcount=0,
+            released__lte=timezone.now() - get_grace_period(),
+        ).values_list("path", flat=True)
+    )
+    return {
+        job.pk: f"Couldn't delete {job.payload['path']}"
+        for job in jobs
+        if job.payload["path"] in remaining
+    }
+
+
+@register_job_handler("hash_file")
+def hash_file(jobs):
+    """Record the hash of stored files that were assigned without one."""
+    for job in jobs:
+        model_class = apps.get_model(job.payload["model"])
+        instance = model_class._default_manager.filter(pk=job.payload["pk"]).first()
+        # Rows deleted since the job was enqueued have nothing left to hash
+        if instance is not None:
+            instance.update_file_hashes(commit=True)
+
+
+@register_job_handler("image_derivatives")
+def image_derivatives(jobs):
+    """Render the derivatives of new images, resized in a process pool."""
+    failed = set(generate_derivatives(job.payload["path"] for job in jobs))
+    return {
+        job.pk: f"Couldn't render derivatives of {job.payload['path']}"
+        for job in jobs
+        if job.payload["path"] in failed
+    }
@@ -0,0 +1,210 @@
+"""
+A database-backed queue for storage side effects.
+
+Jobs are rows in ``StorageJob``, enqueued in the same transaction as the change that
+needs them, and run in batches by ``manage.py run_jobs``. Handlers are registered per
+job kind and receive every claimed job of their kind at once:
+
+    @register_job_handler("delete_files")
+    def delete_files(jobs):
+        ...
+        return {job.pk: "error message" for job in failed_jobs}
+"""
+
+import logging
+import random
+from datetime import timedelta
+from itertools import groupby
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from filestore.models import StorageJob
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS: Dict[str, Callable[[List[StorageJob]], Optional[Dict[int, str]]]] = {}
+
+
+def register_job_handler(kind: str):
+    """
+    Register the handler of a job kind.
+
+    The handler receives a list of jobs and returns the errors of the jobs that failed,
+    keyed by job id. Raising fails the whole batch.
+
+    Args:
+        kind (str): The job kind.
+    """
+
+    def decorator(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+
+    return decorator
+
+
+def enqueue_job(kind: str, payload=None, key=None, run_after=None) -> StorageJob:
+    """
+    Add a job to the queue.
+
+    Args:
+        kind (str): The job kind, a handler must be registered for it.
+        payload (dict, optional): JSON data for the handler.
+        key (str, optional): An idempotency key. If a job with the same key was ever
+            enqueued, that job is returned and nothing is added.
+        run_after (datetime, optional): Don't run the job before this time.
+
+    Returns:
+        StorageJob: The new or existing job.
+    """
+    defaults = {
+        "kind": kind,
+        "payload": payload or {},
+        "run_after": run_after or timezone.now(),
+        "max_attempts": settings.JOB_MAX_ATTEMPTS,
+    }
+    if key is None:
+        return StorageJob.objects.create(**defaults)
+    job, _ = StorageJob.objects.get_or_create(idempotency_key=key, defaults=defaults)
+    return job
+
+
+def enqueue_jobs(kind: str, payloads: Iterable[dict], keys=None) -> int:
+    """
+    Add many jobs of one kind with a single insert, skipping known idempotency keys.
+
+    Args:
+        kind (str): The job kind.
+        payloads (Iterable[dict]): One payload per job.
+        keys (Iterable[str], optional): One idempotency key per job.
+
+    Returns:
+        int: How many jobs were passed in.
+    """
+    now = timezone.now()
+    payloads = list(payloads)
+    keys = list(keys) if keys is not None else [None] * len(payloads)
+    StorageJob.objects.bulk_create(
+        [
+            StorageJob(
+                kind=kind,
+                payload=payload,
+                idempotency_key=key,
+                run_after=now,
+                max_attempts=settings.JOB_MAX_ATTEMPTS,
+            )
+            for payload, key in zip(payloads, keys)
+        ],
+        ignore_conflicts=True,
+    )
+    return len(payloads)
+
+
+def get_retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter, capped at ``JOB_RETRY_MAX_DELAY_SECONDS``."""
+    delay = min(
+        settings.JOB_RETRY_BASE_DELAY_SECONDS * 2 ** (attempts - 1),
+        settings.JOB_RETRY_MAX_DELAY_SECONDS,
+    )
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_jobs(batch_size=100, kinds=None) -> List[StorageJob]:
+    """
+    Claim due jobs for this worker.
+
+    Rows are locked with ``SELECT ... FOR UPDATE SKIP LOCKED`` where supported, so
+    workers never claim the same job. Jobs whose worker died are claimed again once
+    their lock is older than ``JOB_LOCK_TIMEOUT_SECONDS``.
+
+    Args:
+        batch_size (int): The maximum number of jobs to claim.
+        kinds (Iterable[str], optional): Only claim jobs of these kinds.
+
+    Returns:
+        List[StorageJob]: The claimed jobs, now running.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS)
+    with transaction.atomic():
+        queryset = StorageJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status="pending", run_after__lte=now)
+            | Q(status="running", locked_at__lte=stale)
+        )
+        if kinds:
+            queryset = queryset.filter(kind__in=kinds)
+        jobs = list(queryset.order_by("run_after", "pk")[:batch_size])
+        StorageJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status="running", locked_at=now, attempts=F("attempts") + 1
+        )
+    for job in jobs:
+        job.status = "running"
+        job.locked_at = now
+        job.attempts += 1
+    return jobs
+
+
+def finish_jobs(jobs: List[StorageJob], errors: Dict[int, str]):
+    """Mark claimed jobs done, or schedule a retry for those with an error."""
+    now = timezone.now()
+    done = [job.pk for job in jobs if job.pk not in errors]
+    StorageJob.objects.filter(pk__in=done).update(
+        status="done", finished=now, locked_at=None, last_error=""
+    )
+    for job in jobs:
+        if job.pk not in errors:
+            continue
+        if job.attempts >= job.max_attempts:
+            logger.error(f"Job {job} failed for good: {errors[job.pk]}")
+            updates = {"status": "failed", "finished": now}
+        else:
+            updates = {
+                "status": "pending",
+                "run_after": now + get_retry_delay(job.attempts),
+            }
+        StorageJob.objects.filter(pk=job.pk).update(
+            locked_at=None, last_error=errors[job.pk], **updates
+        )
+
+
+def run_jobs(batch_size=100, kinds=None) -> Dict[str, int]:
+    """
+    Claim one batch of due jobs and run them, one handler call per job kind.
+
+    Args:
+        batch_size (int): The maximum number of jobs to run.
+        kinds (Iterable[str], optional): Only run jobs of these kinds.
+
+    Returns:
+        dict: How many jobs ``succeeded`` and ``failed``.
+    """
+    jobs = claim_jobs(batch_size, kinds)
+    errors = {}
+    for kind, group in groupby(sorted(jobs, key=lambda j: j.kind), lambda j: j.kind):
+        group = list(group)
+        handler = JOB_HANDLERS.get(kind)
+        if handler is None:
+            errors.update(
+                (job.pk, f"No handler for job kind {kind!r}") for job in group
+            )
+            continue
+        try:
+            errors.update(handler(group) or {})
+        except Exception as e:
+            logger.exception(f"Error running {len(group)} {kind} jobs")
+            errors.update((job.pk, repr(e)) for job in group)
+
+    finish_jobs(jobs, errors)
+    return {"succeeded": len(jobs) - len(errors), "failed": len(errors)}
+
+
+def purge_finished_jobs(older_than: timedelta) -> int:
+    """Delete done and failed jobs that finished before ``older_than`` ago."""
+    deleted, _ = StorageJob.objects.filter(
+        status__in=["done", "failed"], finished__lte=timezone.now() - older_than
+    ).delete()
+    return deleted
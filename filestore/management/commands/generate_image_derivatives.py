@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import ImageField
+
+from filestore.references import FILE_FIELDS
+from utils.images import generate_derivatives
+
+
+class Command(BaseCommand):
+    help = "Render the resized derivatives of every stored image, using all cores."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Worker processes, defaults to IMAGE_DERIVATIVE_WORKERS.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Render images whose derivatives already exist.",
+        )
+
+    def handle(self, *args, **options):
+        names = set()
+        for model_class, field_name in FILE_FIELDS:
+            if not isinstance(model_class._meta.get_field(field_name), ImageField):
+                continue
+            names.update(
+                model_class._default_manager.exclude(**{f"{field_name}__isnull": True})
+                .exclude(**{field_name: ""})
+                .values_list(field_name, flat=True)
+                .iterator()
+            )
+
+        start = time.perf_counter()
+        failed = generate_derivatives(
+            sorted(names), workers=options["workers"], force=options["force"]
+        )
+        elapsed = time.perf_counter() - start
+
+        for name in failed:
+            self.stderr.write(f"Couldn't render {name}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rendered derivatives of {len(names) - len(failed)} of {len(names)} images in {elapsed:.1f}s."
+            )
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from filestore.references import rebuild_file_references
+
+
+class Command(BaseCommand):
+    help = "Recount the file reference table from every model's file fields."
+
+    def handle(self, *args, **options):
+        count = rebuild_file_references()
+        self.stdout.write(self.style.SUCCESS(f"Counted references to {count} files."))
@@ -0,0 +1,67 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from filestore.jobs import purge_finished_jobs, run_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued storage jobs: file deletions, hashing and image derivatives."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=100, help="Jobs claimed per batch."
+        )
+        parser.add_argument(
+            "--kind",
+            action="append",
+            dest="kinds",
+            help="Only run jobs of this kind, can be repeated.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no job is due instead of polling.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before polling again when no job is due.",
+        )
+        parser.add_argument(
+            "--purge-days",
+            type=int,
+            default=7,
+            help="Delete finished jobs older than this on startup.",
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_finished_jobs(timedelta(days=options["purge_days"]))
+        if purged:
+            self.stdout.write(f"Purged {purged} finished jobs.")
+
+        totals = {"succeeded": 0, "failed": 0}
+        try:
+            while True:
+                counts = run_jobs(options["batch_size"], options["kinds"])
+                for key, value in counts.items():
+                    totals[key] += value
+                if counts["succeeded"] or counts["failed"]:
+                    if options["verbosity"] >= 2:
+                        self.stdout.write(
+                            f"{counts['succeeded']} jobs succeeded, {counts['failed']} failed"
+                        )
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{totals['succeeded']} jobs succeeded, {totals['failed']} failed."
+            )
+        )
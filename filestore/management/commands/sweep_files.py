@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from filestore.references import sweep_released_files
+
+
+class Command(BaseCommand):
+    help = "Delete stored files that no row has referred to for the grace period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Files deleted per storage request.",
+        )
+        parser.add_argument(
+            "--grace-seconds",
+            type=int,
+            default=None,
+            help="Only delete files released this long ago, defaults to FILE_SWEEP_GRACE_SECONDS.",
+        )
+
+    def handle(self, *args, **options):
+        grace_period = None
+        if options["grace_seconds"] is not None:
+            grace_period = timedelta(seconds=options["grace_seconds"])
+
+        count = sweep_released_files(
+            batch_size=options["batch_size"], grace_period=grace_period
+        )
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} unreferenced files."))
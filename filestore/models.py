@@ -0,0 +1,61 @@
+from django.db import models
+from django.db.models import Model
+from django.utils import timezone
+
+
+class FileReference(Model):
+    """
+    How many rows refer to a stored file, across every model with file cleanup signals.
+    Files whose count drops to zero are deleted by the next sweep once ``released`` is
+    older than the grace period.
+    """
+
+    path = models.CharField(max_length=255, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+    released = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.path} ({self.refcount})"
+
+    class Meta:
+        verbose_name = "File Reference"
+        verbose_name_plural = "File References"
+        indexes = [models.Index(fields=["refcount", "released"])]
+
+
+class StorageJob(Model):
+    """
+    A deferred storage operation, run by the ``run_jobs`` worker.
+
+    Jobs with the same ``idempotency_key`` are only enqueued once. Failed jobs are
+    retried with exponential backoff until ``max_attempts`` is reached.
+    """
+
+    STATUSES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    kind = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict, blank=True)
+    idempotency_key = models.CharField(
+        max_length=255, unique=True, null=True, blank=True
+    )
+    status = models.CharField(max_length=16, choices=STATUSES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    class Meta:
+        verbose_name = "Storage Job"
+        verbose_name_plural = "Storage Jobs"
+        indexes = [models.Index(fields=["status", "run_after"])]
@@ -0,0 +1,233 @@
+"""
+Reference counting for stored files.
+
+The file cleanup signals from ``utils.model_utils.register_file_cleanup_signals`` add
+and release references as rows gain, change or lose files. A released file is never
+deleted inside the request: releasing the last reference enqueues a ``delete_files``
+job for after the grace period, and the ``sweep_files`` command catches anything left.
+"""
+
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from filestore.jobs import enqueue_job
+from filestore.models import FileReference
+from utils.images import get_derivative_names
+
+logger = logging.getLogger(__name__)
+
+# (model, field name) of every file field with cleanup signals
+FILE_FIELDS = []
+
+# S3 DeleteObjects accepts at most 1000 keys per request
+S3_DELETE_BATCH_SIZE = 1000
+
+
+def get_grace_period() -> timedelta:
+    return timedelta(seconds=settings.FILE_SWEEP_GRACE_SECONDS)
+
+
+def add_file_reference(path: str):
+    """
+    Count one more reference to a file.
+
+    Args:
+        path (str): The storage name of the file.
+    """
+    if FileReference.objects.filter(path=path).update(
+        refcount=F("refcount") + 1, released=None
+    ):
+        return
+    try:
+        with transaction.atomic():
+            FileReference.objects.create(path=path, refcount=1)
+    except IntegrityError:
+        # Created concurrently, count on the existing row
+        FileReference.objects.filter(path=path).update(
+            refcount=F("refcount") + 1, released=None
+        )
+
+
+def release_file_reference(path: str):
+    """
+    Count one less reference to a file, queueing its deletion when none are left.
+
+    Args:
+        path (str): The storage name of the file.
+    """
+    updated = FileReference.objects.filter(path=path, refcount__gt=0).update(
+        refcount=F("refcount") - 1,
+        released=Case(
+            When(refcount=1, then=Value(timezone.now())), default=F("released")
+        ),
+    )
+    if not updated:
+        return
+
+    reference = (
+        FileReference.objects.filter(path=path, refcount=0)
+        .values("pk", "released")
+        .first()
+    )
+    if reference:
+        # One job per release, a file that is referenced and released again gets a new one
+        released = reference["released"]
+        enqueue_job(
+            "delete_files",
+            {"path": path},
+            key=f"delete_files:{reference['pk']}:{released.timestamp()}",
+            run_after=released + get_grace_period(),
+        )
+
+
+def get_file_refcount(path: str) -> int:
+    """
+    Get how many rows refer to a file with one indexed lookup.
+
+    Args:
+        path (str): The storage name of the file.
+
+    Returns:
+        int: The reference count, 0 for unknown files.
+    """
+    return (
+        FileReference.objects.filter(path=path)
+        .values_list("refcount", flat=True)
+        .first()
+        or 0
+    )
+
+
+def is_file_referenced(path: str) -> bool:
+    """Check if any row refers to a file."""
+    return get_file_refcount(path) > 0
+
+
+def delete_from_storage(storage, names):
+    """
+    Delete files from a storage, with one request per 1000 files on S3.
+
+    Args:
+        storage (Storage): The storage holding the files.
+        names (List[str]): The storage names to delete.
+
+    Returns:
+        List[str]: The names that couldn't be deleted.
+    """
+    if not (hasattr(storage, "bucket") and hasattr(storage, "_normalize_name")):
+        failed = []
+        for name in names:
+            try:
+                storage.delete(name)
+            except Exception as e:
+                logger.error(f"Error deleting file {name}: {e}")
+                failed.append(name)
+        return failed
+
+    from storages.utils import clean_name
+
+    keys = {storage._normalize_name(clean_name(name)): name for name in names}
+    key_list = list(keys)
+    failed = []
+    for start in range(0, len(key_list), S3_DELETE_BATCH_SIZE):
+        batch = key_list[start : start + S3_DELETE_BATCH_SIZE]
+        response = storage.bucket.delete_objects(
+            Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+        )
+        for error in response.get("Errors", []):
+            logger.error(f"Error deleting file {error['Key']}: {error.get('Message')}")
+            failed.append(keys[error["Key"]])
+    return failed
+
+
+def sweep_released_files(
+    batch_size=1000, grace_period=None, storage=None, paths=None
+) -> int:
+    """
+    Delete files, with their image derivatives, that no row has referred to for the
+    whole grace period.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` where supported, so
+    several sweeps can run at once, and a row that gained a reference meanwhile is kept.
+
+    Args:
+        batch_size (int): How many files to delete per storage request and transaction.
+        grace_period (timedelta, optional): Defaults to ``FILE_SWEEP_GRACE_SECONDS``.
+        storage (Storage, optional): Defaults to the default storage.
+        paths (Iterable[str], optional): Only consider these files.
+
+    Returns:
+        int: How many files were deleted.
+    """
+    storage = storage or default_storage
+    if grace_period is None:
+        grace_period = get_grace_period()
+    cutoff = timezone.now() - grace_period
+    references = FileReference.objects.filter(refcount=0, released__lte=cutoff)
+    if paths is not None:
+        references = references.filter(path__in=list(paths))
+
+    deleted = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                references.select_for_update(skip_locked=True)
+                .filter(pk__gt=last_pk)
+                .order_by("pk")[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            paths = [r.path for r in batch]
+            # Derivatives go with their original, most files have none and deleting
+            # missing files is a no-op
+            derivatives = [
+                name for path in paths for name in get_derivative_names(path)
+            ]
+            failed = set(delete_from_storage(storage, paths + derivatives))
+            done = [r.pk for r in batch if r.path not in failed]
+            FileReference.objects.filter(pk__in=done, refcount=0).delete()
+            deleted += len(done)
+    return deleted
+
+
+def rebuild_file_references():
+    """
+    Recount every file reference from the rows of the registered file fields.
+
+    Files no row refers to anymore are released, so the next sweep deletes them.
+
+    Returns:
+        int: How many distinct files are referenced.
+    """
+    counts = Counter()
+    for model_class, field_name in FILE_FIELDS:
+        counts.update(
+            model_class._default_manager.exclude(**{f"{field_name}__isnull": True})
+            .exclude(**{field_name: ""})
+            .values_list(field_name, flat=True)
+            .iterator()
+        )
+
+    now = timezone.now()
+    with transaction.atomic():
+        FileReference.objects.filter(refcount__gt=0).update(refcount=0, released=now)
+        FileReference.objects.bulk_create(
+            [
+                FileReference(path=path, refcount=count, released=None)
+                for path, count in counts.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["path"],
+            update_fields=["refcount", "released"],
+        )
+    return len(counts)
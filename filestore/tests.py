@@ -0,0 +1,280 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage, default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from characters.models import Character, CharacterImage
+from filestore.jobs import (
+    claim_jobs,
+    enqueue_job,
+    enqueue_jobs,
+    register_job_handler,
+    run_jobs,
+)
+from filestore.models import FileReference, StorageJob
+from filestore.references import (
+    add_file_reference,
+    delete_from_storage,
+    get_file_refcount,
+    rebuild_file_references,
+    release_file_reference,
+    sweep_released_files,
+)
+from utils.cache import get_catalog_version
+
+IN_MEMORY_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "staticfiles": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+}
+NO_GRACE = timedelta(0)
+
+
+class FileReferenceTests(TestCase):
+
+    def test_add_and_release(self):
+        add_file_reference("a.png")
+        add_file_reference("a.png")
+        self.assertEqual(get_file_refcount("a.png"), 2)
+
+        release_file_reference("a.png")
+        reference = FileReference.objects.get(path="a.png")
+        self.assertEqual(reference.refcount, 1)
+        self.assertIsNone(reference.released)
+
+        release_file_reference("a.png")
+        reference.refresh_from_db()
+        self.assertEqual(reference.refcount, 0)
+        self.assertIsNotNone(reference.released)
+
+        # Releasing more than was added never goes negative
+        release_file_reference("a.png")
+        self.assertEqual(get_file_refcount("a.png"), 0)
+
+    def test_new_reference_cancels_release(self):
+        add_file_reference("a.png")
+        release_file_reference("a.png")
+        add_file_reference("a.png")
+        reference = FileReference.objects.get(path="a.png")
+        self.assertEqual(reference.refcount, 1)
+        self.assertIsNone(reference.released)
+
+    def test_unknown_files_have_no_references(self):
+        self.assertEqual(get_file_refcount("missing.png"), 0)
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class FileReferenceSignalTests(TestCase):
+
+    def setUp(self):
+        self.character = Character.objects.create(
+            name="Hero",
+            type="fire",
+            path="destruction",
+            rarity=5,
+            image=ContentFile(b"main", name="main.png"),
+        )
+
+    def test_references_follow_file_changes(self):
+        old_name = self.character.image.name
+        self.assertEqual(get_file_refcount(old_name), 1)
+
+        self.character.image = ContentFile(b"new", name="new.png")
+        self.character.save()
+        self.assertEqual(get_file_refcount(old_name), 0)
+        self.assertEqual(get_file_refcount(self.character.image.name), 1)
+
+    def test_saving_without_file_changes_writes_no_references(self):
+        with mock.patch("utils.model_utils.add_file_reference") as add:
+            self.character.rarity = 4
+            self.character.save()
+        add.assert_not_called()
+        self.assertEqual(get_file_refcount(self.character.image.name), 1)
+
+    def test_deletes_are_queued_for_the_sweep(self):
+        name = self.character.image.name
+        with mock.patch.object(InMemoryStorage, "delete") as delete:
+            self.character.delete()
+        delete.assert_not_called()
+        self.assertTrue(default_storage.exists(name))
+
+        self.assertEqual(sweep_released_files(grace_period=NO_GRACE), 1)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(FileReference.objects.exists())
+
+    def test_sweep_respects_the_grace_period(self):
+        name = self.character.image.name
+        self.character.delete()
+        self.assertEqual(sweep_released_files(grace_period=timedelta(hours=1)), 0)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_cascaded_deletes_release_files(self):
+        image = CharacterImage.objects.create(
+            character=self.character,
+            type="icon",
+            image=ContentFile(b"icon", name="icon.png"),
+        )
+        self.character.delete()
+        self.assertEqual(get_file_refcount(image.image.name), 0)
+        self.assertEqual(sweep_released_files(grace_period=NO_GRACE), 2)
+
+    def test_rebuild_recounts_references(self):
+        name = self.character.image.name
+        FileReference.objects.all().delete()
+        FileReference.objects.create(path="orphan.png", refcount=3)
+
+        out = StringIO()
+        call_command("rebuild_file_references", stdout=out)
+        self.assertEqual(get_file_refcount(name), 1)
+        self.assertEqual(get_file_refcount("orphan.png"), 0)
+        self.assertIn("1 files", out.getvalue())
+
+
+class DeleteFromStorageTests(TestCase):
+
+    def test_s3_deletes_are_batched(self):
+        storage = mock.Mock()
+        storage._normalize_name = lambda name: f"media/{name}"
+        storage.bucket.delete_objects.side_effect = [
+            {"Errors": [{"Key": "media/file-3.png", "Message": "Access Denied"}]},
+            {},
+        ]
+        names = [f"file-{i}.png" for i in range(1500)]
+
+        with self.assertLogs("filestore.references", "ERROR"):
+            failed = delete_from_storage(storage, names)
+
+        self.assertEqual(storage.bucket.delete_objects.call_count, 2)
+        first_batch = storage.bucket.delete_objects.call_args_list[0].kwargs["Delete"]
+        self.assertEqual(len(first_batch["Objects"]), 1000)
+        self.assertEqual(first_batch["Objects"][0], {"Key": "media/file-0.png"})
+        self.assertEqual(failed, ["file-3.png"])
+
+    def test_failed_deletes_are_kept_for_the_next_sweep(self):
+        add_file_reference("a.png")
+        release_file_reference("a.png")
+        with mock.patch(
+            "filestore.references.delete_from_storage", return_value=["a.png"]
+        ):
+            self.assertEqual(sweep_released_files(grace_period=NO_GRACE), 0)
+        self.assertTrue(FileReference.objects.filter(path="a.png").exists())
+
+
+class StorageJobTests(TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        @register_job_handler("test")
+        def handler(jobs):
+            self.calls.append([job.payload["n"] for job in jobs])
+            return {job.pk: "odd" for job in jobs if job.payload["n"] % 2}
+
+    def test_idempotency_keys_enqueue_once(self):
+        first = enqueue_job("test", {"n": 0}, key="same")
+        second = enqueue_job("test", {"n": 2}, key="same")
+        self.assertEqual(first.pk, second.pk)
+        enqueue_jobs("test", [{"n": 0}, {"n": 2}], keys=["same", "other"])
+        self.assertEqual(StorageJob.objects.count(), 2)
+
+    def test_jobs_of_a_kind_run_in_one_batch(self):
+        enqueue_jobs("test", [{"n": 0}, {"n": 2}, {"n": 4}])
+        self.assertEqual(run_jobs(), {"succeeded": 3, "failed": 0})
+        self.assertEqual(self.calls, [[0, 2, 4]])
+        self.assertFalse(StorageJob.objects.exclude(status="done").exists())
+
+    def test_failed_jobs_are_retried_with_backoff(self):
+        job = enqueue_job("test", {"n": 1})
+        self.assertEqual(run_jobs(), {"succeeded": 0, "failed": 1})
+        job.refresh_from_db()
+        self.assertEqual(job.status, "pending")
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.last_error, "odd")
+        self.assertGreater(job.run_after, timezone.now())
+
+        # Not due yet
+        self.assertEqual(run_jobs(), {"succeeded": 0, "failed": 0})
+
+    def test_jobs_fail_after_max_attempts(self):
+        job = enqueue_job("test", {"n": 1})
+        StorageJob.objects.filter(pk=job.pk).update(attempts=job.max_attempts - 1)
+        with self.assertLogs("filestore.jobs", "ERROR"):
+            run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIsNotNone(job.finished)
+
+    def test_unknown_kinds_fail(self):
+        job = enqueue_job("missing")
+        run_jobs()
+        job.refresh_from_db()
+        self.assertIn("No handler", job.last_error)
+
+    def test_stale_locks_are_claimed_again(self):
+        job = enqueue_job("test", {"n": 0})
+        self.assertEqual(len(claim_jobs()), 1)
+        self.assertEqual(claim_jobs(), [])
+
+        StorageJob.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual([j.pk for j in claim_jobs()], [job.pk])
+
+    def test_run_jobs_command(self):
+        enqueue_jobs("test", [{"n": 0}, {"n": 1}])
+        out = StringIO()
+        call_command("run_jobs", "--once", "--kind", "test", stdout=out)
+        self.assertIn("1 jobs succeeded, 1 failed", out.getvalue())
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES, FILE_SWEEP_GRACE_SECONDS=0)
+class StorageJobHandlerTests(TestCase):
+
+    def create_character(self, **kwargs):
+        return Character.objects.create(
+            name="Hero", type="fire", path="destruction", rarity=5, **kwargs
+        )
+
+    def test_released_files_are_deleted_by_a_job(self):
+        character = self.create_character(image=ContentFile(b"main", name="main.png"))
+        name = character.image.name
+        character.delete()
+
+        job = StorageJob.objects.get(kind="delete_files")
+        self.assertEqual(job.payload, {"path": name})
+        self.assertEqual(
+            run_jobs(kinds=["delete_files"]), {"succeeded": 1, "failed": 0}
+        )
+        self.assertFalse(default_storage.exists(name))
+
+    def test_files_referenced_again_are_kept(self):
+        character = self.create_character(image=ContentFile(b"main", name="main.png"))
+        name = character.image.name
+        character.delete()
+        add_file_reference(name)
+
+        self.assertEqual(
+            run_jobs(kinds=["delete_files"]), {"succeeded": 1, "failed": 0}
+        )
+        self.assertTrue(default_storage.exists(name))
+
+    def test_stored_files_are_hashed_by_a_job(self):
+        default_storage.save("stored.png", ContentFile(b"stored"))
+        character = self.create_character(image="stored.png")
+        self.assertIsNone(Character.objects.get().image_hash)
+
+        version = get_catalog_version(Character)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(
+                run_jobs(kinds=["hash_file"]), {"succeeded": 1, "failed": 0}
+            )
+        modified = character.modified
+        character.refresh_from_db()
+        self.assertIsNotNone(character.image_hash)
+        # The hash is serialized, cached responses and ETags have to change
+        self.assertGreater(character.modified, modified)
+        self.assertGreater(get_catalog_version(Character), version)
@@ -1,9 +1,10 @@
 from django.contrib import admin
 from lightcones.models import Lightcone
+from utils.admin import PrevalidatedSaveAdminMixin
 
 
 @admin.register(Lightcone)
-class LightconeAdmin(admin.ModelAdmin):
+class LightconeAdmin(PrevalidatedSaveAdminMixin, admin.ModelAdmin):
     list_display = ("name", "rarity", "ability", "path")
     search_fields = ("name",)
     list_filter = ("rarity", "path")
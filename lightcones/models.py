@@ -1,32 +1,48 @@
-import os
-
 from django.db import models
 from django.db.models import Model
-from django.utils.text import slugify
 from rest_framework.exceptions import ValidationError
 
 from characters.models import Character
+from utils.mixins import (
+    HashedFileModelMixin,
+    TimeStampedModelMixin,
+    TrackedFieldsModelMixin,
+    ValidatedModelMixin,
+)
+from utils.model_utils import (
+    register_catalog_version_signals,
+    register_file_cleanup_signals,
+)
+from utils.upload_paths import UploadPath
 
+lightcone_image_path = UploadPath(
+    "lightcones/{lightcone.path}/{lightcone.name}/{type}/{type}.{ext}"
+)
 
-def lightcone_image_path(instance, filename):
-    lightcone_name = slugify(instance.lightcone.name)
-    lightcone_path = instance.lightcone.path
-    image_type = instance.type
-    extension = filename.split(".")[-1]
-    return os.path.join(
-        "lightcones",
-        lightcone_path,
-        lightcone_name,
-        image_type,
-        f"{image_type}.{extension}",
-    )
+lightcone_main_image_path = UploadPath("lightcones/{path}/{name}/main.{ext}")
 
 
-class Lightcone(Model):
+class Lightcone(
+    HashedFileModelMixin,
+    TrackedFieldsModelMixin,
+    ValidatedModelMixin,
+    TimeStampedModelMixin,
+    Model,
+):
     RARITIES = [(3, "3 Star"), (4, "4 Star"), (5, "5 Star")]
 
+    # Search entries are refreshed when these change
+    tracked_fields = ("name", "ability")
+
     name = models.CharField(max_length=128)
-    image = models.ImageField(upload_to=lightcone_image_path, blank=True, null=True)
+    image = models.ImageField(
+        upload_to=lightcone_main_image_path, blank=True, null=True
+    )
+    image_hash = models.CharField(
+        max_length=64, blank=True, null=True, editable=False, db_index=True
+    )
+    # Width of the image for its srcset, recorded with the hash
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
     rarity = models.PositiveSmallIntegerField(choices=RARITIES)
     ability = models.CharField(max_length=2048)
     path = models.CharField(max_length=24, choices=Character.PATHS)
@@ -42,12 +58,20 @@ class Lightcone(Model):
         if self.path not in dict(Character.PATHS):
             raise ValidationError("Invalid path.")
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+    class Meta:
+        unique_together = ("name", "path")
+        indexes = [
+            models.Index(fields=["path", "id"], name="lightcone_path_id_idx"),
+            models.Index(fields=["rarity", "id"], name="lightcone_rarity_id_idx"),
+        ]
 
 
-class LightconeImage(Model):
+class LightconeImage(
+    HashedFileModelMixin,
+    TrackedFieldsModelMixin,
+    TimeStampedModelMixin,
+    Model,
+):
     IMAGE_TYPES = [("full", "Full")]
 
     lightcone = models.ForeignKey(
@@ -55,6 +79,9 @@ class LightconeImage(Model):
     )
     type = models.CharField(max_length=16, choices=IMAGE_TYPES)
     image = models.ImageField(upload_to=lightcone_image_path)
+    image_hash = models.CharField(
+        max_length=64, blank=True, null=True, editable=False, db_index=True
+    )
 
     def __str__(self):
         return f"{self.lightcone.name} - {self.type}"
@@ -62,3 +89,8 @@ class LightconeImage(Model):
     def clean(self):
         if self.type not in dict(self.IMAGE_TYPES):
             raise ValidationError("Invalid image type.")
+
+
+register_file_cleanup_signals(Lightcone, ["image"])
+register_file_cleanup_signals(LightconeImage, ["image"])
+register_catalog_version_signals(Lightcone)
@@ -1,9 +1,12 @@
 from rest_framework import serializers
 
 from lightcones.models import Lightcone
+from utils.serializers import ImageSrcsetField
 
 
 class LightconeSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source="image")
+
     class Meta:
         model = Lightcone
-        fields = ["name", "image", "path", "rarity", "ability"]
+        fields = ["name", "image", "image_srcset", "path", "rarity", "ability"]
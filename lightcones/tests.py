@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.db import IntegrityError
 from django.test import TestCase
 from rest_framework import status
@@ -60,6 +61,7 @@ class LightconeModelTests(TestCase):
 class LightconeAPITests(APITestCase):
 
     def setUp(self):
+        cache.clear()
         self.lightcone = create_lightcone()
         self.lightcone_url = reverse(
             "lightcone-detail", kwargs={"pk": self.lightcone.pk}
@@ -1,9 +1,17 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from lightcones.views import LightconeViewSet
+from lightcones.views import AsyncLightconeView, LightconeViewSet
 
 router = DefaultRouter()
 router.register(r"lightcone", LightconeViewSet)
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path("", include(router.urls)),
+    path("async/lightcone/", AsyncLightconeView.as_view(), name="lightcone-async-list"),
+    path(
+        "async/lightcone/<int:pk>/",
+        AsyncLightconeView.as_view(),
+        name="lightcone-async-detail",
+    ),
+]
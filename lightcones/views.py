@@ -4,11 +4,27 @@ from rest_framework.permissions import IsAdminUser, AllowAny
 
 from lightcones.models import Lightcone
 from lightcones.serializers import LightconeSerializer
+from utils.views import (
+    AsyncReadOnlyView,
+    CatalogCacheMixin,
+    ConditionalGetMixin,
+    PrefetchQuerysetMixin,
+    PrevalidatedSaveMixin,
+    RowListMixin,
+)
 
 
-class LightconeViewSet(viewsets.ModelViewSet):
+class LightconeViewSet(
+    ConditionalGetMixin,
+    CatalogCacheMixin,
+    RowListMixin,
+    PrefetchQuerysetMixin,
+    PrevalidatedSaveMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Lightcone.objects.all()
     serializer_class = LightconeSerializer
+    filter_fields = ("path", "rarity")
 
     def get_permissions(self):
         if self.action in ["create", "update", "partial_update", "destroy"]:
@@ -16,3 +32,9 @@ class LightconeViewSet(viewsets.ModelViewSet):
         else:
             self.permission_classes = [AllowAny]
         return [permission() for permission in self.permission_classes]
+
+
+class AsyncLightconeView(AsyncReadOnlyView):
+    queryset = Lightcone.objects.all()
+    serializer_class = LightconeSerializer
+    filter_fields = LightconeViewSet.filter_fields
@@ -1,25 +1,29 @@
-import os
-
 from django.db import models
 from django.db.models import Model
-from django.utils.text import slugify
 from rest_framework.exceptions import ValidationError
 
-from utils.model_utils import register_file_cleanup_signals
-
+from utils.mixins import (
+    HashedFileModelMixin,
+    TimeStampedModelMixin,
+    TrackedFieldsModelMixin,
+    ValidatedModelMixin,
+)
+from utils.model_utils import (
+    register_catalog_version_signals,
+    register_file_cleanup_signals,
+)
+from utils.upload_paths import UploadPath
 
-def relic_image_path(instance, filename):
-    relic_set_name = slugify(instance.relic.set_name)
-    relic_slot = instance.relic.slot
-    extension = filename.split(".")[-1]
-    return os.path.join(
-        "relics",
-        relic_set_name,
-        f"{relic_slot}.{extension}",
-    )
+relic_image_path = UploadPath("relics/{set_name}/{slot}.{ext}")
 
 
-class Relic(Model):
+class Relic(
+    HashedFileModelMixin,
+    TrackedFieldsModelMixin,
+    ValidatedModelMixin,
+    TimeStampedModelMixin,
+    Model,
+):
     SLOTS = [
         ("head", "Head"),
         ("hands", "Hands"),
@@ -29,8 +33,15 @@ class Relic(Model):
         ("rope", "Rope"),
     ]
 
+    # Search entries are refreshed when these change
+    tracked_fields = ("name", "set_name", "effect")
+
     name = models.CharField(max_length=128)
     image = models.ImageField(upload_to=relic_image_path, blank=True, null=True)
+    image_hash = models.CharField(
+        max_length=64, blank=True, null=True, editable=False, db_index=True
+    )
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
     set_name = models.CharField(max_length=128)
     effect = models.CharField(max_length=2048, blank=True)
     slot = models.CharField(max_length=24, choices=SLOTS)
@@ -46,8 +57,13 @@ class Relic(Model):
         if not self.set_name.strip():
             raise ValidationError("Set name cannot be empty")
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+    class Meta:
+        unique_together = ("set_name", "slot")
+        indexes = [
+            models.Index(fields=["slot", "id"], name="relic_slot_id_idx"),
+            models.Index(fields=["set_name", "id"], name="relic_set_name_id_idx"),
+        ]
+
 
-register_file_cleanup_signals(Relic, ["image"])
\ No newline at end of file
+register_file_cleanup_signals(Relic, ["image"])
+register_catalog_version_signals(Relic)
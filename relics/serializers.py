@@ -1,9 +1,20 @@
 from rest_framework import serializers
 
 from relics.models import Relic
+from utils.serializers import ImageSrcsetField
 
 
 class RelicSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source="image")
+
     class Meta:
         model = Relic
-        fields = "__all__"
+        fields = [
+            "id",
+            "name",
+            "image",
+            "image_srcset",
+            "set_name",
+            "effect",
+            "slot",
+        ]
@@ -2,6 +2,7 @@ from rest_framework import status
 from rest_framework.exceptions import ValidationError
 from rest_framework.test import APITestCase
 from relics.models import Relic
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
@@ -69,6 +70,7 @@ class RelicModelTests(TestCase):
 class RelicAPITests(APITestCase):
 
     def setUp(self):
+        cache.clear()
         self.relic = Relic.objects.create(
             name="Ancient Crown",
             set_name="Ancient Set",
@@ -122,6 +124,11 @@ class RelicAPITests(APITestCase):
         response = self.client.get(self.relic_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["name"], "Ancient Crown")
+        # Timestamps and hashes stay internal
+        self.assertEqual(
+            set(response.data),
+            {"id", "name", "image", "image_srcset", "set_name", "effect", "slot"},
+        )
 
     def test_update_relic(self):
         data = {
@@ -154,6 +161,11 @@ class RelicAPITests(APITestCase):
         response = self.client.get(self.relic_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["name"], "Ancient Crown")
+        # Timestamps and hashes stay internal
+        self.assertEqual(
+            set(response.data),
+            {"id", "name", "image", "image_srcset", "set_name", "effect", "slot"},
+        )
 
     def test_update_lightcone_non_superuser(self):
         data = self.get_relic_http_data(name="Updated Lightcone")
@@ -1,9 +1,17 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from relics.views import RelicViewSet
+from relics.views import AsyncRelicView, RelicViewSet
 
 router = DefaultRouter()
 router.register(r"relic", RelicViewSet)
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path("", include(router.urls)),
+    path("async/relic/", AsyncRelicView.as_view(), name="relic-async-list"),
+    path(
+        "async/relic/<int:pk>/",
+        AsyncRelicView.as_view(),
+        name="relic-async-detail",
+    ),
+]
@@ -3,11 +3,27 @@ from rest_framework.permissions import AllowAny, IsAdminUser
 
 from relics.models import Relic
 from relics.serializers import RelicSerializer
+from utils.views import (
+    AsyncReadOnlyView,
+    CatalogCacheMixin,
+    ConditionalGetMixin,
+    PrefetchQuerysetMixin,
+    PrevalidatedSaveMixin,
+    RowListMixin,
+)
 
 
-class RelicViewSet(viewsets.ModelViewSet):
+class RelicViewSet(
+    ConditionalGetMixin,
+    CatalogCacheMixin,
+    RowListMixin,
+    PrefetchQuerysetMixin,
+    PrevalidatedSaveMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Relic.objects.all()
     serializer_class = RelicSerializer
+    filter_fields = ("slot", "set_name")
 
     def get_permissions(self):
         if self.action in ["create", "update", "partial_update", "destroy"]:
@@ -15,3 +31,9 @@ class RelicViewSet(viewsets.ModelViewSet):
         else:
             self.permission_classes = [AllowAny]
         return [permission() for permission in self.permission_classes]
+
+
+class AsyncRelicView(AsyncReadOnlyView):
+    queryset = Relic.objects.all()
+    serializer_class = RelicSerializer
+    filter_fields = RelicViewSet.filter_fields
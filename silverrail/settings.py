@@ -51,9 +51,12 @@ INSTALLED_APPS = [
     "stats",
     "abilities",
     "users",
+    "filestore",
+    "catalog",
 ]
 
 MIDDLEWARE = [
+    "utils.routers.ReadReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -88,13 +91,133 @@ WSGI_APPLICATION = "silverrail.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
+# SQLite is run in WAL mode, so readers work from the last committed snapshot instead
+# of waiting for writers. With synchronous=NORMAL commits are only synced at
+# checkpoints: a power loss can drop the last commits but can't corrupt the database.
+# Write transactions take the write lock when they begin, so a writer waits for
+# another up to the timeout instead of failing with "database is locked" midway.
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # KiB
+    "temp_store": "memory",
+}
+SQLITE_PATH = BASE_DIR / "db.sqlite3"
+
+SQLITE_DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+        "NAME": SQLITE_PATH,
+        "OPTIONS": {
+            "init_command": ";".join(
+                f"PRAGMA {name}={value}" for name, value in SQLITE_PRAGMAS.items()
+            ),
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
+    },
+    # Read-only requests read from here, see utils.routers
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": f"file:{SQLITE_PATH}?mode=ro",
+        "OPTIONS": {
+            "init_command": ";".join(
+                f"PRAGMA {name}={value}"
+                for name, value in SQLITE_PRAGMAS.items()
+                if name != "journal_mode"
+            )
+            + ";PRAGMA query_only=1",
+            "timeout": 20,
+        },
+        "TEST": {"MIRROR": "default"},
+    },
 }
 
+# DATABASE=postgresql selects PostgreSQL (needs `poetry install --extras postgresql`),
+# configured from the POSTGRES_* variables. Connections come from a psycopg pool in
+# each process by default. POSTGRES_POOL=False keeps one persistent connection per
+# thread instead, checked before reuse. POSTGRES_REPLICA_HOST adds a read replica.
+DATABASE = os.getenv("DATABASE", "sqlite")
+if DATABASE == "postgresql":
+    POSTGRES_POOL = os.getenv("POSTGRES_POOL", "True") == "True"
+    POSTGRES = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.getenv("POSTGRES_DB", "silverrail"),
+        "USER": os.getenv("POSTGRES_USER", "silverrail"),
+        "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+        "HOST": os.getenv("POSTGRES_HOST", "localhost"),
+        "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        # Pooled connections go back to the pool after each request
+        "CONN_MAX_AGE": (
+            0 if POSTGRES_POOL else int(os.getenv("POSTGRES_CONN_MAX_AGE", 600))
+        ),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "pool": (
+                {
+                    "min_size": int(os.getenv("POSTGRES_POOL_MIN_SIZE", 2)),
+                    "max_size": int(os.getenv("POSTGRES_POOL_MAX_SIZE", 10)),
+                    "timeout": int(os.getenv("POSTGRES_POOL_TIMEOUT", 10)),
+                }
+                if POSTGRES_POOL
+                else False
+            ),
+        },
+    }
+    DATABASES = {"default": POSTGRES}
+    if os.getenv("POSTGRES_REPLICA_HOST"):
+        # Read-only requests read from here, see utils.routers
+        DATABASES["replica"] = {
+            **POSTGRES,
+            "HOST": os.getenv("POSTGRES_REPLICA_HOST"),
+            "PORT": os.getenv("POSTGRES_REPLICA_PORT", POSTGRES["PORT"]),
+            "TEST": {"MIRROR": "default"},
+        }
+else:
+    DATABASES = SQLITE_DATABASES
+DATABASE_ROUTERS = ["utils.routers.ReadReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Production needs a cache shared by all workers (file or database backend) so that
+# catalog version bumps are seen everywhere. Run `manage.py createcachetable` for
+# the database backend.
+
+if DEBUG:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": os.getenv(
+                "CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"
+            ),
+            "LOCATION": os.getenv("CACHE_LOCATION", str(BASE_DIR / ".cache")),
+        }
+    }
+
+# How long rendered catalog responses are kept, stale versions simply expire
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Autocomplete is served from an index in each process. Catalog changes made by other
+# processes are picked up this long after they happen at most. Keys are truncated to
+# the key length, and each kind of object holds at most the max keys.
+AUTOCOMPLETE_CHECK_INTERVAL_SECONDS = 5
+AUTOCOMPLETE_KEY_LENGTH = 32
+AUTOCOMPLETE_MAX_KEYS = 250_000
+
+# Catalog exports read this many rows per query. Gzipped snapshots of the current
+# catalog version are kept in the export directory, see catalog.export.
+CATALOG_EXPORT_CHUNK_SIZE = 500
+CATALOG_EXPORT_DIR = os.getenv("CATALOG_EXPORT_DIR", str(BASE_DIR / "exports"))
+CATALOG_EXPORT_GZIP_LEVEL = 6
+CATALOG_EXPORT_BROTLI_QUALITY = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -147,12 +270,16 @@ REST_FRAMEWORK = {
         "user": "1000/hour",
         "burst": "240/min",
         "sustained": "2400/hour",
+        "compute": "30/min",
     },
     "DEFAULT_THROTTLE_CLASSES": [
         "rest_framework.throttling.AnonRateThrottle",
         "rest_framework.throttling.UserRateThrottle",
         "rest_framework.throttling.ScopedRateThrottle",
     ],
+    "DEFAULT_FILTER_BACKENDS": ["utils.filters.FieldFilterBackend"],
+    "DEFAULT_PAGINATION_CLASS": "utils.pagination.IdCursorPagination",
+    "PAGE_SIZE": 50,
 }
 
 SIMPLE_JWT = {
@@ -162,6 +289,10 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
 }
 
+# How object stats are stored: "rows" (one Stat row per stat) or "packed" (one
+# StatVector row per object). Run `manage.py pack_stats` before switching to packed.
+STAT_STORAGE = os.getenv("STAT_STORAGE", "rows")
+
 AUTH_USER_MODEL = "users.SilverRailUser"
 PASSWORD_HASHERS = [
     "django.contrib.auth.hashers.Argon2PasswordHasher",
@@ -184,6 +315,37 @@ STORAGES = {
     },
 }
 
+# Store uploads once under their SHA-256 digest instead of their upload_to path.
+# Identical content is never uploaded twice, see utils.mixins.HashedFileModelMixin.
+CONTENT_ADDRESSED_MEDIA = os.getenv("CONTENT_ADDRESSED_MEDIA", "False") == "True"
+CONTENT_ADDRESSED_MEDIA_PREFIX = "blobs"
+
+# Files without references are deleted by `manage.py sweep_files` once released this long ago
+FILE_SWEEP_GRACE_SECONDS = int(os.getenv("FILE_SWEEP_GRACE_SECONDS", 3600))
+
+# Storage job queue, run by `manage.py run_jobs`. Failed jobs are retried with
+# exponential backoff, a job whose worker died is picked up again after the lock timeout.
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_DELAY_SECONDS = 30
+JOB_RETRY_MAX_DELAY_SECONDS = 3600
+JOB_LOCK_TIMEOUT_SECONDS = 600
+
+# Resized, re-encoded copies of uploaded images, stored next to the originals and
+# rendered by the `image_derivatives` job or `manage.py generate_image_derivatives`.
+# Formats the installed Pillow can't encode are skipped.
+IMAGE_DERIVATIVE_WIDTHS = [64, 256, 768]
+IMAGE_DERIVATIVE_FORMATS = ["webp", "avif"]
+IMAGE_DERIVATIVE_QUALITY = {"webp": 80, "avif": 60}
+IMAGE_DERIVATIVE_WORKERS = int(
+    os.getenv("IMAGE_DERIVATIVE_WORKERS", os.cpu_count() or 1)
+)
+
+# Hash uploads while they are received so their digest is known without a second read
+FILE_UPLOAD_HANDLERS = [
+    "utils.files.HashingMemoryFileUploadHandler",
+    "utils.files.HashingTemporaryFileUploadHandler",
+]
+
 AWS_STORAGE_BUCKET_NAME = "silverrail"
 AWS_S3_REGION_NAME = "us-east-1"
 if DEBUG:
@@ -1,7 +1,47 @@
+import warnings
+
 from .settings import *
 
+
+def postgres_is_available(settings_dict):
+    """Check that the server of the PostgreSQL profile accepts connections."""
+    try:
+        import psycopg
+    except ImportError:
+        return False
+    try:
+        psycopg.connect(
+            dbname="postgres",
+            user=settings_dict["USER"],
+            password=settings_dict["PASSWORD"],
+            host=settings_dict["HOST"],
+            port=settings_dict["PORT"],
+            connect_timeout=3,
+        ).close()
+    except psycopg.Error:
+        return False
+    return True
+
+
+# With the PostgreSQL profile the tests create a throwaway database on its server, or
+# fall back to SQLite when there is no server to reach
+if DATABASE == "postgresql" and not postgres_is_available(DATABASES["default"]):
+    warnings.warn("PostgreSQL isn't reachable, the tests run on SQLite")
+    DATABASE = "sqlite"
+    DATABASES = SQLITE_DATABASES
+
 REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] = {
     "registration": "10/day",  # Allow more requests during testing
     "anon": "100/day",
     "user": "1500/day",
+    "compute": "100/day",
+}
+
+# Test transactions aren't visible to another connection, read everything from default
+DATABASES.pop("replica", None)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
 }
@@ -18,6 +18,9 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from catalog.views import CatalogExportView
+from utils.views import CatalogCacheStatsView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("accounts/", include("django.contrib.auth.urls")),
@@ -28,4 +31,7 @@ urlpatterns = [
     path("stats/", include("stats.urls")),
     path("abilities/", include("abilities.urls")),
     path("users/", include("users.urls")),
+    path("search/", include("catalog.urls")),
+    path("catalog/export/", CatalogExportView.as_view(), name="catalog-export"),
+    path("cache/stats/", CatalogCacheStatsView.as_view(), name="catalog-cache-stats"),
 ]
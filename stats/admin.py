@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.contenttypes.admin import GenericTabularInline
-from stats.models import Stat
+from stats.models import Stat, StatVector
 
 
 class StatInline(GenericTabularInline):
@@ -36,3 +36,20 @@ class StatAdmin(admin.ModelAdmin):
         return obj.get_stat_type_display()
 
     get_stat_type.short_description = "Stat Type"
+
+
+@admin.register(StatVector)
+class StatVectorAdmin(admin.ModelAdmin):
+    list_display = ("get_object", "content_type", "object_id")
+    readonly_fields = ("get_stats",)
+    exclude = ("values",)
+
+    def get_object(self, obj):
+        return f"{obj.object}"
+
+    get_object.short_description = "Related Object"
+
+    def get_stats(self, obj):
+        return ", ".join(f"{k}: {v:g}" for k, v in obj.as_dict().items() if v)
+
+    get_stats.short_description = "Stats"
@@ -0,0 +1,151 @@
+"""
+Damage calculation over stat vectors.
+
+A build is one row of a float matrix with a column per stat type, in ``Stat.STAT_TYPES``
+order, so thousands of candidate builds are evaluated with a handful of array operations.
+Percentage stats (CRIT Rate, DMG Boost, Break Effect...) are stored as fractions, 0.5 is 50%.
+"""
+
+import numpy as np
+
+from stats.models import STAT_COUNT, STAT_INDEX
+from stats.storage import get_stat_vectors
+
+# ATK scaling used for an ability type, abilities don't store their own multipliers yet
+DEFAULT_ABILITY_MULTIPLIERS = {
+    "basic": 1.0,
+    "skill": 2.0,
+    "talent": 1.0,
+    "ultimate": 4.0,
+    "technique": 0.8,
+}
+
+# Base break damage multiplier per element
+BREAK_ELEMENT_MULTIPLIERS = {
+    "physical": 2.0,
+    "fire": 2.0,
+    "wind": 1.5,
+    "ice": 1.0,
+    "lightning": 1.0,
+    "quantum": 0.5,
+    "imaginary": 0.5,
+}
+
+# Break damage level multiplier of a level 80 character
+BREAK_LEVEL_MULTIPLIER = 3767.5533
+
+DEFAULT_ENEMY = {
+    "level": 90,
+    "resistance": 0.2,
+    "def_reduction": 0.0,
+    "vulnerability": 0.0,
+    "toughness": 60,
+}
+
+
+def stat_vector(stats=None) -> np.ndarray:
+    """
+    Build a stat vector from a mapping of stat types to values.
+
+    Args:
+        stats (dict, optional): Stat values keyed by stat type. Missing stats are 0.
+
+    Returns:
+        np.ndarray: A float vector in ``Stat.STAT_TYPES`` order.
+    """
+    vector = np.zeros(STAT_COUNT)
+    for stat_type, value in (stats or {}).items():
+        vector[STAT_INDEX[stat_type]] = value
+    return vector
+
+
+def get_build_vector(character, lightcone=None, relics=()) -> np.ndarray:
+    """
+    Sum the stats of a character and the lightcone and relics equipped on it.
+
+    Args:
+        character (Character): The character.
+        lightcone (Lightcone, optional): The equipped lightcone.
+        relics (Iterable[Relic]): The equipped relics.
+
+    Returns:
+        np.ndarray: The combined stat vector.
+    """
+    vectors = get_stat_vectors([character, lightcone, *relics])
+    return sum(vectors.values(), np.zeros(STAT_COUNT))
+
+
+def evaluate_builds(
+    builds: np.ndarray, element: str, multiplier: float = 1.0, enemy=None
+) -> dict:
+    """
+    Compute the damage distribution of a hit for every build at once.
+
+    Args:
+        builds (np.ndarray): A ``(n_builds, STAT_COUNT)`` matrix, or a single stat vector.
+        element (str): The attacker's element (a ``Character.TYPES`` value).
+        multiplier (float): The ATK scaling of the ability.
+        enemy (dict, optional): Overrides for ``DEFAULT_ENEMY``. The enemy RES against
+            ``element`` is taken from ``resistance``.
+
+    Returns:
+        dict: Arrays of length ``n_builds`` with the ``non_crit``, ``crit`` and
+        ``expected`` damage, the effective ``crit_rate`` and the ``break`` damage.
+    """
+    enemy = {**DEFAULT_ENEMY, **(enemy or {})}
+    builds = np.atleast_2d(np.asarray(builds, dtype=float))
+
+    # Multipliers that only depend on the enemy are scalars shared by every build
+    character_level = 80
+    def_multiplier = (character_level + 20) / (
+        (enemy["level"] + 20) * (1 - enemy["def_reduction"]) + character_level + 20
+    )
+    res_multiplier = 1 - np.clip(enemy["resistance"], -1.0, 0.9)
+    vulnerability_multiplier = 1 + enemy["vulnerability"]
+    enemy_multiplier = def_multiplier * res_multiplier * vulnerability_multiplier
+
+    atk = builds[:, STAT_INDEX["atk"]]
+    dmg_boost = 1 + builds[:, STAT_INDEX[f"{element}boost"]]
+    crit_rate = np.clip(builds[:, STAT_INDEX["critrate"]], 0.0, 1.0)
+    crit_dmg = builds[:, STAT_INDEX["critdmg"]]
+
+    non_crit = atk * multiplier * dmg_boost * enemy_multiplier
+    break_damage = (
+        BREAK_ELEMENT_MULTIPLIERS[element]
+        * BREAK_LEVEL_MULTIPLIER
+        * (0.5 + enemy["toughness"] / 40)
+        * (1 + builds[:, STAT_INDEX["break"]])
+        * enemy_multiplier
+    )
+    return {
+        "non_crit": non_crit,
+        "crit": non_crit * (1 + crit_dmg),
+        "expected": non_crit * (1 + crit_rate * crit_dmg),
+        "crit_rate": crit_rate,
+        "break": break_damage,
+    }
+
+
+def evaluate_abilities(character, builds: np.ndarray, enemy=None, multipliers=None):
+    """
+    Compute the damage distribution of each of a character's abilities for every build.
+
+    Args:
+        character (Character): The character whose abilities to evaluate.
+        builds (np.ndarray): A ``(n_builds, STAT_COUNT)`` matrix, or a single stat vector.
+        enemy (dict, optional): Overrides for ``DEFAULT_ENEMY``.
+        multipliers (dict, optional): Overrides for ``DEFAULT_ABILITY_MULTIPLIERS``.
+
+    Returns:
+        list: One dict per ability with its id, name, type and damage arrays.
+    """
+    multipliers = {**DEFAULT_ABILITY_MULTIPLIERS, **(multipliers or {})}
+    results = []
+    for ability in character.abilities.all():
+        damage = evaluate_builds(
+            builds, character.type, multipliers.get(ability.type, 1.0), enemy
+        )
+        results.append(
+            {"id": ability.pk, "name": ability.name, "type": ability.type, **damage}
+        )
+    return results
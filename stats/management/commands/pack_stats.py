@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from stats.models import STAT_COUNT, STAT_INDEX, Stat, StatVector
+
+
+class Command(BaseCommand):
+    help = "Pack per-stat Stat rows into one StatVector row per object."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="How many objects to pack per insert.",
+        )
+        parser.add_argument(
+            "--delete-rows",
+            action="store_true",
+            help="Delete the Stat rows once they have been packed.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        rows = (
+            Stat.objects.order_by("content_type_id", "object_id")
+            .values_list("content_type_id", "object_id", "stat_type", "value")
+            .iterator(chunk_size=batch_size * STAT_COUNT)
+        )
+
+        packed = 0
+        batch = []
+        current_key, current = None, None
+        with transaction.atomic():
+            for content_type_id, object_id, stat_type, value in rows:
+                if (content_type_id, object_id) != current_key:
+                    if current_key is not None:
+                        batch.append(self.build_vector(current_key, current))
+                    current_key = (content_type_id, object_id)
+                    current = [0.0] * STAT_COUNT
+                current[STAT_INDEX[stat_type]] = value
+
+                if len(batch) >= batch_size:
+                    packed += self.write(batch)
+                    batch = []
+
+            if current_key is not None:
+                batch.append(self.build_vector(current_key, current))
+            packed += self.write(batch)
+
+            if options["delete_rows"]:
+                deleted, _ = Stat.objects.all().delete()
+                self.stdout.write(f"Deleted {deleted} Stat rows.")
+
+        self.stdout.write(self.style.SUCCESS(f"Packed stats of {packed} objects."))
+
+    @staticmethod
+    def build_vector(key, values):
+        content_type_id, object_id = key
+        return StatVector(
+            content_type_id=content_type_id,
+            object_id=object_id,
+            values=StatVector.pack(values),
+        )
+
+    @staticmethod
+    def write(batch):
+        StatVector.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=["content_type", "object_id"],
+            update_fields=["values"],
+        )
+        return len(batch)
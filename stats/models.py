@@ -1,8 +1,11 @@
+import numpy as np
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.db.models import Model
 
+from utils.model_utils import register_catalog_version_signals
+
 
 class Stat(Model):
     STAT_CATEGORIES = [
@@ -12,37 +15,46 @@ class Stat(Model):
         ("resistance", "Resistance Type"),
     ]
 
+    # Stat types per category, in the order of packed stat vectors
+    STAT_TYPES_BY_CATEGORY = {
+        "base": [
+            ("hp", "HP"),
+            ("atk", "ATK"),
+            ("def", "DEF"),
+            ("spd", "SPD"),
+        ],
+        "advanced": [
+            ("critrate", "CRIT Rate"),
+            ("critdmg", "CRIT DMG"),
+            ("break", "Break Effect"),
+            ("healing", "Outgoing Healing Boost"),
+            ("maxenergy", "Max Energy"),
+            ("energyregen", "Energy Regeneration Rate"),
+            ("effecthit", "Effect Hit Rate"),
+            ("effectres", "Effect RES"),
+        ],
+        "damage": [
+            ("physicalboost", "Physical DMG Boost"),
+            ("fireboost", "Fire DMG Boost"),
+            ("iceboost", "Ice DMG Boost"),
+            ("windboost", "Wind DMG Boost"),
+            ("lightningboost", "Lightning DMG Boost"),
+            ("quantumboost", "Quantum DMG Boost"),
+            ("imaginaryboost", "Imaginary DMG Boost"),
+        ],
+        "resistance": [
+            ("physicalres", "Physical RES"),
+            ("fireres", "Fire RES"),
+            ("iceres", "Ice RES"),
+            ("windres", "Wind RES"),
+            ("lightningres", "Lightning RES"),
+            ("quantumres", "Quantum RES"),
+            ("imaginaryres", "Imaginary RES"),
+        ],
+    }
+
     STAT_TYPES = [
-        # Base stats
-        ("hp", "HP"),
-        ("atk", "ATK"),
-        ("def", "DEF"),
-        ("spd", "SPD"),
-        # Advanced stats
-        ("critrate", "CRIT Rate"),
-        ("critdmg", "CRIT DMG"),
-        ("break", "Break Effect"),
-        ("healing", "Outgoing Healing Boost"),
-        ("maxenergy", "Max Energy"),
-        ("energyregen", "Energy Regeneration Rate"),
-        ("effecthit", "Effect Hit Rate"),
-        ("effectres", "Effect RES"),
-        # Damage types
-        ("physicalboost", "Physical DMG Boost"),
-        ("fireboost", "Fire DMG Boost"),
-        ("iceboost", "Ice DMG Boost"),
-        ("windboost", "Wind DMG Boost"),
-        ("lightningboost", "Lightning DMG Boost"),
-        ("quantumboost", "Quantum DMG Boost"),
-        ("imaginaryboost", "Imaginary DMG Boost"),
-        # Resistance types
-        ("physicalres", "Physical RES"),
-        ("fireres", "Fire RES"),
-        ("iceres", "Ice RES"),
-        ("windres", "Wind RES"),
-        ("lightningres", "Lightning RES"),
-        ("quantumres", "Quantum RES"),
-        ("imaginaryres", "Imaginary RES"),
+        choice for choices in STAT_TYPES_BY_CATEGORY.values() for choice in choices
     ]
 
     stat_category = models.CharField(max_length=24, choices=STAT_CATEGORIES)
@@ -58,3 +70,71 @@ class Stat(Model):
 
     class Meta:
         unique_together = ("content_type", "object_id", "stat_type")
+
+
+STAT_INDEX = {stat_type: index for index, (stat_type, _) in enumerate(Stat.STAT_TYPES)}
+STAT_COUNT = len(STAT_INDEX)
+STAT_CATEGORY_BY_TYPE = {
+    stat_type: category
+    for category, stat_types in Stat.STAT_TYPES_BY_CATEGORY.items()
+    for stat_type, _ in stat_types
+}
+
+
+class StatVector(Model):
+    """
+    All stats of one object packed into a single row.
+
+    ``values`` holds little-endian float64s in ``Stat.STAT_TYPES`` order. Vectors written
+    before a stat type was appended are shorter, the missing stats read as 0.
+    """
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    object = GenericForeignKey("content_type", "object_id")
+    values = models.BinaryField(default=bytes)
+
+    DTYPE = np.dtype("<f8")
+
+    def __str__(self):
+        return f"{self.object} - Stats"
+
+    class Meta:
+        unique_together = ("content_type", "object_id")
+
+    @classmethod
+    def pack(cls, array) -> bytes:
+        """Pack a stat array into the binary column format."""
+        return np.asarray(array, dtype=cls.DTYPE).tobytes()
+
+    @classmethod
+    def unpack(cls, values) -> np.ndarray:
+        """Unpack the binary column format into a full-length stat array."""
+        array = np.zeros(STAT_COUNT)
+        stored = np.frombuffer(bytes(values), dtype=cls.DTYPE)[:STAT_COUNT]
+        array[: len(stored)] = stored
+        return array
+
+    def as_array(self) -> np.ndarray:
+        return self.unpack(self.values)
+
+    def as_dict(self) -> dict:
+        return dict(zip(STAT_INDEX, self.as_array().tolist()))
+
+    def get(self, stat_type: str) -> float:
+        return float(self.as_array()[STAT_INDEX[stat_type]])
+
+    def set(self, stat_type: str, value: float):
+        array = self.as_array()
+        array[STAT_INDEX[stat_type]] = value
+        self.values = self.pack(array)
+
+    def update(self, stats: dict):
+        array = self.as_array()
+        for stat_type, value in stats.items():
+            array[STAT_INDEX[stat_type]] = value
+        self.values = self.pack(array)
+
+
+register_catalog_version_signals(Stat)
+register_catalog_version_signals(StatVector, [Stat])
@@ -0,0 +1,108 @@
+"""
+Default stat provisioning for model instances.
+
+Creates the starting stats of many objects in one transaction with one batched insert.
+Objects that already have stats are left out of the insert, and the ``unique_together``
+constraints skip any that got stats concurrently, so provisioning the same objects twice
+is harmless.
+"""
+
+import operator
+from collections import defaultdict
+from functools import reduce
+
+import numpy as np
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Q
+
+from stats.models import STAT_COUNT, STAT_INDEX, Stat, StatVector
+from stats.storage import get_stat_storage
+from utils.cache import bump_catalog_version
+
+
+def provision_default_stats(objects, defaults, storage=None, batch_size=None) -> int:
+    """
+    Create default stats for model instances that don't have them yet.
+
+    Args:
+        objects (Iterable[Model]): Saved instances to provision.
+        defaults (List[dict]): ``stat_type``, ``stat_category`` and ``value`` of each default stat.
+        storage (str, optional): The storage mode to write to. Defaults to ``STAT_STORAGE``.
+        batch_size (int, optional): Passed on to ``bulk_create``.
+
+    Returns:
+        int: How many of the objects had no stats before.
+    """
+    objects = [obj for obj in objects if obj.pk is not None]
+    if not objects:
+        return 0
+
+    # get_for_models resolves each model once and is served from the ContentType cache
+    content_types = ContentType.objects.get_for_models(*{type(obj) for obj in objects})
+
+    packed_storage = (storage or get_stat_storage()) == "packed"
+    model = StatVector if packed_storage else Stat
+    pks_by_model = defaultdict(list)
+    for obj in objects:
+        pks_by_model[type(obj)].append(obj.pk)
+
+    with transaction.atomic():
+        # ignore_conflicts doesn't report which rows were skipped, so the objects of the
+        # batch that already have stats are read first
+        existing = set(
+            model.objects.filter(
+                reduce(
+                    operator.or_,
+                    (
+                        Q(content_type=content_types[object_model], object_id__in=pks)
+                        for object_model, pks in pks_by_model.items()
+                    ),
+                )
+            )
+            .values_list("content_type", "object_id")
+            .distinct()
+        )
+        objects = [
+            obj
+            for obj in objects
+            if (content_types[type(obj)].pk, obj.pk) not in existing
+        ]
+        if not objects:
+            return 0
+
+        if packed_storage:
+            values = np.zeros(STAT_COUNT)
+            for stat_data in defaults:
+                values[STAT_INDEX[stat_data["stat_type"]]] = stat_data["value"]
+            packed = StatVector.pack(values)
+            StatVector.objects.bulk_create(
+                [
+                    StatVector(
+                        content_type=content_types[type(obj)],
+                        object_id=obj.pk,
+                        values=packed,
+                    )
+                    for obj in objects
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+        else:
+            Stat.objects.bulk_create(
+                [
+                    Stat(
+                        stat_type=stat_data["stat_type"],
+                        stat_category=stat_data["stat_category"],
+                        value=stat_data["value"],
+                        content_type=content_types[type(obj)],
+                        object_id=obj.pk,
+                    )
+                    for obj in objects
+                    for stat_data in defaults
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+        transaction.on_commit(lambda: bump_catalog_version(Stat))
+    return len(objects)
@@ -0,0 +1,155 @@
+"""
+Read and write object stats in the configured storage mode.
+
+``settings.STAT_STORAGE`` selects ``"rows"``, one ``Stat`` row per stat type and object,
+or ``"packed"``, one ``StatVector`` row per object. Both are read into stat vectors in
+``Stat.STAT_TYPES`` order so callers don't need to know which mode is active.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Q
+
+from stats.models import (
+    STAT_CATEGORY_BY_TYPE,
+    STAT_COUNT,
+    STAT_INDEX,
+    Stat,
+    StatVector,
+)
+from utils.cache import bump_catalog_version
+
+STAT_STORAGE_MODES = ("rows", "packed")
+
+
+def get_stat_storage() -> str:
+    """Get the configured stat storage mode."""
+    return getattr(settings, "STAT_STORAGE", "rows")
+
+
+def get_object_lookup(objects):
+    """
+    Build a filter matching the stats of several model instances.
+
+    Args:
+        objects (Iterable[Model]): The instances to match.
+
+    Returns:
+        tuple: The ``Q`` filter and the model class of each content type id.
+    """
+    ids_by_model = defaultdict(set)
+    for obj in objects:
+        ids_by_model[type(obj)].add(obj.pk)
+
+    content_types = ContentType.objects.get_for_models(*ids_by_model)
+    lookup = Q()
+    for model, ids in ids_by_model.items():
+        lookup |= Q(content_type=content_types[model], object_id__in=ids)
+    return lookup, {ct.pk: model for model, ct in content_types.items()}
+
+
+def get_stat_vectors(objects, storage=None) -> dict:
+    """
+    Load the stat vectors of several model instances with a single query.
+
+    Args:
+        objects (Iterable[Model]): The instances whose stats to load.
+        storage (str, optional): The storage mode to read from. Defaults to ``STAT_STORAGE``.
+
+    Returns:
+        dict: A stat vector for each ``(model class, pk)`` pair. Objects without stats map to zeros.
+    """
+    objects = [obj for obj in objects if obj is not None]
+    vectors = {(type(obj), obj.pk): np.zeros(STAT_COUNT) for obj in objects}
+    if not objects:
+        return vectors
+
+    lookup, models_by_content_type = get_object_lookup(objects)
+    if (storage or get_stat_storage()) == "packed":
+        for content_type_id, object_id, values in StatVector.objects.filter(
+            lookup
+        ).values_list("content_type_id", "object_id", "values"):
+            model = models_by_content_type[content_type_id]
+            vectors[(model, object_id)] = StatVector.unpack(values)
+    else:
+        for content_type_id, object_id, stat_type, value in Stat.objects.filter(
+            lookup
+        ).values_list("content_type_id", "object_id", "stat_type", "value"):
+            model = models_by_content_type[content_type_id]
+            vectors[(model, object_id)][STAT_INDEX[stat_type]] += value
+    return vectors
+
+
+def get_stats(obj, storage=None) -> dict:
+    """
+    Load the stats of one model instance.
+
+    Args:
+        obj (Model): The instance whose stats to load.
+        storage (str, optional): The storage mode to read from. Defaults to ``STAT_STORAGE``.
+
+    Returns:
+        dict: Every stat value keyed by stat type.
+    """
+    vector = get_stat_vectors([obj], storage)[(type(obj), obj.pk)]
+    return dict(zip(STAT_INDEX, vector.tolist()))
+
+
+def set_stats(stats_by_object: dict, storage=None):
+    """
+    Write stat values for several model instances, leaving other stats untouched.
+    Moves the catalog version of ``Stat``.
+
+    Args:
+        stats_by_object (dict): Maps each instance to a dict of stat values keyed by stat type.
+        storage (str, optional): The storage mode to write to. Defaults to ``STAT_STORAGE``.
+    """
+    if not stats_by_object:
+        return
+
+    content_types = ContentType.objects.get_for_models(
+        *{type(obj) for obj in stats_by_object}
+    )
+    if (storage or get_stat_storage()) == "packed":
+        current = get_stat_vectors(stats_by_object, storage="packed")
+        vectors = []
+        for obj, stats in stats_by_object.items():
+            array = current[(type(obj), obj.pk)]
+            for stat_type, value in stats.items():
+                array[STAT_INDEX[stat_type]] = value
+            vectors.append(
+                StatVector(
+                    content_type=content_types[type(obj)],
+                    object_id=obj.pk,
+                    values=StatVector.pack(array),
+                )
+            )
+        StatVector.objects.bulk_create(
+            vectors,
+            update_conflicts=True,
+            unique_fields=["content_type", "object_id"],
+            update_fields=["values"],
+        )
+    else:
+        Stat.objects.bulk_create(
+            [
+                Stat(
+                    stat_category=STAT_CATEGORY_BY_TYPE[stat_type],
+                    stat_type=stat_type,
+                    value=value,
+                    content_type=content_types[type(obj)],
+                    object_id=obj.pk,
+                )
+                for obj, stats in stats_by_object.items()
+                for stat_type, value in stats.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["content_type", "object_id", "stat_type"],
+            update_fields=["value"],
+        )
+    # Bulk writes don't send the signals that move the version
+    transaction.on_commit(lambda: bump_catalog_version(Stat))
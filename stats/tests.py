@@ -1,3 +1,166 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from characters.models import Character
+from lightcones.models import Lightcone
+from stats.engine import (
+    STAT_COUNT,
+    STAT_INDEX,
+    evaluate_builds,
+    get_build_vector,
+    stat_vector,
+)
+from stats.models import STAT_CATEGORY_BY_TYPE, Stat, StatVector
+from stats.storage import get_stat_vectors, get_stats, set_stats
+
+
+def add_stats(obj, **stats):
+    set_stats({obj: stats}, storage="rows")
+
+
+class DamageEngineTests(TestCase):
+
+    def test_single_build_damage(self):
+        build = stat_vector(
+            {"atk": 1000, "critrate": 0.5, "critdmg": 1.0, "fireboost": 0.2}
+        )
+        damage = evaluate_builds(
+            build, "fire", multiplier=2.0, enemy={"resistance": 0.2, "level": 80}
+        )
+        # 1000 ATK * 200% * 1.2 boost * 0.5 DEF multiplier * 0.8 RES multiplier
+        self.assertAlmostEqual(damage["non_crit"][0], 960.0)
+        self.assertAlmostEqual(damage["crit"][0], 1920.0)
+        self.assertAlmostEqual(damage["expected"][0], 1440.0)
+
+    def test_crit_rate_is_capped(self):
+        build = stat_vector({"atk": 1000, "critrate": 1.5, "critdmg": 1.0})
+        damage = evaluate_builds(build, "ice")
+        self.assertEqual(damage["crit_rate"][0], 1.0)
+        self.assertAlmostEqual(damage["expected"][0], damage["crit"][0])
+
+    def test_only_matching_element_boost_applies(self):
+        builds = np.array(
+            [
+                stat_vector({"atk": 1000, "fireboost": 0.5}),
+                stat_vector({"atk": 1000, "iceboost": 0.5}),
+            ]
+        )
+        damage = evaluate_builds(builds, "fire")
+        self.assertAlmostEqual(damage["non_crit"][0], damage["non_crit"][1] * 1.5)
+
+    def test_break_effect_scales_break_damage(self):
+        builds = np.array([stat_vector(), stat_vector({"break": 1.0})])
+        damage = evaluate_builds(builds, "physical")
+        self.assertAlmostEqual(damage["break"][1], damage["break"][0] * 2)
+
+    def test_batch_matches_individual_evaluation(self):
+        rng = np.random.default_rng(0)
+        builds = rng.uniform(0, 2, size=(500, STAT_COUNT))
+        builds[:, STAT_INDEX["atk"]] *= 1000
+        batch = evaluate_builds(builds, "quantum", 1.5, {"vulnerability": 0.1})
+        for index in (0, 123, 499):
+            single = evaluate_builds(
+                builds[index], "quantum", 1.5, {"vulnerability": 0.1}
+            )
+            for key, values in single.items():
+                self.assertAlmostEqual(batch[key][index], values[0])
+
+    def test_build_vector_sums_character_and_equipment(self):
+        character = Character.objects.create(
+            name="Hero", type="fire", path="destruction", rarity=5
+        )
+        lightcone = Lightcone.objects.create(
+            name="Bright Star", ability="a", path="destruction", rarity=4
+        )
+        add_stats(character, atk=600, critrate=0.05)
+        add_stats(lightcone, atk=500)
+        with self.assertNumQueries(1):
+            vector = get_build_vector(character, lightcone)
+        self.assertEqual(vector[STAT_INDEX["atk"]], 1100)
+        self.assertEqual(vector[STAT_INDEX["critrate"]], 0.05)
+
+
+class StatVectorTests(TestCase):
+
+    def test_accessors(self):
+        vector = StatVector(values=StatVector.pack(np.zeros(STAT_COUNT)))
+        vector.set("atk", 500)
+        vector.update({"critrate": 0.05, "spd": 101})
+        self.assertEqual(vector.get("atk"), 500)
+        self.assertEqual(vector.as_dict()["spd"], 101)
+        self.assertEqual(vector.as_array()[STAT_INDEX["critrate"]], 0.05)
+        self.assertEqual(len(vector.values), STAT_COUNT * 8)
+
+    def test_categories_are_declared_with_the_types(self):
+        self.assertEqual(
+            set(Stat.STAT_TYPES_BY_CATEGORY), {key for key, _ in Stat.STAT_CATEGORIES}
+        )
+        self.assertEqual(list(STAT_CATEGORY_BY_TYPE), list(STAT_INDEX))
+        self.assertEqual(STAT_CATEGORY_BY_TYPE["spd"], "base")
+        self.assertEqual(STAT_CATEGORY_BY_TYPE["effectres"], "advanced")
+        self.assertEqual(STAT_CATEGORY_BY_TYPE["physicalboost"], "damage")
+
+    def test_short_vectors_read_missing_stats_as_zero(self):
+        vector = StatVector(values=StatVector.pack([100.0, 200.0]))
+        self.assertEqual(vector.get("atk"), 200.0)
+        self.assertEqual(vector.get("imaginaryres"), 0.0)
+
+
+class StatStorageTests(TestCase):
+
+    def setUp(self):
+        self.character = Character.objects.create(
+            name="Hero", type="fire", path="destruction", rarity=5
+        )
+        self.lightcone = Lightcone.objects.create(
+            name="Bright Star", ability="a", path="destruction", rarity=4
+        )
+
+    def test_modes_read_the_same_stats(self):
+        stats = {
+            self.character: {"atk": 600, "critrate": 0.05},
+            self.lightcone: {"atk": 500, "def": 300},
+        }
+        set_stats(stats, storage="rows")
+        set_stats(stats, storage="packed")
+        rows = get_stat_vectors(stats, storage="rows")
+        packed = get_stat_vectors(stats, storage="packed")
+        for key in rows:
+            np.testing.assert_array_equal(rows[key], packed[key])
+        self.assertEqual(Stat.objects.filter(value__gt=0).count(), 4)
+        self.assertEqual(StatVector.objects.count(), 2)
+
+    def test_set_stats_keeps_other_stats(self):
+        for storage in ("rows", "packed"):
+            set_stats({self.character: {"atk": 600, "hp": 1000}}, storage=storage)
+            set_stats({self.character: {"atk": 700}}, storage=storage)
+            stats = get_stats(self.character, storage=storage)
+            self.assertEqual(stats["atk"], 700)
+            self.assertEqual(stats["hp"], 1000)
+
+    @override_settings(STAT_STORAGE="packed")
+    def test_packed_reads_use_one_query(self):
+        set_stats({self.character: {"atk": 600}, self.lightcone: {"atk": 500}})
+        with self.assertNumQueries(1):
+            vector = get_build_vector(self.character, self.lightcone)
+        self.assertEqual(vector[STAT_INDEX["atk"]], 1100)
+
+    def test_pack_stats_command(self):
+        set_stats(
+            {
+                self.character: {"atk": 600, "critrate": 0.05},
+                self.lightcone: {"atk": 500},
+            },
+            storage="rows",
+        )
+        call_command("pack_stats", "--batch-size", "1", stdout=StringIO())
+        self.assertEqual(get_stats(self.character, storage="packed")["atk"], 600)
+        self.assertEqual(get_stats(self.lightcone, storage="packed")["atk"], 500)
+        self.assertEqual(Stat.objects.filter(value__gt=0).count(), 3)
+
+        call_command("pack_stats", "--delete-rows", stdout=StringIO())
+        self.assertEqual(Stat.objects.count(), 0)
+        self.assertEqual(get_stats(self.character, storage="packed")["critrate"], 0.05)
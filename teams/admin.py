@@ -1,5 +1,5 @@
 from django.contrib import admin
-from teams.models import Team, TeamCharacter
+from teams.models import Team, TeamCharacter, TeamSummary
 
 
 class TeamAdmin(admin.ModelAdmin):
@@ -13,3 +13,11 @@ class TeamAdmin(admin.ModelAdmin):
 
 admin.site.register(Team, TeamAdmin)
 admin.site.register(TeamCharacter)
+
+
+@admin.register(TeamSummary)
+class TeamSummaryAdmin(admin.ModelAdmin):
+    list_display = ("name", "member_count", "total_rarity", "is_complete", "updated")
+    list_filter = ("is_complete", "member_count")
+    search_fields = ("name",)
+    readonly_fields = [field.name for field in TeamSummary._meta.fields]
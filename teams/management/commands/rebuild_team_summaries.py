@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from teams.summaries import rebuild_team_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute the summary of every team."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Teams refreshed per batch."
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_team_summaries(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} team summaries."))
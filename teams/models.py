@@ -34,3 +34,64 @@ class TeamCharacter(Model):
 
     def __str__(self):
         return f"{self.character.name} in {self.team.name}"
+
+
+class TeamSummary(Model):
+    """
+    Precomputed aggregates of a team, so teams can be listed and filtered from one
+    table. Kept up to date by the signals in ``teams.signals``, rebuilt with
+    ``manage.py rebuild_team_summaries``.
+
+    Members are the team's characters, whether added to ``Team.members`` or through a
+    ``TeamCharacter``. ``members`` maps their ids to names, the histograms count them
+    by element type and path. A team is complete when every member has a
+    ``TeamCharacter`` with a lightcone and a relic in every slot.
+    """
+
+    team = models.OneToOneField(Team, on_delete=models.CASCADE, related_name="summary")
+    name = models.CharField(max_length=128, db_index=True)
+    members = models.JSONField(default=dict)
+    member_count = models.PositiveSmallIntegerField(default=0, db_index=True)
+    type_counts = models.JSONField(default=dict)
+    path_counts = models.JSONField(default=dict)
+    total_rarity = models.PositiveSmallIntegerField(default=0, db_index=True)
+    is_complete = models.BooleanField(default=False, db_index=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Summary of {self.name}"
+
+    class Meta:
+        verbose_name = "Team Summary"
+        verbose_name_plural = "Team Summaries"
+
+
+class TeamSummaryKey(Model):
+    """
+    The member characters, element types and paths of a team summary, one row each,
+    so summaries are filtered through the index of this table instead of reading the
+    JSON columns of every summary. Written with the summaries.
+    """
+
+    KINDS = [
+        ("character", "Character"),
+        ("type", "Type"),
+        ("path", "Path"),
+    ]
+
+    team = models.ForeignKey(
+        Team, on_delete=models.CASCADE, related_name="summary_keys"
+    )
+    kind = models.CharField(max_length=16, choices=KINDS)
+    value = models.CharField(max_length=24)
+
+    def __str__(self):
+        return f"{self.kind} {self.value} of team {self.team_id}"
+
+    class Meta:
+        constraints = [
+            # Also the index filters seek, giving the team ids of a key
+            models.UniqueConstraint(
+                fields=["kind", "value", "team"], name="team_summary_key_unique"
+            ),
+        ]
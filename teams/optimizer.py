@@ -0,0 +1,204 @@
+"""
+Relic build search for a team character.
+
+Relics are grouped by slot into precomputed stat matrices, and the six slots are searched
+depth first with branch and bound: a partial build is abandoned as soon as an optimistic
+bound on its best completion can't beat the current top-k or reach the SPD floor.
+The bound is valid because every objective the engine computes only grows with each stat.
+"""
+
+import heapq
+import time
+from collections import Counter
+
+import numpy as np
+
+from relics.models import Relic
+from stats.engine import stat_vector
+from stats.models import STAT_COUNT, STAT_INDEX
+from stats.storage import get_stat_vectors
+
+SLOT_ORDER = [slot for slot, _ in Relic.SLOTS]
+PLANAR_SLOTS = {"orb", "rope"}
+
+
+class RelicOptimizer:
+    """
+    Find the top-k relic builds for an objective.
+
+    Args:
+        base (np.ndarray): The stat vector of the character and its lightcone.
+        relics (Iterable[Relic]): The relic pool to choose from.
+        objective (Callable): Maps a ``(n, STAT_COUNT)`` matrix of builds to ``n`` scores.
+        spd_floor (float): The minimum SPD a build must reach.
+        set_bonuses (dict, optional): ``{set_name: {2: {stat: value}, 4: {stat: value}}}``.
+        top_k (int): How many builds to return.
+        time_budget (float): Seconds after which the best builds found so far are returned.
+    """
+
+    def __init__(
+        self,
+        base,
+        relics,
+        objective,
+        spd_floor=0.0,
+        set_bonuses=None,
+        top_k=5,
+        time_budget=2.0,
+    ):
+        self.base = np.asarray(base, dtype=float)
+        self.objective = objective
+        self.spd_floor = spd_floor
+        self.top_k = top_k
+        self.time_budget = time_budget
+
+        relics = list(relics)
+        vectors = get_stat_vectors(relics)
+        self.set_names = sorted({relic.set_name for relic in relics})
+        set_ids = {name: index for index, name in enumerate(self.set_names)}
+
+        # Precomputed per-slot arrays: relic ids, set ids and one stat row per relic
+        self.slots = []
+        for slot in SLOT_ORDER:
+            slot_relics = [relic for relic in relics if relic.slot == slot]
+            if not slot_relics:
+                continue
+            self.slots.append(
+                {
+                    "slot": slot,
+                    "ids": [relic.pk for relic in slot_relics],
+                    "sets": np.array([set_ids[r.set_name] for r in slot_relics]),
+                    "stats": np.array(
+                        [vectors[(Relic, relic.pk)] for relic in slot_relics]
+                    ),
+                }
+            )
+
+        self.bonuses = self._get_bonus_vectors(set_bonuses or {})
+        self.bonus_bound = self._get_bonus_bound(relics)
+
+        # suffix_bounds[i] is the best each remaining slot from i on could add, stat by stat
+        self.suffix_bounds = [np.zeros(STAT_COUNT)]
+        for slot in reversed(self.slots):
+            self.suffix_bounds.insert(
+                0, self.suffix_bounds[0] + slot["stats"].max(axis=0)
+            )
+
+        self.spd = STAT_INDEX["spd"]
+        self.results = []
+        self.explored = 0
+        self.complete = True
+
+    def _get_bonus_vectors(self, set_bonuses):
+        bonuses = {}
+        for index, name in enumerate(self.set_names):
+            pieces = set_bonuses.get(name, {})
+            bonuses[index] = {
+                count: stat_vector(pieces.get(count) or pieces.get(str(count)))
+                for count in (2, 4)
+            }
+        return bonuses
+
+    def _get_bonus_bound(self, relics):
+        """An upper bound, stat by stat, on the set bonuses any build can activate."""
+        planar = {r.set_name for r in relics if r.slot in PLANAR_SLOTS}
+        cavern = {r.set_name for r in relics if r.slot not in PLANAR_SLOTS}
+        set_ids = {name: index for index, name in enumerate(self.set_names)}
+
+        bound = np.zeros(STAT_COUNT)
+        if cavern:
+            two_piece = np.max([self.bonuses[set_ids[n]][2] for n in cavern], axis=0)
+            four_piece = np.max(
+                [
+                    self.bonuses[set_ids[n]][2] + self.bonuses[set_ids[n]][4]
+                    for n in cavern
+                ],
+                axis=0,
+            )
+            # Four cavern slots hold either one 4-piece set or two 2-piece sets
+            bound += np.maximum(four_piece, 2 * two_piece)
+        if planar:
+            bound += np.max([self.bonuses[set_ids[n]][2] for n in planar], axis=0)
+        return bound
+
+    def _get_set_bonus(self, set_counts):
+        bonus = np.zeros(STAT_COUNT)
+        for set_id, count in set_counts.items():
+            if count >= 2:
+                bonus += self.bonuses[set_id][2]
+            if count >= 4:
+                bonus += self.bonuses[set_id][4]
+        return bonus
+
+    def _threshold(self):
+        return self.results[0][0] if len(self.results) >= self.top_k else -np.inf
+
+    def optimize(self):
+        """
+        Run the search.
+
+        Returns:
+            list: Up to ``top_k`` builds, best first, each with its ``score``, ``spd``
+            and the chosen relic id per slot.
+        """
+        self.deadline = time.monotonic() + self.time_budget
+        if self.slots:
+            self._search(0, self.base, [], Counter())
+        return [
+            {"score": float(score), "spd": float(spd), "relics": relics}
+            for score, _, spd, relics in sorted(self.results, reverse=True)
+        ]
+
+    def _search(self, depth, partial, chosen, set_counts):
+        if time.monotonic() > self.deadline:
+            self.complete = False
+            return
+
+        slot = self.slots[depth]
+        children = partial + slot["stats"]
+        self.explored += len(children)
+
+        if depth == len(self.slots) - 1:
+            self._collect(children, slot, chosen, set_counts)
+            return
+
+        optimistic = children + self.suffix_bounds[depth + 1] + self.bonus_bound
+        bounds = self.objective(optimistic)
+        feasible = optimistic[:, self.spd] >= self.spd_floor
+
+        for index in np.argsort(-bounds):
+            if not feasible[index] or bounds[index] <= self._threshold():
+                continue
+            set_id = slot["sets"][index]
+            set_counts[set_id] += 1
+            chosen.append((slot["slot"], slot["ids"][index]))
+            self._search(depth + 1, children[index], chosen, set_counts)
+            chosen.pop()
+            set_counts[set_id] -= 1
+            if not self.complete:
+                return
+
+    def _collect(self, children, slot, chosen, set_counts):
+        """Score the complete builds of the last slot in one batch and keep the top-k."""
+        builds = children.copy()
+        for set_id in np.unique(slot["sets"]):
+            counts = set_counts.copy()
+            counts[set_id] += 1
+            builds[slot["sets"] == set_id] += self._get_set_bonus(counts)
+
+        scores = self.objective(builds)
+        for index in np.flatnonzero(builds[:, self.spd] >= self.spd_floor):
+            if scores[index] <= self._threshold():
+                continue
+            relics = dict(chosen)
+            relics[slot["slot"]] = slot["ids"][index]
+            entry = (
+                scores[index],
+                self.explored + index,
+                builds[index, self.spd],
+                relics,
+            )
+            if len(self.results) < self.top_k:
+                heapq.heappush(self.results, entry)
+            else:
+                heapq.heapreplace(self.results, entry)
@@ -1,5 +1,10 @@
 from rest_framework import serializers
-from teams.models import Team, TeamCharacter
+from characters.models import Character
+from characters.serializers import CharacterSerializer
+from lightcones.serializers import LightconeSerializer
+from relics.serializers import RelicSerializer
+from stats.engine import STAT_INDEX
+from teams.models import Team, TeamCharacter, TeamSummary, TeamSummaryKey
 
 
 class TeamSerializer(serializers.ModelSerializer):
@@ -19,3 +24,163 @@ class TeamCharacterSerializer(serializers.ModelSerializer):
     class Meta:
         model = TeamCharacter
         fields = "__all__"
+
+
+class TeamMemberCharacterSerializer(CharacterSerializer):
+    class Meta(CharacterSerializer.Meta):
+        fields = ["id", *CharacterSerializer.Meta.fields]
+
+
+class TeamMemberLightconeSerializer(LightconeSerializer):
+    class Meta(LightconeSerializer.Meta):
+        fields = ["id", *LightconeSerializer.Meta.fields]
+
+
+class TeamMemberSerializer(serializers.ModelSerializer):
+    character = TeamMemberCharacterSerializer(read_only=True)
+    lightcone = TeamMemberLightconeSerializer(read_only=True)
+    relics = RelicSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = TeamCharacter
+        fields = ["id", "character", "lightcone", "relics"]
+
+
+class TeamCompositionSerializer(serializers.ModelSerializer):
+    """
+    A whole team in one response: its members with their character, abilities,
+    lightcone and relics.
+    """
+
+    members = TeamMemberSerializer(
+        source="teamcharacter_set", many=True, read_only=True
+    )
+
+    class Meta:
+        model = Team
+        fields = ["id", "name", "members"]
+
+
+class TeamSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TeamSummary
+        fields = [
+            "team",
+            "name",
+            "members",
+            "member_count",
+            "type_counts",
+            "path_counts",
+            "total_rarity",
+            "is_complete",
+        ]
+
+
+class TeamSummaryFilterSerializer(serializers.Serializer):
+    character = serializers.IntegerField(required=False)
+    type = serializers.ChoiceField(choices=Character.TYPES, required=False)
+    path = serializers.ChoiceField(choices=Character.PATHS, required=False)
+    size = serializers.IntegerField(min_value=1, max_value=4, required=False)
+    min_rarity = serializers.IntegerField(min_value=0, required=False)
+    max_rarity = serializers.IntegerField(min_value=0, required=False)
+    complete = serializers.BooleanField(required=False, allow_null=True)
+
+    def filter_queryset(self, queryset):
+        """Filter team summaries by the validated parameters."""
+        data = self.validated_data
+        # Members, types and paths are looked up in the index of their keys, the JSON
+        # columns would be read for every summary
+        for kind in ("character", "type", "path"):
+            if kind in data:
+                queryset = queryset.filter(
+                    team_id__in=TeamSummaryKey.objects.filter(
+                        kind=kind, value=str(data[kind])
+                    ).values("team_id")
+                )
+        filters = {}
+        if "size" in data:
+            filters["member_count"] = data["size"]
+        if "min_rarity" in data:
+            filters["total_rarity__gte"] = data["min_rarity"]
+        if "max_rarity" in data:
+            filters["total_rarity__lte"] = data["max_rarity"]
+        if data.get("complete") is not None:
+            filters["is_complete"] = data["complete"]
+        return queryset.filter(**filters)
+
+
+class EnemySerializer(serializers.Serializer):
+    level = serializers.IntegerField(min_value=1, max_value=95, default=90)
+    resistance = serializers.FloatField(min_value=-1, max_value=0.9, default=0.2)
+    def_reduction = serializers.FloatField(min_value=0, max_value=1, default=0)
+    vulnerability = serializers.FloatField(min_value=0, default=0)
+    toughness = serializers.IntegerField(min_value=1, default=60)
+
+
+def is_anonymous(serializer) -> bool:
+    """Whether a serializer validates the data of an anonymous request."""
+    request = serializer.context.get("request")
+    return request is not None and not request.user.is_authenticated
+
+
+class DamageRequestSerializer(serializers.Serializer):
+    MAX_BUILDS = 10000
+    # Anonymous requests can't hold a worker as long
+    ANONYMOUS_MAX_BUILDS = 100
+
+    enemy = EnemySerializer(required=False)
+    builds = serializers.ListField(
+        child=serializers.DictField(child=serializers.FloatField()),
+        required=False,
+        max_length=MAX_BUILDS,
+    )
+
+    def validate_builds(self, builds):
+        if is_anonymous(self) and len(builds) > self.ANONYMOUS_MAX_BUILDS:
+            raise serializers.ValidationError(
+                f"Ensure this field has no more than {self.ANONYMOUS_MAX_BUILDS}"
+                " elements, or sign in."
+            )
+        unknown = {stat for build in builds for stat in build} - set(STAT_INDEX)
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown stat types: {', '.join(sorted(unknown))}"
+            )
+        return builds
+
+
+class OptimizeRequestSerializer(serializers.Serializer):
+    # Anonymous searches are cut shorter, the response says when they didn't finish
+    ANONYMOUS_MAX_TIME_BUDGET = 1
+
+    ability = serializers.IntegerField()
+    spd_floor = serializers.FloatField(min_value=0, default=0)
+    top_k = serializers.IntegerField(min_value=1, max_value=50, default=5)
+    time_budget = serializers.FloatField(min_value=0.1, max_value=10, default=2)
+    relics = serializers.ListField(child=serializers.IntegerField(), required=False)
+    set_bonuses = serializers.DictField(
+        child=serializers.DictField(
+            child=serializers.DictField(child=serializers.FloatField())
+        ),
+        required=False,
+    )
+    enemy = EnemySerializer(required=False)
+
+    def validate_time_budget(self, time_budget):
+        if is_anonymous(self):
+            return min(time_budget, self.ANONYMOUS_MAX_TIME_BUDGET)
+        return time_budget
+
+    def validate_set_bonuses(self, set_bonuses):
+        for name, pieces in set_bonuses.items():
+            if set(pieces) - {"2", "4"}:
+                raise serializers.ValidationError(
+                    f"Set bonuses of {name} must be keyed by 2 or 4 pieces."
+                )
+            unknown = {stat for bonus in pieces.values() for stat in bonus}
+            unknown -= set(STAT_INDEX)
+            if unknown:
+                raise serializers.ValidationError(
+                    f"Unknown stat types: {', '.join(sorted(unknown))}"
+                )
+        return set_bonuses
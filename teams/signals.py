@@ -0,0 +1,108 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from characters.models import Character
+from lightcones.models import Lightcone
+from relics.models import Relic
+from teams.models import Team, TeamCharacter
+from teams.summaries import get_character_team_ids, schedule_summary_refresh
+
+
+@receiver(post_save, sender=Team)
+def refresh_summary_on_team_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_summary_refresh([instance.pk])
+
+
+@receiver(m2m_changed, sender=Team.members.through)
+def refresh_summaries_on_members_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    # Clearing a character's teams doesn't say which teams, remember them beforehand
+    if action == "pre_clear" and reverse:
+        instance._cleared_team_ids = get_character_team_ids([instance.pk])
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        schedule_summary_refresh([instance.pk])
+    elif action == "post_clear":
+        schedule_summary_refresh(instance.__dict__.pop("_cleared_team_ids", ()))
+    else:
+        schedule_summary_refresh(pk_set)
+
+
+@receiver(post_save, sender=TeamCharacter)
+def refresh_summary_on_team_character_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_summary_refresh([instance.team_id])
+
+
+@receiver(post_delete, sender=TeamCharacter)
+def refresh_summary_on_team_character_delete(sender, instance, origin=None, **kwargs):
+    # Deletes cascading from a team or character are handled by their own receivers
+    if (
+        isinstance(origin, TeamCharacter)
+        or getattr(origin, "model", None) is TeamCharacter
+    ):
+        schedule_summary_refresh([instance.team_id])
+
+
+@receiver(m2m_changed, sender=TeamCharacter.relics.through)
+def refresh_summaries_on_relics_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action == "pre_clear" and reverse:
+        instance._cleared_team_ids = set(
+            instance.team_characters.values_list("team_id", flat=True)
+        )
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        schedule_summary_refresh([instance.team_id])
+    elif action == "post_clear":
+        schedule_summary_refresh(instance.__dict__.pop("_cleared_team_ids", ()))
+    else:
+        schedule_summary_refresh(
+            TeamCharacter.objects.filter(relics__in=[instance.pk]).values_list(
+                "team_id", flat=True
+            )
+        )
+
+
+@receiver(post_save, sender=Character)
+def refresh_summaries_on_character_save(sender, instance, created, raw=False, **kwargs):
+    # A new character isn't in any team yet, and only some fields are summarized
+    if not created and not raw and instance.has_changed(Character.tracked_fields):
+        schedule_summary_refresh(character_ids=[instance.pk])
+
+
+# Deletes remove membership and unequip rows without m2m or save signals, so the
+# affected teams are looked up before the delete and refreshed after it
+
+
+@receiver(pre_delete, sender=Character)
+def remember_character_teams(sender, instance, **kwargs):
+    instance._summary_team_ids = get_character_team_ids([instance.pk])
+
+
+@receiver(pre_delete, sender=Lightcone)
+def remember_lightcone_teams(sender, instance, **kwargs):
+    instance._summary_team_ids = set(
+        TeamCharacter.objects.filter(lightcone=instance).values_list(
+            "team_id", flat=True
+        )
+    )
+
+
+@receiver(pre_delete, sender=Relic)
+def remember_relic_teams(sender, instance, **kwargs):
+    instance._summary_team_ids = set(
+        TeamCharacter.objects.filter(relics=instance).values_list("team_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Character)
+@receiver(post_delete, sender=Lightcone)
+@receiver(post_delete, sender=Relic)
+def refresh_summaries_after_delete(sender, instance, **kwargs):
+    schedule_summary_refresh(instance.__dict__.pop("_summary_team_ids", ()))
@@ -0,0 +1,171 @@
+"""
+Computing the rows of the ``TeamSummary`` table.
+"""
+
+import threading
+from collections import Counter, defaultdict
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count
+
+from characters.models import Character
+from relics.models import Relic
+from teams.models import Team, TeamCharacter, TeamSummary, TeamSummaryKey
+
+
+def get_character_team_ids(character_ids: Iterable[int]) -> set:
+    """Get the ids of the teams the characters are members of."""
+    character_ids = list(character_ids)
+    return set(
+        Team.members.through.objects.filter(character_id__in=character_ids).values_list(
+            "team_id", flat=True
+        )
+    ) | set(
+        TeamCharacter.objects.filter(character_id__in=character_ids).values_list(
+            "team_id", flat=True
+        )
+    )
+
+
+_pending = threading.local()
+
+
+def schedule_summary_refresh(team_ids=(), character_ids=()):
+    """
+    Refresh the summaries of some teams, and of the teams of some characters, once the
+    current transaction commits, or right away outside of one.
+
+    Changes made in the same transaction are refreshed together, so creating a team
+    with its members and relics refreshes its summary once.
+    """
+    if not hasattr(_pending, "team_ids"):
+        _pending.team_ids, _pending.character_ids = set(), set()
+    _pending.team_ids.update(team_ids)
+    _pending.character_ids.update(character_ids)
+    transaction.on_commit(flush_summary_refreshes)
+
+
+def flush_summary_refreshes():
+    """Refresh the summaries scheduled so far."""
+    team_ids = getattr(_pending, "team_ids", set())
+    character_ids = getattr(_pending, "character_ids", set())
+    if not team_ids and not character_ids:
+        return
+    _pending.team_ids, _pending.character_ids = set(), set()
+    if character_ids:
+        team_ids |= get_character_team_ids(character_ids)
+    refresh_team_summaries(team_ids)
+
+
+def refresh_team_summaries(team_ids: Iterable[int]) -> int:
+    """
+    Recompute the summaries of some teams and their keys, with the same queries for
+    any number.
+
+    Summaries of teams that no longer exist are deleted. Everything is written in one
+    transaction, so readers never see a summary without its keys.
+
+    Args:
+        team_ids (Iterable[int]): The teams to refresh.
+
+    Returns:
+        int: How many summaries were written.
+    """
+    team_ids = set(team_ids)
+    if not team_ids:
+        return 0
+
+    with transaction.atomic():
+        # Locking the teams makes concurrent refreshes of the same team take turns, so
+        # their deletes and inserts of keys don't interleave
+        names = dict(
+            Team.objects.select_for_update()
+            .filter(pk__in=team_ids)
+            .order_by("pk")
+            .values_list("id", "name")
+        )
+        members = defaultdict(set)
+        for team_id, character_id in Team.members.through.objects.filter(
+            team_id__in=names
+        ).values_list("team_id", "character_id"):
+            members[team_id].add(character_id)
+
+        # Members with a lightcone and a relic in every slot, per team
+        equipped = defaultdict(set)
+        for team_id, character_id, lightcone_id, relic_slots in (
+            TeamCharacter.objects.filter(team_id__in=names)
+            .annotate(relic_slots=Count("relics__slot", distinct=True))
+            .values_list("team_id", "character_id", "lightcone_id", "relic_slots")
+        ):
+            members[team_id].add(character_id)
+            if lightcone_id is not None and relic_slots == len(Relic.SLOTS):
+                equipped[team_id].add(character_id)
+
+        characters = {
+            character["id"]: character
+            for character in Character.objects.filter(
+                pk__in={pk for ids in members.values() for pk in ids}
+            ).values("id", "name", "type", "path", "rarity")
+        }
+
+        summaries = []
+        keys = []
+        for team_id, name in names.items():
+            team_characters = [characters[pk] for pk in sorted(members[team_id])]
+            keys.extend(
+                TeamSummaryKey(team_id=team_id, kind=kind, value=value)
+                for kind, value in {
+                    *(("character", str(c["id"])) for c in team_characters),
+                    *(("type", c["type"]) for c in team_characters),
+                    *(("path", c["path"]) for c in team_characters),
+                }
+            )
+            summaries.append(
+                TeamSummary(
+                    team_id=team_id,
+                    name=name,
+                    members={str(c["id"]): c["name"] for c in team_characters},
+                    member_count=len(team_characters),
+                    type_counts=dict(Counter(c["type"] for c in team_characters)),
+                    path_counts=dict(Counter(c["path"] for c in team_characters)),
+                    total_rarity=sum(c["rarity"] for c in team_characters),
+                    is_complete=bool(team_characters)
+                    and members[team_id] <= equipped[team_id],
+                )
+            )
+
+        TeamSummary.objects.filter(team_id__in=team_ids - set(names)).delete()
+        TeamSummaryKey.objects.filter(team_id__in=team_ids).delete()
+        TeamSummaryKey.objects.bulk_create(keys, ignore_conflicts=True)
+        TeamSummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=["team"],
+            update_fields=[
+                "name",
+                "members",
+                "member_count",
+                "type_counts",
+                "path_counts",
+                "total_rarity",
+                "is_complete",
+                "updated",
+            ],
+        )
+        return len(summaries)
+
+
+def rebuild_team_summaries(batch_size=1000) -> int:
+    """
+    Recompute every team summary in batches, and delete summaries of deleted teams.
+
+    Returns:
+        int: How many summaries were written.
+    """
+    TeamSummary.objects.exclude(team__in=Team.objects.all()).delete()
+    count = 0
+    team_ids = list(Team.objects.order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(team_ids), batch_size):
+        count += refresh_team_summaries(team_ids[start : start + batch_size])
+    return count
@@ -1,11 +1,35 @@
+import itertools
+from collections import Counter
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework.throttling import ScopedRateThrottle
 from rest_framework import status
-from teams.models import Team, TeamCharacter
+from teams.models import Team, TeamCharacter, TeamSummary, TeamSummaryKey
+from teams.serializers import (
+    DamageRequestSerializer,
+    OptimizeRequestSerializer,
+    TeamSummaryFilterSerializer,
+)
+from abilities.models import Ability
 from characters.models import Character
 from lightcones.models import Lightcone
 from relics.models import Relic
+from stats.engine import STAT_INDEX, evaluate_builds, get_stat_vectors, stat_vector
+from stats.tests import add_stats
+from teams.optimizer import PLANAR_SLOTS, RelicOptimizer
+from teams.summaries import refresh_team_summaries
 from users.models import SilverRailUser
+from utils.gamedata import GameDataImporter
+from utils.testing import QueryPlanAssertionsMixin, create_teams
 
 
 def create_character(name="Test Character", rarity=5, path="destruction", type="fire"):
@@ -67,3 +91,361 @@ class TeamCharacterModelTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         team_character.refresh_from_db()
         self.assertFalse(team_character.relics.filter(id=relic.id).exists())
+
+
+class TeamCharacterDamageTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        team, character, lightcone, self.team_character = (
+            TeamCharacterModelTests.create_team_character()
+        )
+        Ability.objects.create(character=character, name="Blaze", type="skill")
+        Ability.objects.create(character=character, name="Inferno", type="ultimate")
+        add_stats(character, atk=1000)
+        self.url = reverse("teamcharacter-damage", args=[self.team_character.pk])
+
+    def test_damage_of_equipped_build(self):
+        response = self.client.get(self.url, {"level": 90})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["builds"], 1)
+        skill, ultimate = response.data["abilities"]
+        self.assertEqual(skill["name"], "Blaze")
+        self.assertAlmostEqual(ultimate["expected"][0], skill["expected"][0] * 2)
+
+    def test_damage_of_candidate_builds(self):
+        data = {
+            "builds": [{}, {"critrate": 1.0, "critdmg": 1.0}, {"atk": 1000}],
+            "enemy": {"resistance": 0},
+        }
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = response.data["abilities"][0]["expected"]
+        self.assertEqual(len(expected), 3)
+        self.assertAlmostEqual(expected[1], expected[0] * 2)
+        self.assertAlmostEqual(expected[2], expected[0] * 2)
+
+    def test_unknown_stat_is_rejected(self):
+        data = {"builds": [{"luck": 1.0}]}
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_anonymous_batches_are_smaller(self):
+        data = {"builds": [{}] * (DamageRequestSerializer.ANONYMOUS_MAX_BUILDS + 1)}
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("builds", response.data)
+
+        user = SilverRailUser.objects.create_user(
+            username="player", email="player@example.com", password="Player1234##"
+        )
+        self.client.force_authenticate(user=user)
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_requests_are_throttled(self):
+        with mock.patch.dict(ScopedRateThrottle.THROTTLE_RATES, {"compute": "1/day"}):
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Reads of the same viewset have their own rates
+        response = self.client.get(
+            reverse("teamcharacter-detail", args=[self.team_character.pk])
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class RelicOptimizerTests(APITestCase):
+
+    @staticmethod
+    def create_pool(seed=0, sets=("Thunder", "Flame", "Ice"), planar=("Glamoth",)):
+        rng = np.random.default_rng(seed)
+        relics = []
+        for slot, _ in Relic.SLOTS:
+            for set_name in planar if slot in PLANAR_SLOTS else sets:
+                relic = Relic.objects.create(
+                    name=f"{set_name} {slot}", set_name=set_name, slot=slot
+                )
+                add_stats(
+                    relic,
+                    atk=rng.uniform(0, 400),
+                    critrate=rng.uniform(0, 0.2),
+                    critdmg=rng.uniform(0, 0.4),
+                    spd=rng.uniform(0, 10),
+                )
+                relics.append(relic)
+        return relics
+
+    @staticmethod
+    def objective(builds):
+        return evaluate_builds(builds, "fire", 2.0)["expected"]
+
+    def brute_force(self, relics, base, set_bonuses, spd_floor, top_k):
+        vectors = get_stat_vectors(relics)
+        by_slot = [[r for r in relics if r.slot == slot] for slot, _ in Relic.SLOTS]
+        scored = []
+        for combination in itertools.product(*by_slot):
+            build = base + sum(vectors[(Relic, r.pk)] for r in combination)
+            counts = Counter(r.set_name for r in combination)
+            for set_name, count in counts.items():
+                bonus = set_bonuses.get(set_name, {})
+                if count >= 2:
+                    build = build + stat_vector(bonus.get(2))
+                if count >= 4:
+                    build = build + stat_vector(bonus.get(4))
+            if build[STAT_INDEX["spd"]] >= spd_floor:
+                scored.append(self.objective(build)[0])
+        return sorted(scored, reverse=True)[:top_k]
+
+    def test_matches_exhaustive_search(self):
+        relics = self.create_pool()
+        base = stat_vector({"atk": 1000, "critrate": 0.05, "critdmg": 0.5, "spd": 100})
+        set_bonuses = {
+            "Flame": {2: {"fireboost": 0.1}, 4: {"atk": 300}},
+            "Thunder": {2: {"atk": 150}, 4: {"critdmg": 0.3}},
+            "Glamoth": {2: {"spd": 5, "atk": 50}},
+        }
+        optimizer = RelicOptimizer(
+            base, relics, self.objective, 130, set_bonuses, top_k=5
+        )
+        builds = optimizer.optimize()
+        self.assertTrue(optimizer.complete)
+        expected = self.brute_force(relics, base, set_bonuses, 130, 5)
+        self.assertEqual(len(builds), len(expected))
+        for build, score in zip(builds, expected):
+            self.assertAlmostEqual(build["score"], score)
+            self.assertGreaterEqual(build["spd"], 130)
+        # The bound must have pruned part of the 3^4 * 1^2 search space
+        self.assertLess(optimizer.explored, 3 + 9 + 27 + 81 + 81 + 81)
+
+    def test_unreachable_spd_floor_returns_nothing(self):
+        relics = self.create_pool()
+        optimizer = RelicOptimizer(stat_vector(), relics, self.objective, 1000)
+        self.assertEqual(optimizer.optimize(), [])
+        self.assertTrue(optimizer.complete)
+
+    def test_time_budget_stops_search(self):
+        relics = self.create_pool()
+        optimizer = RelicOptimizer(
+            stat_vector({"atk": 1000}), relics, self.objective, time_budget=0
+        )
+        optimizer.optimize()
+        self.assertFalse(optimizer.complete)
+
+    def test_optimize_endpoint(self):
+        team, character, lightcone, team_character = (
+            TeamCharacterModelTests.create_team_character()
+        )
+        ability = Ability.objects.create(
+            character=character, name="Blaze", type="skill"
+        )
+        relics = self.create_pool()
+        url = reverse("teamcharacter-optimize", args=[team_character.pk])
+        data = {
+            "ability": ability.pk,
+            "top_k": 3,
+            "relics": [relic.pk for relic in relics],
+            "set_bonuses": {"Flame": {"4": {"atk": 300}}},
+        }
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["complete"])
+        self.assertEqual(len(response.data["builds"]), 3)
+        self.assertEqual(
+            set(response.data["builds"][0]["relics"]), {s for s, _ in Relic.SLOTS}
+        )
+
+        data["ability"] = ability.pk + 1
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_anonymous_searches_are_shorter(self):
+        request = Request(APIRequestFactory().post("/"))
+        for user, time_budget in ((AnonymousUser(), 1), (SilverRailUser(), 10)):
+            request.user = user
+            serializer = OptimizeRequestSerializer(
+                data={"ability": 1, "time_budget": 10}, context={"request": request}
+            )
+            serializer.is_valid(raise_exception=True)
+            self.assertEqual(serializer.validated_data["time_budget"], time_budget)
+
+
+class TeamCompositionTests(APITestCase):
+
+    def test_team_is_returned_whole(self):
+        create_teams(1)
+        team = Team.objects.get()
+        response = self.client.get(reverse("team-composition-detail", args=[team.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(response.data["name"], "Team 0")
+        member = response.data["members"][0]
+        self.assertEqual(member["character"]["name"], "Character 0-0")
+        self.assertEqual(member["character"]["abilities"][0]["name"], "Strike")
+        self.assertEqual(member["lightcone"]["name"], "Lightcone 0-0")
+        self.assertCountEqual(
+            [relic["slot"] for relic in member["relics"]], ["head", "hands"]
+        )
+        self.assertEqual(len(response.data["members"]), 4)
+
+    def test_query_count_does_not_grow_with_teams(self):
+        url = reverse("team-composition-list")
+        create_teams(2)
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+        create_teams(10, start=2)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 12)
+
+
+class TeamSummaryTests(QueryPlanAssertionsMixin, APITestCase):
+
+    def setUp(self):
+        self.fire = create_character("Fire", rarity=5, type="fire")
+        self.ice = create_character("Ice", rarity=4, type="ice", path="hunt")
+        self.lightcone = Lightcone.objects.create(
+            name="Lightcone A", rarity=5, path="destruction", ability="Ability A"
+        )
+        self.relics = [
+            Relic.objects.create(name=f"Relic {slot}", set_name="Thunder", slot=slot)
+            for slot, _ in Relic.SLOTS
+        ]
+
+    def create_team(self, name="Team A"):
+        with self.captureOnCommitCallbacks(execute=True):
+            team = Team.objects.create(name=name)
+            team.members.add(self.fire)
+            member = TeamCharacter.objects.create(
+                team=team, character=self.ice, lightcone=self.lightcone
+            )
+            member.relics.set(self.relics)
+        return team, member
+
+    def test_summary_is_built_from_signals(self):
+        team, _ = self.create_team()
+        summary = TeamSummary.objects.get(team=team)
+        self.assertEqual(
+            summary.members, {str(self.fire.pk): "Fire", str(self.ice.pk): "Ice"}
+        )
+        self.assertEqual(summary.type_counts, {"fire": 1, "ice": 1})
+        self.assertEqual(summary.path_counts, {"destruction": 1, "hunt": 1})
+        self.assertEqual(summary.total_rarity, 9)
+        # The fire member has no lightcone or relics
+        self.assertFalse(summary.is_complete)
+
+    def test_summary_follows_member_changes(self):
+        team, member = self.create_team()
+        with self.captureOnCommitCallbacks(execute=True):
+            team.members.remove(self.fire)
+        self.assertTrue(TeamSummary.objects.get(team=team).is_complete)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            member.relics.remove(self.relics[0])
+        self.assertFalse(TeamSummary.objects.get(team=team).is_complete)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ice.type = "wind"
+            self.ice.save()
+        self.assertEqual(TeamSummary.objects.get(team=team).type_counts, {"wind": 1})
+
+    def test_imports_refresh_summaries(self):
+        team, _ = self.create_team()
+        record = {"model": "character", "name": "Ice", "path": "hunt", "rarity": 4}
+        with self.captureOnCommitCallbacks(execute=True):
+            GameDataImporter().run([{**record, "type": "wind"}])
+        self.assertEqual(
+            TeamSummary.objects.get(team=team).type_counts, {"fire": 1, "wind": 1}
+        )
+        self.assertTrue(
+            TeamSummaryKey.objects.filter(team=team, kind="type", value="wind").exists()
+        )
+
+    def test_refresh_is_atomic(self):
+        team, _ = self.create_team()
+        # Left to the refresh below
+        team.members.remove(self.fire)
+        with mock.patch.object(
+            TeamSummary.objects, "bulk_create", side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            refresh_team_summaries([team.pk])
+        # The keys of the old summary are left in place
+        self.assertEqual(
+            TeamSummaryKey.objects.filter(team=team, kind="character").count(), 2
+        )
+
+    def test_changes_in_one_transaction_refresh_once(self):
+        with mock.patch(
+            "teams.summaries.refresh_team_summaries"
+        ) as refresh, self.captureOnCommitCallbacks(execute=True):
+            self.create_team()
+        refresh.assert_called_once()
+
+    def test_deletes_refresh_summaries(self):
+        team, member = self.create_team()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lightcone.delete()
+        self.assertFalse(TeamSummary.objects.get(team=team).is_complete)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ice.delete()
+        summary = TeamSummary.objects.get(team=team)
+        self.assertEqual(summary.members, {str(self.fire.pk): "Fire"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            team.delete()
+        self.assertFalse(TeamSummary.objects.exists())
+
+    def test_rebuild_command(self):
+        team, _ = self.create_team()
+        TeamSummary.objects.all().delete()
+        out = StringIO()
+        call_command("rebuild_team_summaries", stdout=out)
+        self.assertEqual(TeamSummary.objects.get(team=team).member_count, 2)
+        self.assertIn("Rebuilt 1 team summaries", out.getvalue())
+
+    def test_filter_endpoint(self):
+        first, _ = self.create_team("Team A")
+        with self.captureOnCommitCallbacks(execute=True):
+            second = Team.objects.create(name="Team B")
+            second.members.add(self.fire)
+        url = reverse("teamsummary-list")
+
+        def names(**params):
+            with self.assertNumQueries(1):
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [summary["name"] for summary in response.data["results"]]
+
+        self.assertEqual(names(), ["Team A", "Team B"])
+        self.assertEqual(names(character=self.ice.pk), ["Team A"])
+        self.assertEqual(names(type="fire"), ["Team A", "Team B"])
+        self.assertEqual(names(path="hunt", size=2), ["Team A"])
+        self.assertEqual(names(max_rarity=5), ["Team B"])
+        self.assertEqual(names(complete="false"), ["Team A", "Team B"])
+
+        response = self.client.get(url, {"type": "water"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filters_use_the_key_index(self):
+        team, _ = self.create_team()
+        self.assertCountEqual(
+            TeamSummaryKey.objects.filter(team=team).values_list("kind", "value"),
+            [
+                ("character", str(self.fire.pk)),
+                ("character", str(self.ice.pk)),
+                ("type", "fire"),
+                ("type", "ice"),
+                ("path", "destruction"),
+                ("path", "hunt"),
+            ],
+        )
+
+        filters = TeamSummaryFilterSerializer(
+            data={"character": self.ice.pk, "type": "fire", "path": "hunt"}
+        )
+        filters.is_valid(raise_exception=True)
+        queryset = filters.filter_queryset(TeamSummary.objects.all())
+        self.assertEqual(list(queryset.values_list("team", flat=True)), [team.pk])
+        self.assertUsesIndex(queryset, ordered=False)
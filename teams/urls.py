@@ -6,5 +6,27 @@ from teams import views
 router = DefaultRouter()
 router.register(r"teams", views.TeamViewSet)
 router.register(r"tc", views.TeamCharacterViewSet)
+router.register(r"summaries", views.TeamSummaryViewSet)
+router.register(
+    r"compositions", views.TeamCompositionViewSet, basename="team-composition"
+)
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path("", include(router.urls)),
+    path("async/teams/", views.AsyncTeamView.as_view(), name="team-async-list"),
+    path(
+        "async/teams/<int:pk>/",
+        views.AsyncTeamView.as_view(),
+        name="team-async-detail",
+    ),
+    path(
+        "async/compositions/",
+        views.AsyncTeamCompositionView.as_view(),
+        name="team-composition-async-list",
+    ),
+    path(
+        "async/compositions/<int:pk>/",
+        views.AsyncTeamCompositionView.as_view(),
+        name="team-composition-async-detail",
+    ),
+]
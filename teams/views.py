@@ -1,12 +1,34 @@
+import numpy as np
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 
-from teams.models import Team, TeamCharacter
-from teams.serializers import TeamSerializer, TeamCharacterSerializer
+from relics.models import Relic
+from stats.engine import (
+    DEFAULT_ABILITY_MULTIPLIERS,
+    STAT_INDEX,
+    evaluate_abilities,
+    evaluate_builds,
+    get_build_vector,
+)
+from teams.models import Team, TeamCharacter, TeamSummary
+from teams.optimizer import RelicOptimizer
+from teams.serializers import (
+    DamageRequestSerializer,
+    EnemySerializer,
+    OptimizeRequestSerializer,
+    TeamCharacterSerializer,
+    TeamCompositionSerializer,
+    TeamSerializer,
+    TeamSummaryFilterSerializer,
+    TeamSummarySerializer,
+)
+from utils.views import AsyncReadOnlyView, PrefetchQuerysetMixin
 
 
-class TeamViewSet(viewsets.ModelViewSet):
+class TeamViewSet(PrefetchQuerysetMixin, viewsets.ModelViewSet):
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
 
@@ -18,7 +40,54 @@ class TeamViewSet(viewsets.ModelViewSet):
         return [permission() for permission in self.permission_classes]
 
 
-class TeamCharacterViewSet(viewsets.ModelViewSet):
+class TeamCompositionViewSet(PrefetchQuerysetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Teams with their members, lightcones, relics and abilities, for rendering team
+    cards. The query plan comes from the serializer, so a page takes the same four
+    queries however many teams and members it holds.
+    """
+
+    queryset = Team.objects.all()
+    serializer_class = TeamCompositionSerializer
+    permission_classes = [AllowAny]
+
+
+class AsyncTeamView(AsyncReadOnlyView):
+    queryset = Team.objects.all()
+    serializer_class = TeamSerializer
+
+
+class AsyncTeamCompositionView(AsyncReadOnlyView):
+    """
+    Async version of ``TeamCompositionViewSet``. The relics and the character
+    abilities of the members are fetched at the same time.
+    """
+
+    queryset = Team.objects.all()
+    serializer_class = TeamCompositionSerializer
+
+
+class TeamSummaryViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Teams listed and filtered from their precomputed summaries, without joining
+    members. Filters: ``character``, ``type``, ``path``, ``size``, ``min_rarity``,
+    ``max_rarity`` and ``complete``.
+    """
+
+    queryset = TeamSummary.objects.all()
+    serializer_class = TeamSummarySerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            filters = TeamSummaryFilterSerializer(data=self.request.query_params)
+            filters.is_valid(raise_exception=True)
+            queryset = filters.filter_queryset(queryset)
+        return queryset
+
+
+class TeamCharacterViewSet(PrefetchQuerysetMixin, viewsets.ModelViewSet):
     queryset = TeamCharacter.objects.all()
     serializer_class = TeamCharacterSerializer
 
@@ -29,5 +98,119 @@ class TeamCharacterViewSet(viewsets.ModelViewSet):
             self.permission_classes = [AllowAny]
         return [permission() for permission in self.permission_classes]
 
+    def get_throttles(self):
+        # Damage batches and relic searches cost far more than reads
+        if self.action in ("damage", "optimize"):
+            self.throttle_scope = "compute"
+        return super().get_throttles()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ("damage", "optimize"):
+            queryset = queryset.select_related(
+                "character", "lightcone"
+            ).prefetch_related("relics", "character__abilities")
+        return queryset
+
     def create(self, request, *args, **kwargs):
         return Response({"detail": 'Method "POST" not allowed.'}, status=405)
+
+    @action(detail=True, methods=["get", "post"])
+    def damage(self, request, pk=None):
+        """
+        Compute the damage of each of the character's abilities with its equipped build.
+
+        GET takes the enemy parameters as query parameters. POST takes them under
+        ``enemy`` along with a list of ``builds``, each a mapping of stat deltas applied
+        on top of the equipped build, and evaluates all of them in one batch.
+        Anonymous requests take at most ``ANONYMOUS_MAX_BUILDS`` builds.
+        """
+        if request.method == "GET":
+            serializer = EnemySerializer(data=request.query_params)
+            serializer.is_valid(raise_exception=True)
+            enemy, builds = serializer.validated_data, [{}]
+        else:
+            serializer = DamageRequestSerializer(
+                data=request.data, context=self.get_serializer_context()
+            )
+            serializer.is_valid(raise_exception=True)
+            enemy = serializer.validated_data.get("enemy")
+            builds = serializer.validated_data.get("builds") or [{}]
+
+        team_character = self.get_object()
+        base = get_build_vector(
+            team_character.character,
+            team_character.lightcone,
+            team_character.relics.all(),
+        )
+        matrix = np.tile(base, (len(builds), 1))
+        for row, build in enumerate(builds):
+            for stat_type, value in build.items():
+                matrix[row, STAT_INDEX[stat_type]] += value
+
+        abilities = evaluate_abilities(team_character.character, matrix, enemy)
+        return Response(
+            {
+                "builds": len(builds),
+                "abilities": [
+                    {
+                        key: value.tolist() if isinstance(value, np.ndarray) else value
+                        for key, value in ability.items()
+                    }
+                    for ability in abilities
+                ],
+            }
+        )
+
+    @action(detail=True, methods=["post"])
+    def optimize(self, request, pk=None):
+        """
+        Search the relic pool for the builds that maximize one ability's expected damage.
+
+        Only builds reaching ``spd_floor`` are considered. The search stops after
+        ``time_budget`` seconds and returns the best builds found so far, in which case
+        ``complete`` is false. Anonymous searches get at most
+        ``ANONYMOUS_MAX_TIME_BUDGET`` seconds.
+        """
+        serializer = OptimizeRequestSerializer(
+            data=request.data, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        team_character = self.get_object()
+        character = team_character.character
+        ability = next(
+            (a for a in character.abilities.all() if a.pk == data["ability"]), None
+        )
+        if ability is None:
+            raise ValidationError({"ability": "Not one of this character's abilities."})
+
+        relics = Relic.objects.only("id", "set_name", "slot")
+        if "relics" in data:
+            relics = relics.filter(pk__in=data["relics"])
+
+        multiplier = DEFAULT_ABILITY_MULTIPLIERS.get(ability.type, 1.0)
+        enemy = data.get("enemy")
+        optimizer = RelicOptimizer(
+            base=get_build_vector(character, team_character.lightcone),
+            relics=relics,
+            objective=lambda builds: evaluate_builds(
+                builds, character.type, multiplier, enemy
+            )["expected"],
+            spd_floor=data["spd_floor"],
+            set_bonuses={
+                name: {int(pieces): bonus for pieces, bonus in bonuses.items()}
+                for name, bonuses in data.get("set_bonuses", {}).items()
+            },
+            top_k=data["top_k"],
+            time_budget=data["time_budget"],
+        )
+        builds = optimizer.optimize()
+        return Response(
+            {
+                "builds": builds,
+                "complete": optimizer.complete,
+                "explored": optimizer.explored,
+            }
+        )
@@ -0,0 +1,158 @@
+import asyncio
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.throttling import AnonRateThrottle
+from rest_framework_simplejwt.tokens import AccessToken
+
+from characters.models import Character
+from lightcones.models import Lightcone
+from relics.models import Relic
+from relics.views import AsyncRelicView
+from teams.models import Team
+from users.models import SilverRailUser
+from utils import routers
+from utils.routers import ReadReplicaMiddleware
+from utils.testing import create_teams
+
+ENDPOINTS = [
+    ("character", Character),
+    ("relic", Relic),
+    ("lightcone", Lightcone),
+    ("team", Team),
+    ("team-composition", Team),
+]
+
+
+class AsyncReadOnlyViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        create_teams(3, members=2)
+
+    def assertSameResponse(self, sync_url, async_url):
+        expected = self.client.get(sync_url)
+        response = self.client.get(async_url)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response["Content-Type"], "application/json")
+        # Links in the async responses point to the async endpoints
+        self.assertEqual(response.content.replace(b"async/", b""), expected.content)
+        return response
+
+    def test_list_and_detail_match_the_viewsets(self):
+        for name, model in ENDPOINTS:
+            with self.subTest(name):
+                pk = model.objects.first().pk
+                self.assertSameResponse(
+                    reverse(f"{name}-list"), reverse(f"{name}-async-list")
+                )
+                self.assertSameResponse(
+                    reverse(f"{name}-detail", args=[pk]),
+                    reverse(f"{name}-async-detail", args=[pk]),
+                )
+
+    async def test_async_client_gets_the_same_response(self):
+        expected = await self.async_client.get(reverse("team-composition-list"))
+        response = await self.async_client.get(reverse("team-composition-async-list"))
+        self.assertEqual(response.content, expected.content)
+
+    def test_pages_and_links_match_the_viewsets(self):
+        sync_url = f"{reverse('character-list')}?page_size=2"
+        async_url = f"{reverse('character-async-list')}?page_size=2"
+        pages = 0
+        while async_url:
+            response = self.assertSameResponse(sync_url, async_url)
+            data = response.json()
+            sync_url = data["next"] and data["next"].replace("async/", "")
+            async_url = data["next"]
+            pages += 1
+        self.assertEqual(pages, 3)
+
+        previous = data["previous"]
+        self.assertSameResponse(previous.replace("async/", ""), previous)
+
+    def test_filters_match_the_viewsets(self):
+        for query in ("?type=fire", "?type=fire,ice&rarity=5", "?type=water"):
+            with self.subTest(query):
+                self.assertSameResponse(
+                    reverse("character-list") + query,
+                    reverse("character-async-list") + query,
+                )
+
+    def test_missing_object_is_404(self):
+        self.assertSameResponse(
+            reverse("relic-detail", args=[0]), reverse("relic-async-detail", args=[0])
+        )
+
+    def test_query_count_does_not_grow_with_teams(self):
+        url = reverse("team-composition-async-list")
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()["results"]), 3)
+
+        create_teams(5, start=3, members=2)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()["results"]), 8)
+
+    def test_requests_share_the_throttles_of_the_viewsets(self):
+        with mock.patch.object(AnonRateThrottle, "rate", "2/day", create=True):
+            self.client.get(reverse("relic-list"))
+            self.assertEqual(
+                self.client.get(reverse("relic-async-list")).status_code,
+                status.HTTP_200_OK,
+            )
+            response = self.client.get(reverse("relic-async-list"))
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", response)
+        self.assertIn("throttled", response.json()["detail"])
+
+    def test_permissions_are_checked(self):
+        url = reverse("relic-async-list")
+        with mock.patch.object(AsyncRelicView, "permission_classes", [IsAdminUser]):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertIn("WWW-Authenticate", response)
+
+            user = SilverRailUser.objects.create_superuser(
+                username="testadmin", email="testadmin@admin.com", password="x"
+            )
+            token = AccessToken.for_user(user)
+            response = self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ConcurrentPrefetchTests(TransactionTestCase):
+
+    def test_independent_prefetches_run_on_other_connections(self):
+        create_teams(3, members=2)
+        expected = self.client.get(reverse("team-composition-list"))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("team-composition-async-list"))
+        self.assertEqual(response.content, expected.content)
+        # The teams and their members here, relics and abilities in other threads
+        self.assertEqual(len(queries), 2)
+
+
+class AsyncMiddlewareTests(SimpleTestCase):
+
+    def test_async_requests_stay_async_and_read_only(self):
+        async def get_response(request):
+            return HttpResponse(str(routers._read_only.get()))
+
+        middleware = ReadReplicaMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        factory = RequestFactory()
+        response = asyncio.run(middleware(factory.get("/")))
+        self.assertEqual(response.content, b"True")
+        response = asyncio.run(middleware(factory.post("/")))
+        self.assertEqual(response.content, b"False")
@@ -0,0 +1,134 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from abilities.models import Ability
+from characters.models import Character
+from relics.models import Relic
+from users.models import SilverRailUser
+from utils.cache import (
+    bump_catalog_version,
+    get_catalog_cache_stats,
+    get_catalog_version,
+)
+
+
+class CatalogVersionTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_version_is_bumped_on_save_and_delete(self):
+        version = get_catalog_version(Relic)
+        with self.captureOnCommitCallbacks(execute=True):
+            relic = Relic.objects.create(
+                name="Ancient Crown", set_name="Ancient Set", slot="head"
+            )
+        self.assertGreater(get_catalog_version(Relic), version)
+        version = get_catalog_version(Relic)
+        with self.captureOnCommitCallbacks(execute=True):
+            relic.delete()
+        self.assertGreater(get_catalog_version(Relic), version)
+
+    def test_version_is_bumped_after_commit(self):
+        # A request reading the new version before the commit would cache the old rows
+        version = get_catalog_version(Relic)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Relic.objects.create(
+                name="Ancient Crown", set_name="Ancient Set", slot="head"
+            )
+            self.assertEqual(get_catalog_version(Relic), version)
+        self.assertEqual(get_catalog_version(Relic), version)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(get_catalog_version(Relic), version)
+
+    def test_ability_changes_bump_character_version(self):
+        character = Character.objects.create(
+            name="Hero", type="fire", path="destruction", rarity=5
+        )
+        version = get_catalog_version(Character)
+        with self.captureOnCommitCallbacks(execute=True):
+            Ability.objects.create(character=character, name="Fireball", type="skill")
+        self.assertGreater(get_catalog_version(Character), version)
+
+    def test_evicted_version_never_goes_backwards(self):
+        version = bump_catalog_version(Character)
+        cache.clear()
+        self.assertGreater(get_catalog_version(Character), version)
+
+
+class CatalogResponseCacheTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.character = Character.objects.create(
+            name="Hero", type="fire", path="destruction", rarity=5
+        )
+        self.character_list_url = reverse("character-list")
+        self.character_url = reverse(
+            "character-detail", kwargs={"pk": self.character.pk}
+        )
+        self.user = SilverRailUser.objects.create_superuser(
+            username="testadmin",
+            email="testadmin@admin.com",
+            password="TestAdmin1234##",
+        )
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get(self.character_list_url)
+        self.assertEqual(first["X-Cache"], "MISS")
+        # Only the conditional GET aggregate runs, nothing is serialized
+        with self.assertNumQueries(1):
+            second = self.client.get(self.character_list_url)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Type"], first["Content-Type"])
+        self.assertEqual(get_catalog_cache_stats(), {"hits": 1, "misses": 1})
+
+    def test_update_invalidates_cached_response(self):
+        self.client.get(self.character_url)
+        self.character.name = "Super Hero"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.character.save()
+        response = self.client.get(self.character_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["name"], "Super Hero")
+
+    def test_ability_change_invalidates_character_list(self):
+        self.client.get(self.character_list_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Ability.objects.create(
+                character=self.character, name="Fireball", type="skill"
+            )
+        response = self.client.get(self.character_list_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(
+            response.json()["results"][0]["abilities"][0]["name"], "Fireball"
+        )
+
+    def test_query_params_are_part_of_the_key(self):
+        self.client.get(self.character_list_url, {"a": 1, "b": 2})
+        response = self.client.get(self.character_list_url, {"b": 2, "a": 1})
+        self.assertEqual(response["X-Cache"], "HIT")
+        response = self.client.get(self.character_list_url, {"a": 2})
+        self.assertEqual(response["X-Cache"], "MISS")
+
+    def test_missing_objects_are_not_cached(self):
+        url = reverse("character-detail", kwargs={"pk": self.character.pk + 1})
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(get_catalog_cache_stats()["hits"], 0)
+
+    def test_cache_stats_requires_admin(self):
+        url = reverse("catalog-cache-stats")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.force_authenticate(user=self.user)
+        self.client.get(self.character_list_url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"hits": 0, "misses": 1})
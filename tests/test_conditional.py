@@ -0,0 +1,117 @@
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from abilities.models import Ability
+from characters.models import Character
+from lightcones.models import Lightcone
+from relics.models import Relic
+
+
+class ConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.character = Character.objects.create(
+            name="Hero", type="fire", path="destruction", rarity=5
+        )
+        self.ability = Ability.objects.create(
+            character=self.character, name="Fireball", type="skill"
+        )
+        self.character_list_url = reverse("character-list")
+        self.character_url = reverse(
+            "character-detail", kwargs={"pk": self.character.pk}
+        )
+
+    def test_responses_carry_validators(self):
+        relic = Relic.objects.create(
+            name="Ancient Crown", set_name="Ancient Set", slot="head"
+        )
+        response = self.client.get(reverse("relic-detail", kwargs={"pk": relic.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("ETag", response)
+        self.assertEqual(
+            response["Last-Modified"], http_date(relic.modified.timestamp())
+        )
+
+    def test_lists_and_nested_relations_have_no_last_modified(self):
+        # Deletes don't move MAX(modified), only the ETag notices them
+        for url in (self.character_list_url, self.character_url):
+            response = self.client.get(url)
+            self.assertIn("ETag", response)
+            self.assertNotIn("Last-Modified", response)
+
+    def test_matching_etag_returns_not_modified_without_serializing(self):
+        etag = self.client.get(self.character_list_url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(self.character_list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_if_modified_since_returns_not_modified(self):
+        relic = Relic.objects.create(
+            name="Ancient Crown", set_name="Ancient Set", slot="head"
+        )
+        url = reverse("relic-detail", kwargs={"pk": relic.pk})
+        last_modified = self.client.get(url)["Last-Modified"]
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_after_delete_returns_the_list(self):
+        Character.objects.create(name="Villain", type="ice", path="hunt", rarity=4)
+        self.client.get(self.character_list_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Character.objects.get(name="Villain").delete()
+        response = self.client.get(
+            self.character_list_url,
+            HTTP_IF_MODIFIED_SINCE=http_date(self.ability.modified.timestamp() + 60),
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_etag_changes_when_nested_relation_changes(self):
+        etag = self.client.get(self.character_url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ability.delete()
+        response = self.client.get(self.character_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["abilities"], [])
+
+    def test_etag_changes_when_row_is_added(self):
+        etag = self.client.get(self.character_list_url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Character.objects.create(name="Villain", type="ice", path="hunt", rarity=4)
+        response = self.client.get(self.character_list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_etag_depends_on_query_params(self):
+        etag = self.client.get(self.character_list_url)["ETag"]
+        response = self.client.get(
+            self.character_list_url, {"page": 2}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertNotEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_missing_object_is_not_conditional(self):
+        url = reverse("character-detail", kwargs={"pk": self.character.pk + 1})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_relics_and_lightcones_support_conditional_get(self):
+        relic = Relic.objects.create(
+            name="Ancient Crown", set_name="Ancient Set", slot="head"
+        )
+        lightcone = Lightcone.objects.create(
+            name="Bright Star", ability="a", path="destruction", rarity=4
+        )
+        for url in (
+            reverse("relic-detail", kwargs={"pk": relic.pk}),
+            reverse("lightcone-detail", kwargs={"pk": lightcone.pk}),
+        ):
+            etag = self.client.get(url)["ETag"]
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -0,0 +1,126 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from abilities.models import Ability
+from abilities.views import AbilityViewSet
+from characters.models import Character
+from characters.views import CharacterViewSet
+from lightcones.models import Lightcone
+from lightcones.views import LightconeViewSet
+from relics.models import Relic
+from relics.views import RelicViewSet
+from utils.testing import QueryPlanAssertionsMixin
+
+
+class CatalogFilterTests(QueryPlanAssertionsMixin, APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.hero, self.mage, self.guard = Character.objects.bulk_create(
+            [
+                Character(name="Hero", type="fire", path="destruction", rarity=5),
+                Character(name="Mage", type="ice", path="erudition", rarity=4),
+                Character(name="Guard", type="fire", path="preservation", rarity=4),
+            ]
+        )
+        Relic.objects.bulk_create(
+            [
+                Relic(set_name="Knight", slot="head"),
+                Relic(set_name="Knight", slot="body"),
+                Relic(set_name="Thief", slot="head"),
+            ]
+        )
+        Lightcone.objects.bulk_create(
+            [
+                Lightcone(name="Dawn", path="destruction", rarity=5),
+                Lightcone(name="Dusk", path="erudition", rarity=4),
+            ]
+        )
+        Ability.objects.bulk_create(
+            [
+                Ability(character=self.hero, name="Slash", type="basic"),
+                Ability(
+                    character=self.hero, name="Blaze", type="ultimate", targeting="aoe"
+                ),
+                Ability(
+                    character=self.mage, name="Frost", type="skill", targeting="blast"
+                ),
+            ]
+        )
+
+    def get_names(self, url_name, params, key="name"):
+        response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [row[key] for row in response.data["results"]]
+
+    def test_character_filters(self):
+        self.assertEqual(
+            self.get_names("character-list", {"type": "fire"}), ["Hero", "Guard"]
+        )
+        self.assertEqual(
+            self.get_names("character-list", {"path": "erudition"}), ["Mage"]
+        )
+        self.assertEqual(
+            self.get_names("character-list", {"rarity": "4"}), ["Mage", "Guard"]
+        )
+        self.assertEqual(
+            self.get_names("character-list", {"type": "fire", "rarity": "4"}), ["Guard"]
+        )
+
+    def test_comma_separated_values_match_any(self):
+        self.assertEqual(
+            self.get_names("character-list", {"path": "destruction,erudition"}),
+            ["Hero", "Mage"],
+        )
+
+    def test_relic_filters(self):
+        self.assertEqual(
+            self.get_names("relic-list", {"slot": "head"}, key="set_name"),
+            ["Knight", "Thief"],
+        )
+        self.assertEqual(
+            self.get_names("relic-list", {"set_name": "Knight"}, key="slot"),
+            ["head", "body"],
+        )
+
+    def test_lightcone_filters(self):
+        self.assertEqual(
+            self.get_names("lightcone-list", {"path": "erudition"}), ["Dusk"]
+        )
+        self.assertEqual(self.get_names("lightcone-list", {"rarity": "5"}), ["Dawn"])
+
+    def test_ability_filters(self):
+        self.assertEqual(self.get_names("ability-list", {"type": "skill"}), ["Frost"])
+        self.assertEqual(
+            self.get_names("ability-list", {"targeting": "aoe,blast"}),
+            ["Blaze", "Frost"],
+        )
+
+    def test_invalid_values_are_rejected(self):
+        for url_name, params in [
+            ("character-list", {"type": "water"}),
+            ("character-list", {"rarity": "high"}),
+            ("ability-list", {"targeting": "everyone"}),
+        ]:
+            response = self.client.get(reverse(url_name), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), response.data)
+
+    def test_filtered_pages_are_read_from_an_index(self):
+        for viewset in (
+            CharacterViewSet,
+            RelicViewSet,
+            LightconeViewSet,
+            AbilityViewSet,
+        ):
+            model = viewset.queryset.model
+            for field_name in viewset.filter_fields:
+                value = model._meta.get_field(field_name).flatchoices[:1]
+                value = value[0][0] if value else "Knight"
+                queryset = model.objects.filter(**{field_name: value}).order_by("id")
+                with self.subTest(model=model.__name__, field=field_name):
+                    # The first page, and a later page of the keyset pagination
+                    self.assertUsesIndex(queryset[:51])
+                    self.assertUsesIndex(queryset.filter(id__gt=1)[:51])
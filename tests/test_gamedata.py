@@ -0,0 +1,201 @@
+import io
+import json
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from abilities.models import Ability
+from characters.default_stats import DEFAULT_STATS
+from characters.models import Character
+from lightcones.models import Lightcone
+from relics.models import Relic
+from stats.models import Stat
+from utils.cache import get_catalog_version
+from utils.gamedata import GameDataError, GameDataImporter, iter_records
+
+RECORDS = [
+    {
+        "model": "character",
+        "name": "Kafka",
+        "path": "nihility",
+        "type": "lightning",
+        "rarity": 5,
+    },
+    {
+        "model": "ability",
+        "character": {"name": "Kafka", "path": "nihility"},
+        "name": "Midnight Tumult",
+        "type": "basic",
+    },
+    {
+        "model": "ability",
+        "character": ["Kafka", "nihility"],
+        "name": "Caressing Moonlight",
+        "type": "skill",
+        "skill_point_cost": 1,
+    },
+    {
+        "model": "relic",
+        "name": "Band's Polarized Sunglasses",
+        "set_name": "Band of Sizzling Thunder",
+        "slot": "head",
+    },
+    {
+        "model": "lightcone",
+        "name": "Patience Is All You Need",
+        "path": "nihility",
+        "rarity": 5,
+        "ability": "Increases DMG dealt by the wearer.",
+    },
+]
+
+
+class IterRecordsTests(TestCase):
+
+    def test_reads_json_lines(self):
+        stream = io.StringIO("\n".join(json.dumps(r) for r in RECORDS) + "\n\n")
+        self.assertEqual(list(iter_records(stream)), RECORDS)
+
+    def test_reads_json_array_in_chunks(self):
+        stream = io.StringIO(json.dumps(RECORDS, indent=2))
+        self.assertEqual(list(iter_records(stream, chunk_size=7)), RECORDS)
+
+    def test_empty_stream(self):
+        self.assertEqual(list(iter_records(io.StringIO("  \n"))), [])
+        self.assertEqual(list(iter_records(io.StringIO("[]"))), [])
+
+    def test_invalid_json(self):
+        with self.assertRaises(GameDataError):
+            list(iter_records(io.StringIO('{"model": "character"}\n{oops')))
+        with self.assertRaises(GameDataError):
+            list(iter_records(io.StringIO('[{"model": "character"}, {oops')))
+
+
+class GameDataImporterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_imports_every_model(self):
+        importer = GameDataImporter().run(RECORDS)
+
+        self.assertEqual(importer.errors, [])
+        self.assertEqual(importer.records, 5)
+        character = Character.objects.get(name="Kafka")
+        self.assertEqual(
+            set(character.abilities.values_list("name", flat=True)),
+            {"Midnight Tumult", "Caressing Moonlight"},
+        )
+        self.assertTrue(Relic.objects.filter(slot="head").exists())
+        self.assertTrue(Lightcone.objects.filter(path="nihility").exists())
+        self.assertEqual(
+            Stat.objects.filter(object_id=character.pk).count(), len(DEFAULT_STATS)
+        )
+
+    def test_reimport_updates_in_place(self):
+        GameDataImporter().run(RECORDS)
+        character_id = Character.objects.get(name="Kafka").pk
+
+        updated = [dict(record) for record in RECORDS]
+        updated[0]["rarity"] = 4
+        updated[2]["skill_point_cost"] = 2
+        importer = GameDataImporter().run(updated)
+
+        self.assertEqual(importer.errors, [])
+        self.assertEqual(Character.objects.count(), 1)
+        self.assertEqual(Ability.objects.count(), 2)
+        character = Character.objects.get()
+        self.assertEqual((character.pk, character.rarity), (character_id, 4))
+        self.assertEqual(
+            Ability.objects.get(name="Caressing Moonlight").skill_point_cost, 2
+        )
+
+    def test_duplicates_in_a_batch_keep_the_last_record(self):
+        records = [RECORDS[0], {**RECORDS[0], "rarity": 4}]
+        GameDataImporter().run(records)
+        self.assertEqual(Character.objects.get().rarity, 4)
+
+    def test_abilities_resolve_existing_characters(self):
+        character = Character.objects.create(
+            name="Kafka", path="nihility", type="lightning", rarity=5
+        )
+        importer = GameDataImporter().run(RECORDS[1:3])
+        self.assertEqual(importer.errors, [])
+        self.assertEqual(character.abilities.count(), 2)
+
+    def test_resolves_characters_with_one_query_per_batch(self):
+        records = [
+            {
+                "model": "character",
+                "name": f"Hero {i}",
+                "path": "hunt",
+                "type": "wind",
+                "rarity": 4,
+            }
+            for i in range(20)
+        ] + [
+            {
+                "model": "ability",
+                "character": [f"Hero {i}", "hunt"],
+                "name": "Strike",
+                "type": "basic",
+            }
+            for i in range(20)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            GameDataImporter(batch_size=100).run(records)
+
+        lookups = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('SELECT "characters_character"')
+        ]
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(Ability.objects.count(), 20)
+
+    def test_invalid_records_are_reported(self):
+        records = [
+            {**RECORDS[0], "rarity": 3},
+            {**RECORDS[1], "character": ["Nobody", "hunt"]},
+            {**RECORDS[3], "slot": "hat"},
+            {"model": "weapon", "name": "Sword"},
+            RECORDS[4],
+        ]
+        importer = GameDataImporter().run(records)
+
+        self.assertEqual(len(importer.errors), 4)
+        self.assertFalse(Character.objects.exists())
+        self.assertFalse(Ability.objects.exists())
+        self.assertFalse(Relic.objects.exists())
+        self.assertEqual(Lightcone.objects.count(), 1)
+
+    def test_strict_import_rolls_back(self):
+        with self.assertRaises(GameDataError):
+            GameDataImporter().run(
+                [RECORDS[4], {**RECORDS[0], "rarity": 3}], strict=True
+            )
+        self.assertFalse(Lightcone.objects.exists())
+
+    def test_bumps_catalog_versions(self):
+        versions = {model: get_catalog_version(model) for model in (Character, Relic)}
+        with self.captureOnCommitCallbacks(execute=True):
+            GameDataImporter().run(RECORDS)
+        for model, version in versions.items():
+            self.assertGreater(get_catalog_version(model), version)
+
+
+class ImportGameDataCommandTests(TestCase):
+
+    def test_command_imports_a_file(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as dump:
+            dump.write("\n".join(json.dumps(r) for r in RECORDS))
+            dump.flush()
+            out = io.StringIO()
+            call_command("import_gamedata", dump.name, stdout=out)
+
+        self.assertIn("Imported 5 of 5 records", out.getvalue())
+        self.assertEqual(Ability.objects.count(), 2)
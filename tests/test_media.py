@@ -0,0 +1,276 @@
+import hashlib
+from unittest import mock
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models.signals import pre_delete, pre_save
+from django.test import RequestFactory, TestCase, override_settings
+from PIL import ExifTags, Image
+
+from abilities.models import Ability
+from characters.models import Character, CharacterImage
+from characters.serializers import CharacterSerializer
+from filestore.jobs import run_jobs
+from filestore.models import StorageJob
+from filestore.references import sweep_released_files
+from utils.files import get_blob_name, get_content_hash
+from utils.images import (
+    generate_derivatives,
+    get_derivative_formats,
+    get_derivative_name,
+    get_derivative_names,
+    get_image_width,
+    render_derivatives,
+)
+from utils.model_utils import is_file_referenced_elsewhere
+
+IN_MEMORY_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "staticfiles": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+}
+ART = b"\x89PNG not really an image"
+ART_HASH = hashlib.sha256(ART).hexdigest()
+
+
+class ContentHashTests(TestCase):
+
+    def test_upload_handlers_hash_while_receiving(self):
+        request = RequestFactory().post(
+            "/", {"image": SimpleUploadedFile("art.png", ART)}
+        )
+        upload = request.FILES["image"]
+        self.assertEqual(upload.content_hash, ART_HASH)
+        self.assertEqual(get_content_hash(upload), ART_HASH)
+
+    def test_hashes_plain_files(self):
+        file = ContentFile(ART, name="art.png")
+        self.assertEqual(get_content_hash(file), ART_HASH)
+        # The file is rewound for the upload that follows
+        self.assertEqual(file.read(), ART)
+
+    def test_blob_name(self):
+        self.assertEqual(
+            get_blob_name(ART_HASH, "Art.PNG"),
+            f"blobs/{ART_HASH[:2]}/{ART_HASH}.png",
+        )
+
+    def test_cleanup_receivers_are_connected(self):
+        self.assertTrue(pre_save.has_listeners(Character))
+        self.assertTrue(pre_delete.has_listeners(CharacterImage))
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class HashedFileTests(TestCase):
+
+    def test_hash_is_recorded_on_upload(self):
+        character = Character.objects.create(
+            name="Hero",
+            type="fire",
+            path="destruction",
+            rarity=5,
+            image=ContentFile(ART, name="art.png"),
+        )
+        self.assertEqual(character.image.name, "characters/destruction/hero/main.png")
+        self.assertEqual(Character.objects.get().image_hash, ART_HASH)
+
+    def test_hash_is_cleared_with_the_file(self):
+        character = Character.objects.create(
+            name="Hero",
+            type="fire",
+            path="destruction",
+            rarity=5,
+            image=ContentFile(ART, name="art.png"),
+        )
+        character.image = None
+        character.save()
+        self.assertIsNone(Character.objects.get().image_hash)
+        sweep_released_files(grace_period=timedelta(0))
+        self.assertFalse(default_storage.exists("characters/destruction/hero/main.png"))
+
+    def test_references_are_counted_across_models(self):
+        first = Character.objects.create(
+            name="Hero",
+            type="fire",
+            path="destruction",
+            rarity=5,
+            image=ContentFile(ART, name="art.png"),
+        )
+        self.assertFalse(is_file_referenced_elsewhere(first, "image"))
+        ability = Ability.objects.create(
+            character=first, name="Strike", type="basic", image=first.image.name
+        )
+        self.assertTrue(is_file_referenced_elsewhere(first, "image"))
+        ability.delete()
+        self.assertFalse(is_file_referenced_elsewhere(first, "image"))
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES, CONTENT_ADDRESSED_MEDIA=True)
+class ContentAddressedMediaTests(TestCase):
+
+    def setUp(self):
+        self.character = Character.objects.create(
+            name="Hero", type="fire", path="destruction", rarity=5
+        )
+        self.blob_name = get_blob_name(ART_HASH, "art.png")
+
+    def create_image(self, image_type="full_cg"):
+        return CharacterImage.objects.create(
+            character=self.character,
+            type=image_type,
+            image=ContentFile(ART, name="art.png"),
+        )
+
+    def test_uploads_are_stored_under_their_digest(self):
+        image = self.create_image()
+        self.assertEqual(image.image.name, self.blob_name)
+        self.assertEqual(image.image_hash, ART_HASH)
+        with default_storage.open(self.blob_name) as blob:
+            self.assertEqual(blob.read(), ART)
+
+    def test_identical_content_is_uploaded_once(self):
+        self.create_image()
+        with self.assertLogs("utils.mixins", "INFO") as logs:
+            second = self.create_image("headshot")
+        self.assertIn("Reusing stored blob", logs.output[0])
+        self.assertEqual(second.image.name, self.blob_name)
+        self.assertEqual(len(default_storage.listdir(f"blobs/{ART_HASH[:2]}")[1]), 1)
+
+    def test_blobs_are_shared_across_models(self):
+        self.create_image()
+        ability = Ability.objects.create(
+            character=self.character,
+            name="Strike",
+            type="basic",
+            image=ContentFile(ART, name="strike.png"),
+        )
+        self.assertEqual(ability.image.name, self.blob_name)
+
+        # The blob stays while any model still refers to it
+        CharacterImage.objects.get().delete()
+        sweep_released_files(grace_period=timedelta(0))
+        self.assertTrue(default_storage.exists(self.blob_name))
+        ability.delete()
+        sweep_released_files(grace_period=timedelta(0))
+        self.assertFalse(default_storage.exists(self.blob_name))
+
+    def test_reupload_of_the_same_content_keeps_the_blob(self):
+        image = self.create_image()
+        image.image = ContentFile(ART, name="renamed.png")
+        image.save()
+        self.assertEqual(image.image.name, self.blob_name)
+        self.assertTrue(default_storage.exists(self.blob_name))
+
+
+def make_png(width=1000, height=500):
+    buffer = BytesIO()
+    Image.new("RGBA", (width, height), (200, 30, 30, 255)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@override_settings(
+    STORAGES=IN_MEMORY_STORAGES,
+    IMAGE_DERIVATIVE_WIDTHS=[64, 256],
+    IMAGE_DERIVATIVE_FORMATS=["webp"],
+    FILE_SWEEP_GRACE_SECONDS=0,
+)
+class ImageDerivativeTests(TestCase):
+
+    def create_character(self, content=None):
+        return Character.objects.create(
+            name="Hero",
+            type="fire",
+            path="destruction",
+            rarity=5,
+            image=ContentFile(content or make_png(), name="art.png"),
+        )
+
+    def test_render_keeps_the_aspect_ratio(self):
+        derivatives = render_derivatives(
+            make_png(), [64, 256, 2000, 4000], ["webp"], {"webp": 80}
+        )
+        # Never upscaled, the first width over the original holds it, larger are skipped
+        self.assertEqual(set(derivatives), {"64w.webp", "256w.webp", "2000w.webp"})
+        with Image.open(BytesIO(derivatives["256w.webp"])) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (256, 128)))
+        with Image.open(BytesIO(derivatives["2000w.webp"])) as image:
+            self.assertEqual(image.size, (1000, 500))
+
+    def test_unsupported_formats_are_skipped(self):
+        with override_settings(IMAGE_DERIVATIVE_FORMATS=["webp", "nonexistent"]):
+            self.assertEqual(get_derivative_formats(), ["webp"])
+
+    def test_new_images_get_derivatives_from_a_job(self):
+        character = self.create_character()
+        name = character.image.name
+        self.assertTrue(StorageJob.objects.filter(kind="image_derivatives").exists())
+
+        run_jobs(kinds=["image_derivatives"])
+        self.assertEqual(get_derivative_name(name, 64, "webp"), f"{name}.64w.webp")
+        for derivative_name in get_derivative_names(name):
+            self.assertTrue(default_storage.exists(derivative_name))
+
+    def test_derivatives_are_deleted_with_the_original(self):
+        character = self.create_character()
+        name = character.image.name
+        generate_derivatives([name], workers=1)
+        character.delete()
+
+        sweep_released_files()
+        self.assertFalse(default_storage.exists(name))
+        for derivative_name in get_derivative_names(name):
+            self.assertFalse(default_storage.exists(derivative_name))
+
+    def test_bulk_render_uses_a_process_pool(self):
+        names = [
+            default_storage.save(f"bulk/{i}.png", ContentFile(make_png(300, 300)))
+            for i in range(3)
+        ]
+        default_storage.save("bulk/broken.png", ContentFile(b"not an image"))
+
+        with self.assertLogs("utils.images", "ERROR"):
+            failed = generate_derivatives(names + ["bulk/broken.png"], workers=2)
+        self.assertEqual(failed, ["bulk/broken.png"])
+        self.assertTrue(default_storage.exists("bulk/2.png.256w.webp"))
+
+        # Existing derivatives aren't rendered again
+        with mock.patch("utils.images._read_file") as read_file:
+            generate_derivatives(names, workers=2)
+        read_file.assert_not_called()
+
+    def test_serializers_expose_a_srcset(self):
+        character = self.create_character()
+        srcset = CharacterSerializer(character).data["image_srcset"]
+        self.assertEqual(list(srcset), ["webp"])
+        self.assertEqual(
+            srcset["webp"],
+            f"/{character.image.name}.64w.webp 64w, /{character.image.name}.256w.webp 256w",
+        )
+
+        character.image = None
+        character.save()
+        self.assertEqual(CharacterSerializer(character).data["image_srcset"], {})
+
+    def test_srcset_lists_the_actual_widths(self):
+        character = self.create_character(make_png(100, 50))
+        self.assertEqual(character.image_width, 100)
+        name = character.image.name
+        self.assertEqual(
+            CharacterSerializer(character).data["image_srcset"]["webp"],
+            f"/{name}.64w.webp 64w, /{name}.256w.webp 100w",
+        )
+
+        generate_derivatives([name], workers=1)
+        with default_storage.open(f"{name}.256w.webp") as file:
+            with Image.open(file) as image:
+                self.assertEqual(image.size, (100, 50))
+
+    def test_image_width_follows_the_exif_orientation(self):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[ExifTags.Base.Orientation] = 6
+        Image.new("RGB", (100, 50)).save(buffer, "JPEG", exif=exif)
+        self.assertEqual(get_image_width(BytesIO(buffer.getvalue())), 50)
+        self.assertIsNone(get_image_width(BytesIO(b"not an image")))
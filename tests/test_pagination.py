@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from teams.models import Team
+
+
+class CursorPaginationTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.team_list_url = reverse("team-list")
+        Team.objects.bulk_create([Team(name=f"Team {i}") for i in range(25)])
+
+    def walk(self, url):
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            names.extend(team["name"] for team in response.data["results"])
+            url = response.data["next"]
+        return names
+
+    def test_pages_cover_every_row_once_in_id_order(self):
+        names = self.walk(f"{self.team_list_url}?page_size=10")
+        self.assertEqual(names, [f"Team {i}" for i in range(25)])
+
+    def test_rows_added_while_paging_do_not_shift_pages(self):
+        response = self.client.get(self.team_list_url, {"page_size": 10})
+        Team.objects.filter(name="Team 0").delete()
+        Team.objects.create(name="Team 25")
+        names = [team["name"] for team in response.data["results"]]
+        names += self.walk(response.data["next"])
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual(names[-1], "Team 25")
+
+    def test_page_size_is_capped(self):
+        Team.objects.bulk_create([Team(name=f"Extra {i}") for i in range(200)])
+        response = self.client.get(self.team_list_url, {"page_size": 1000})
+        self.assertEqual(len(response.data["results"]), 200)
+
+    def test_deep_pages_use_keyset_filter_instead_of_offset(self):
+        response = self.client.get(self.team_list_url, {"page_size": 10})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 10)
+        team_query = queries.captured_queries[0]["sql"]
+        self.assertIn('"teams_team"."id" >', team_query)
+        self.assertNotIn("OFFSET", team_query)
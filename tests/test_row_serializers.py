@@ -0,0 +1,356 @@
+import random
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, SuspiciousOperation
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from abilities.models import Ability
+from abilities.serializers import AbilityDetailSerializer
+from catalog.serializers import ExportCharacterSerializer, ExportLightconeSerializer
+from characters.models import Character
+from characters.serializers import CharacterSerializer
+from lightcones.models import Lightcone
+from lightcones.serializers import LightconeSerializer
+from relics.models import Relic
+from relics.serializers import RelicSerializer
+from utils import serializers as row_serializers
+from utils.serializers import RowSerializer, get_storage_base_url, render_json
+from utils.views import RowListMixin, optimize_queryset_for_serializer
+
+SERIALIZERS = [
+    CharacterSerializer,
+    ExportCharacterSerializer,
+    RelicSerializer,
+    LightconeSerializer,
+    ExportLightconeSerializer,
+    AbilityDetailSerializer,
+]
+
+MEDIA_URLS = [
+    "/media/",
+    "",
+    "media/",
+    "https://cdn.example.com/media/",
+    "//cdn.example.com/media/",
+    "/static/../media/",
+]
+
+# Unsigned S3 URLs: MinIO with path addressing and a location, and a custom domain
+S3_OPTIONS = [
+    {
+        "endpoint_url": "http://localhost:9000",
+        "addressing_style": "path",
+        "location": "media",
+        "custom_domain": None,
+    },
+    {"custom_domain": "silverrail.s3.amazonaws.com"},
+]
+
+# Pieces of text and storage names that JSON escaping, quoting or URL joining treat
+# differently
+TEXT = [
+    "Kafka",
+    "Ünïcödé",
+    "火",
+    "🚂",
+    '"',
+    "\\",
+    "\n",
+    "\x00",
+    "\x1f",
+    " ",
+    " ",
+    " ",
+    "",
+]
+NAME_SEGMENTS = [
+    "characters",
+    "hunt",
+    ".",
+    "..",
+    "",
+    "ü",
+    "a b",
+    "%20",
+    "q?x=1",
+    "h#t",
+    "b\\c",
+    "~!*()'",
+    "main.png",
+]
+
+
+def random_text(rng, length=4):
+    return "".join(rng.choice(TEXT) for _ in range(rng.randint(0, length)))
+
+
+def random_image(rng):
+    if rng.random() < 0.2:
+        return rng.choice([None, ""])
+    segments = [rng.choice(NAME_SEGMENTS) for _ in range(rng.randint(1, 4))]
+    return "/".join(segments) + rng.choice(["", ".png", "/"])
+
+
+def create_catalog(rng, count):
+    characters = Character.objects.bulk_create(
+        Character(
+            name=f"{random_text(rng)} {i}",
+            image=random_image(rng),
+            image_width=rng.choice([None, 1, 64, 100, 256, 5000]),
+            type=rng.choice(["fire", "ice", "quantum"]),
+            path=rng.choice(["hunt", "erudition"]),
+            rarity=rng.choice([4, 5]),
+        )
+        for i in range(count)
+    )
+    Ability.objects.bulk_create(
+        Ability(
+            character=character,
+            name=f"{random_text(rng)} {i}",
+            image=random_image(rng),
+            image_width=rng.choice([None, 64, 300]),
+            type=rng.choice(["basic", "skill", "ultimate"]),
+            energy_cost=rng.choice([None, 0, 120, 2**40]),
+        )
+        for character in characters
+        for i in range(rng.randint(0, 3))
+    )
+    Relic.objects.bulk_create(
+        Relic(
+            name=random_text(rng),
+            image=random_image(rng),
+            image_width=rng.choice([None, 64, 2000]),
+            set_name=f"{random_text(rng)} {i}",
+            slot=rng.choice(["head", "hands"]),
+            effect=random_text(rng, 20),
+        )
+        for i in range(count)
+    )
+    Lightcone.objects.bulk_create(
+        Lightcone(
+            name=f"{random_text(rng)} {i}",
+            image=random_image(rng),
+            path=rng.choice(["hunt", "erudition"]),
+            rarity=rng.choice([3, 4, 5]),
+            ability=random_text(rng, 20),
+        )
+        for i in range(count)
+    )
+
+
+def in_memory_storage(media_url):
+    return override_settings(
+        MEDIA_URL=media_url,
+        STORAGES={
+            "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+            "staticfiles": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+        },
+    )
+
+
+def s3_storage(options):
+    return override_settings(
+        STORAGES={
+            "default": {
+                "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
+                "OPTIONS": {
+                    "bucket_name": "silverrail",
+                    "region_name": "us-east-1",
+                    "access_key": "key",
+                    "secret_key": "secret",
+                    "querystring_auth": False,
+                    **options,
+                },
+            },
+            "staticfiles": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+        },
+    )
+
+
+class RowSerializerTests(TestCase):
+
+    def test_rows_match_the_serializers(self):
+        factory = APIRequestFactory()
+        for seed in range(5):
+            rng = random.Random(seed)
+            Character.objects.all().delete()
+            Relic.objects.all().delete()
+            Lightcone.objects.all().delete()
+            create_catalog(rng, 15)
+            # Relative media URLs are joined to the request's path
+            request = factory.get(
+                rng.choice(["/", "/characters/characters/"]), secure=rng.random() < 0.5
+            )
+
+            # Timestamps are rendered in the current timezone
+            time_zone = ["UTC", "Asia/Tokyo", "America/St_Johns"][seed % 3]
+
+            for media_url in MEDIA_URLS:
+                for serializer_class in SERIALIZERS:
+                    for context in ({}, {"request": request}):
+                        with self.subTest(
+                            seed=seed,
+                            media_url=media_url,
+                            serializer=serializer_class.__name__,
+                            request=bool(context),
+                        ), in_memory_storage(media_url), timezone.override(time_zone):
+                            self.assertSameData(serializer_class, context)
+
+            for options in S3_OPTIONS:
+                # One storage, its client is slow to create
+                with s3_storage(options):
+                    for serializer_class in SERIALIZERS:
+                        for context in ({}, {"request": request}):
+                            with self.subTest(
+                                seed=seed,
+                                s3=options,
+                                serializer=serializer_class.__name__,
+                                request=bool(context),
+                            ):
+                                self.assertSameData(serializer_class, context)
+
+    def assertSameData(self, serializer_class, context):
+        queryset = serializer_class.Meta.model.objects.order_by("pk")
+        row_serializer = RowSerializer(serializer_class, context=context)
+        try:
+            expected = serializer_class(
+                optimize_queryset_for_serializer(queryset, serializer_class),
+                many=True,
+                context=context,
+            ).data
+        except SuspiciousOperation:
+            # S3 storages refuse names leading out of their location
+            with self.assertRaises(SuspiciousOperation):
+                row_serializer.to_representation(
+                    queryset.values(*row_serializer.columns)
+                )
+            return
+
+        data = row_serializer.to_representation(
+            queryset.values(*row_serializer.columns)
+        )
+        self.assertEqual(data, expected)
+        self.assertEqual(
+            render_json(data, exact=row_serializer.exact),
+            JSONRenderer().render(expected),
+        )
+
+    def test_unsigned_s3_urls_are_prefixed(self):
+        for options in S3_OPTIONS:
+            with self.subTest(s3=options), s3_storage(options):
+                self.assertIsNotNone(get_storage_base_url())
+        with s3_storage({"querystring_auth": True, "custom_domain": None}):
+            self.assertIsNone(get_storage_base_url())
+
+    def test_render_json_matches_the_json_renderer(self):
+        values = [
+            {"name": "  \x00🚂", "list": [True, False, None, -1]},
+            [2**63, 2**64 - 1],
+            [2**70],
+            {},
+        ]
+        for value in values:
+            with self.subTest(value=value):
+                expected = JSONRenderer().render(value)
+                self.assertEqual(render_json(value, exact=True), expected)
+                with mock.patch.object(row_serializers, "orjson", None):
+                    self.assertEqual(render_json(value, exact=True), expected)
+
+        # Floats are left to the json module
+        floats = [1e16, 0.1, 1.0, 5e-324]
+        self.assertEqual(render_json(floats), JSONRenderer().render(floats))
+
+    def test_exact_only_without_floats_and_unknown_types(self):
+        self.assertTrue(RowSerializer(CharacterSerializer).exact)
+        self.assertTrue(RowSerializer(RelicSerializer).exact)
+
+        class FloatSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Character
+                fields = ["name", "rarity"]
+
+            rarity = serializers.FloatField()
+
+        self.assertFalse(RowSerializer(FloatSerializer).exact)
+
+    def test_unsupported_fields(self):
+        class MethodSerializer(serializers.ModelSerializer):
+            label = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Character
+                fields = ["name", "label"]
+
+            def get_label(self, obj):
+                return obj.name
+
+        class NestedSerializer(serializers.ModelSerializer):
+            character = CharacterSerializer()
+
+            class Meta:
+                model = Ability
+                fields = ["name", "character"]
+
+        class SlugSerializer(serializers.ModelSerializer):
+            character = serializers.SlugRelatedField(slug_field="name", read_only=True)
+
+            class Meta:
+                model = Ability
+                fields = ["name", "character"]
+
+        for serializer_class in (MethodSerializer, NestedSerializer, SlugSerializer):
+            with self.subTest(serializer_class.__name__):
+                with self.assertRaises(ImproperlyConfigured):
+                    RowSerializer(serializer_class)
+
+
+@override_settings(MEDIA_URL="/media/")
+class RowListTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        create_catalog(random.Random(0), 12)
+
+    def get_pages(self, url):
+        """Follow the next links from a list URL and return every page's content."""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.content)
+            url = response.json()["next"]
+        return pages
+
+    def test_list_responses_match_the_serializers(self):
+        for url_name, query in (
+            ("character-list", "?page_size=5"),
+            ("character-list", "?type=fire,ice&rarity=5"),
+            ("relic-list", "?page_size=7"),
+            ("relic-list", "?slot=head"),
+            ("lightcone-list", "?page_size=200"),
+            ("lightcone-list", "?rarity=3"),
+        ):
+            with self.subTest(url_name=url_name, query=query):
+                url = reverse(url_name) + query
+                pages = self.get_pages(url)
+                cache.clear()
+                with mock.patch.object(RowListMixin, "row_actions", ()):
+                    self.assertEqual(self.get_pages(url), pages)
+                cache.clear()
+
+    def test_list_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("character-list"))
+        self.assertEqual(len(response.data["results"]), 12)
+
+    def test_indented_json_uses_the_serializer(self):
+        url = reverse("character-list")
+        response = self.client.get(url, HTTP_ACCEPT="application/json; indent=2")
+        self.assertIn(b'\n  "next"', response.content)
+        self.assertEqual(len(response.json()["results"]), 12)
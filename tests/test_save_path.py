@@ -0,0 +1,88 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+
+from characters.models import Character, CharacterImage
+from filestore.references import get_file_refcount
+from utils.mixins import prevalidated
+
+IN_MEMORY_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "staticfiles": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+}
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class SavePathTests(TestCase):
+
+    def setUp(self):
+        Character.objects.create(
+            name="Hero",
+            type="fire",
+            path="destruction",
+            rarity=5,
+            image=ContentFile(b"main", name="main.png"),
+        )
+        self.character = Character.objects.get()
+
+    def test_prevalidated_edit_is_a_single_update(self):
+        self.character.rarity = 4
+        with CaptureQueriesContext(connection) as queries, prevalidated():
+            self.character.save()
+        self.assertEqual(len(queries), 1, [q["sql"] for q in queries])
+        self.assertTrue(queries[0]["sql"].startswith("UPDATE"))
+
+    def test_related_rows_are_not_checked_when_prevalidated(self):
+        image = CharacterImage.objects.create(
+            character=self.character,
+            type="icon",
+            image=ContentFile(b"icon", name="icon.png"),
+        )
+        image = CharacterImage.objects.get(pk=image.pk)
+        image.type = "chibi"
+        with self.assertNumQueries(1), prevalidated():
+            image.save()
+
+    def test_full_validation_outside_prevalidated(self):
+        duplicate = Character(name="Hero", type="ice", path="destruction", rarity=5)
+        with self.assertRaises(DjangoValidationError):
+            duplicate.save()
+
+    def test_field_checks_still_run_when_prevalidated(self):
+        self.character.type = "water"
+        with self.assertRaises(ValidationError), prevalidated():
+            self.character.save()
+        self.character.type = "fire"
+        self.character.rarity = 3
+        with self.assertRaises(ValidationError), prevalidated():
+            self.character.save()
+
+    def test_file_changes_are_detected_without_fetching_the_row(self):
+        old_name = self.character.image.name
+        self.character.image = ContentFile(b"new", name="new.png")
+        with CaptureQueriesContext(connection) as queries, prevalidated():
+            self.character.save()
+        self.assertFalse(
+            any(
+                q["sql"].startswith("SELECT") and "characters_character" in q["sql"]
+                for q in queries
+            )
+        )
+        self.assertEqual(get_file_refcount(old_name), 0)
+        self.assertEqual(get_file_refcount(self.character.image.name), 1)
+
+        # The snapshot follows the save, the next change releases the new file
+        new_name = self.character.image.name
+        self.character.image = None
+        self.character.save()
+        self.assertEqual(get_file_refcount(new_name), 0)
+
+    def test_deferred_file_fields_are_fetched(self):
+        old_name = self.character.image.name
+        character = Character.objects.defer("image").get()
+        character.image = ContentFile(b"new", name="new.png")
+        character.save()
+        self.assertEqual(get_file_refcount(old_name), 0)
@@ -0,0 +1,100 @@
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase
+
+from characters.models import Character
+from utils.routers import ReadReplicaMiddleware, ReadReplicaRouter, read_only
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+        self.router.replica_alias = "replica"
+
+    def test_reads_go_to_the_replica_only_when_read_only(self):
+        self.assertEqual(self.router.db_for_read(Character), "default")
+        with read_only():
+            self.assertEqual(self.router.db_for_read(Character), "replica")
+            self.assertEqual(self.router.db_for_write(Character), "default")
+        self.assertEqual(self.router.db_for_read(Character), "default")
+
+    def test_reads_stay_on_default_without_a_replica(self):
+        self.router.replica_alias = None
+        with read_only():
+            self.assertEqual(self.router.db_for_read(Character), "default")
+
+    def test_replica_is_not_migrated(self):
+        self.assertTrue(self.router.allow_migrate("default", "characters"))
+        self.assertFalse(self.router.allow_migrate("replica", "characters"))
+
+    def test_safe_methods_are_read_only(self):
+        def get_response(request):
+            return self.router.db_for_read(Character)
+
+        middleware = ReadReplicaMiddleware(get_response)
+        factory = RequestFactory()
+        self.assertEqual(middleware(factory.get("/characters/")), "replica")
+        self.assertEqual(middleware(factory.head("/characters/")), "replica")
+        self.assertEqual(middleware(factory.post("/characters/")), "default")
+        self.assertEqual(middleware(factory.delete("/characters/1/")), "default")
+
+
+class SQLiteConcurrencyTests(SimpleTestCase):
+    """
+    The configured pragmas against a database file, the test database lives in memory.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "db.sqlite3"
+
+    def connect(self, pragmas, uri=None, timeout=0):
+        connection = sqlite3.connect(
+            uri or self.path, timeout=timeout, uri=bool(uri), isolation_level=None
+        )
+        self.addCleanup(connection.close)
+        for name, value in pragmas.items():
+            connection.execute(f"PRAGMA {name}={value}")
+        return connection
+
+    def start_write(self, pragmas):
+        writer = self.connect(pragmas)
+        writer.execute("CREATE TABLE IF NOT EXISTS item (id INTEGER PRIMARY KEY)")
+        writer.execute("INSERT INTO item DEFAULT VALUES")
+        # Hold the lock a commit takes, for as long as the test needs
+        writer.execute("BEGIN EXCLUSIVE")
+        writer.execute("INSERT INTO item DEFAULT VALUES")
+        return writer
+
+    def test_readers_wait_for_writers_with_the_default_journal(self):
+        self.start_write({})
+        reader = self.connect({})
+        with self.assertRaisesMessage(sqlite3.OperationalError, "locked"):
+            reader.execute("SELECT count(*) FROM item").fetchone()
+
+    def test_readers_dont_wait_for_writers_in_wal_mode(self):
+        writer = self.start_write(settings.SQLITE_PRAGMAS)
+        self.assertEqual(
+            writer.execute("PRAGMA journal_mode").fetchone(),
+            ("wal",),
+        )
+        reader = self.connect(settings.SQLITE_PRAGMAS)
+        # The last committed snapshot, without waiting
+        self.assertEqual(reader.execute("SELECT count(*) FROM item").fetchone(), (1,))
+        writer.execute("COMMIT")
+        self.assertEqual(reader.execute("SELECT count(*) FROM item").fetchone(), (2,))
+
+    def test_replica_connection_is_read_only(self):
+        writer = self.start_write(settings.SQLITE_PRAGMAS)
+        writer.execute("COMMIT")
+        replica = self.connect(
+            {"query_only": 1}, uri=f"file:{self.path}?mode=ro", timeout=0
+        )
+        self.assertEqual(replica.execute("SELECT count(*) FROM item").fetchone(), (2,))
+        with self.assertRaises(sqlite3.OperationalError):
+            replica.execute("INSERT INTO item DEFAULT VALUES")
@@ -0,0 +1,115 @@
+from django.test import TestCase
+
+from abilities.models import Ability, AbilityImage
+from characters.models import Character, CharacterImage
+from lightcones.models import Lightcone, LightconeImage
+from relics.models import Relic
+from utils.upload_paths import UploadPath, prime_upload_paths
+
+
+class UploadPathTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.character = Character.objects.create(
+            name="Dan Heng • Imbibitor Lunae",
+            type="imaginary",
+            path="destruction",
+            rarity=5,
+        )
+        cls.ability = Ability.objects.create(
+            character=cls.character, name="Azure's Aqua Ablutes All", type="ultimate"
+        )
+        cls.lightcone = Lightcone.objects.create(
+            name="Brighter Than the Sun", rarity=5, ability="...", path="destruction"
+        )
+
+    def get_upload_path(self, instance, filename="art.png"):
+        return instance._meta.get_field("image").generate_filename(instance, filename)
+
+    def test_character(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.get_upload_path(self.character),
+                "characters/destruction/dan-heng-imbibitor-lunae/main.png",
+            )
+
+    def test_character_image(self):
+        image = CharacterImage(character=self.character, type="full_cg")
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.get_upload_path(image, "cg.webp"),
+                "characters/destruction/dan-heng-imbibitor-lunae/full_cg.webp",
+            )
+
+    def test_ability(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.get_upload_path(self.ability),
+                "characters/destruction/dan-heng-imbibitor-lunae/abilities/ultimate.png",
+            )
+
+    def test_ability_image(self):
+        image = AbilityImage(ability=self.ability, type="skill")
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.get_upload_path(image),
+                "characters/dan-heng-imbibitor-lunae/abilities/"
+                "ultimate-azures-aqua-ablutes-all-skill.png",
+            )
+
+    def test_relic(self):
+        relic = Relic(name="Hat", set_name="Genius of Brilliant Stars", slot="head")
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.get_upload_path(relic),
+                "relics/genius-of-brilliant-stars/head.png",
+            )
+
+    def test_lightcone(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.get_upload_path(self.lightcone),
+                "lightcones/destruction/brighter-than-the-sun/main.png",
+            )
+
+    def test_lightcone_image(self):
+        image = LightconeImage(lightcone=self.lightcone, type="full")
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.get_upload_path(image),
+                "lightcones/destruction/brighter-than-the-sun/full/full.png",
+            )
+
+    def test_unloaded_relations_are_fetched_with_one_query(self):
+        image = AbilityImage(ability_id=self.ability.pk, type="skill")
+        with self.assertNumQueries(1):
+            path = self.get_upload_path(image)
+            self.get_upload_path(image)
+        self.assertTrue(path.endswith("ultimate-azures-aqua-ablutes-all-skill.png"))
+        # Only the values are kept, the relation is read in full when it's used
+        self.assertFalse(AbilityImage.ability.is_cached(image))
+        with self.assertNumQueries(1):
+            self.assertEqual(image.ability.energy_cost, self.ability.energy_cost)
+            self.assertEqual(image.ability.character_id, self.character.pk)
+
+    def test_bulk_uploads_fetch_relations_once(self):
+        images = [
+            AbilityImage(ability_id=ability.pk, type="skill")
+            for ability in Ability.objects.bulk_create(
+                Ability(character=self.character, name=f"Ability {i}", type="skill")
+                for i in range(10)
+            )
+        ]
+        with self.assertNumQueries(1):
+            prime_upload_paths(images)
+            paths = [self.get_upload_path(image) for image in images]
+        self.assertFalse(any(AbilityImage.ability.is_cached(image) for image in images))
+        self.assertEqual(
+            paths[3],
+            "characters/dan-heng-imbibitor-lunae/abilities/skill-ability-3-skill.png",
+        )
+
+    def test_upload_paths_compare_by_template(self):
+        self.assertEqual(UploadPath("a/{name}.{ext}"), UploadPath("a/{name}.{ext}"))
+        self.assertNotEqual(UploadPath("a/{name}.{ext}"), UploadPath("b/{name}.{ext}"))
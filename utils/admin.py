@@ -0,0 +1,16 @@
+from utils.mixins import prevalidated
+
+
+class PrevalidatedSaveAdminMixin:
+    """
+    Mixin for model admins that saves without repeating the database checks the
+    admin forms already ran, see ``utils.mixins.prevalidated``.
+    """
+
+    def save_model(self, request, obj, form, change):
+        with prevalidated():
+            super().save_model(request, obj, form, change)
+
+    def save_formset(self, request, form, formset, change):
+        with prevalidated():
+            super().save_formset(request, form, formset, change)
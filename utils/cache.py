@@ -0,0 +1,93 @@
+import hashlib
+import time
+from django.core.cache import cache
+from django.db.models import Model
+from typing import Dict, Type
+
+CATALOG_VERSION_KEY = "catalog:version:{label}"
+CATALOG_RESPONSE_KEY = "catalog:response:{label}:{version}:{digest}"
+CATALOG_COUNTER_KEY = "catalog:counter:{name}"
+CATALOG_COUNTERS = ("hits", "misses")
+
+
+def get_catalog_version(model_class: Type[Model]) -> int:
+    """
+    Get the current catalog version of a model.
+
+    A missing version (first use or cache eviction) is initialized from the clock
+    so that it can never collide with a version that was handed out before.
+
+    Args:
+        model_class (Type[Model]): The model whose catalog version to get.
+
+    Returns:
+        int: The current catalog version.
+    """
+    key = CATALOG_VERSION_KEY.format(label=model_class._meta.label_lower)
+    return cache.get_or_set(key, lambda: time.time_ns() // 1000, timeout=None)
+
+
+def bump_catalog_version(model_class: Type[Model]) -> int:
+    """
+    Invalidate every cached response of a model by moving to a new catalog version.
+
+    Args:
+        model_class (Type[Model]): The model whose catalog changed.
+
+    Returns:
+        int: The new catalog version.
+    """
+    key = CATALOG_VERSION_KEY.format(label=model_class._meta.label_lower)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The version was evicted, start again from a fresh clock-based value
+        return get_catalog_version(model_class)
+
+
+def get_catalog_cache_key(model_class: Type[Model], request) -> str:
+    """
+    Build the response cache key for a request against a model's catalog.
+
+    Args:
+        model_class (Type[Model]): The model the endpoint serves.
+        request (Request): The incoming request.
+
+    Returns:
+        str: A key made of the model, its catalog version and the normalized request URL.
+    """
+    query = sorted(request.query_params.lists())
+    raw_key = f"{request.get_host()}|{request.path}|{query}"
+    return CATALOG_RESPONSE_KEY.format(
+        label=model_class._meta.label_lower,
+        version=get_catalog_version(model_class),
+        digest=hashlib.md5(raw_key.encode()).hexdigest(),
+    )
+
+
+def record_catalog_cache_event(name: str):
+    """Increment one of the catalog cache counters (hits or misses)."""
+    key = CATALOG_COUNTER_KEY.format(name=name)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def get_catalog_cache_stats() -> Dict[str, int]:
+    """Get the catalog cache hit and miss counters."""
+    values = cache.get_many(
+        [CATALOG_COUNTER_KEY.format(name=name) for name in CATALOG_COUNTERS]
+    )
+    return {
+        name: values.get(CATALOG_COUNTER_KEY.format(name=name), 0)
+        for name in CATALOG_COUNTERS
+    }
+
+
+def reset_catalog_cache_stats():
+    """Reset the catalog cache hit and miss counters to zero."""
+    cache.delete_many(
+        [CATALOG_COUNTER_KEY.format(name=name) for name in CATALOG_COUNTERS]
+    )
@@ -0,0 +1,94 @@
+import hashlib
+import os
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+
+# Read files in 1 MiB chunks when hashing them, uploads are received in chunks of the same size
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def get_content_hash(file, remember=True) -> str:
+    """
+    Get the SHA-256 digest of a file's content.
+
+    Uploads received through the hashing upload handlers already carry their digest,
+    anything else is read once in ``HASH_CHUNK_SIZE`` chunks and the digest is kept on
+    the file for later calls.
+
+    Args:
+        file (File): The file to hash.
+        remember (bool): Keep the digest on the file, only for files that won't change.
+
+    Returns:
+        str: The hex digest.
+    """
+    content_hash = getattr(file, "content_hash", None)
+    if content_hash:
+        return content_hash
+
+    file_hash = hashlib.sha256()
+    for chunk in file.chunks(chunk_size=HASH_CHUNK_SIZE):
+        file_hash.update(chunk)
+    if file.seekable():
+        file.seek(0)
+    digest = file_hash.hexdigest()
+    if remember:
+        file.content_hash = digest
+    return digest
+
+
+def get_blob_name(digest: str, filename: str) -> str:
+    """
+    Get the storage name of a content-addressed blob.
+
+    Args:
+        digest (str): The SHA-256 hex digest of the content.
+        filename (str): The original file name, only its extension is kept.
+
+    Returns:
+        str: A name like ``blobs/ab/abcdef....png``.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return os.path.join(
+        settings.CONTENT_ADDRESSED_MEDIA_PREFIX, digest[:2], f"{digest}{extension}"
+    )
+
+
+class HashingUploadHandlerMixin:
+    """
+    Mixin for upload handlers that hashes files while they are received, so the
+    digest is known without reading the file a second time.
+    """
+
+    chunk_size = HASH_CHUNK_SIZE
+
+    def new_file(self, *args, **kwargs):
+        self.content_hash = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # The memory handler passes files it doesn't keep on to the next handler
+        if getattr(self, "activated", True):
+            self.content_hash.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.content_hash = self.content_hash.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(
+    HashingUploadHandlerMixin, MemoryFileUploadHandler
+):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(
+    HashingUploadHandlerMixin, TemporaryFileUploadHandler
+):
+    pass
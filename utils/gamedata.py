@@ -0,0 +1,367 @@
+"""
+Bulk import of game data dumps.
+
+Records are streamed from a JSON Lines file or a JSON array, validated in memory and
+upserted in batches with ``bulk_create(update_conflicts=True)`` on each model's natural
+key. Every record carries a ``model`` key, abilities refer to their character by its
+natural key::
+
+    {"model": "character", "name": "Kafka", "path": "nihility", "type": "lightning", "rarity": 5}
+    {"model": "ability", "character": {"name": "Kafka", "path": "nihility"}, "name": "Midnight Tumult", "type": "basic"}
+    {"model": "relic", "name": "Band's Polarized Sunglasses", "set_name": "Band of Sizzling Thunder", "slot": "head"}
+    {"model": "lightcone", "name": "Patience Is All You Need", "path": "nihility", "rarity": 5, "ability": "..."}
+"""
+
+import json
+import time
+from collections import Counter
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from abilities.models import Ability
+from catalog.search import index_objects, rebuild_search_index
+from catalog.signals import mark_autocomplete_stale
+from characters.default_stats import DEFAULT_STATS
+from characters.models import Character
+from lightcones.models import Lightcone
+from relics.models import Relic
+from stats.provisioning import provision_default_stats
+from teams.summaries import schedule_summary_refresh
+from utils.cache import bump_catalog_version
+
+
+class GameDataError(Exception):
+    """Raised for records that can't be imported."""
+
+
+def iter_records(stream, chunk_size=1 << 16):
+    """
+    Stream records from a JSON Lines file or a file holding one JSON array.
+
+    Args:
+        stream (TextIO): The file to read.
+        chunk_size (int): How many characters to read at a time for JSON arrays.
+
+    Yields:
+        dict: One record at a time, the whole file is never held in memory.
+    """
+    first = stream.read(1)
+    while first and first.isspace():
+        first = stream.read(1)
+    if not first:
+        return
+
+    if first != "[":
+        # JSON Lines, one record per line
+        for number, line in enumerate(stream_lines(first, stream), start=1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise GameDataError(f"Line {number}: {e}")
+        return
+
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            record, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise GameDataError(f"Invalid JSON array: {e}")
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield record
+        buffer = buffer[end:]
+
+
+def stream_lines(first, stream):
+    yield first + stream.readline()
+    yield from stream
+
+
+class ModelImporter:
+    """
+    Batches, validates and upserts the records of one model.
+
+    Args:
+        model (Type[Model]): The model to import into.
+        unique_fields (List[str]): The natural key, must be covered by ``unique_together``.
+        fields (List[str]): The fields read from each record.
+    """
+
+    def __init__(self, model, unique_fields, fields):
+        self.model = model
+        self.unique_fields = unique_fields
+        self.fields = fields
+        self.update_fields = [f for f in fields if f not in unique_fields]
+        self.update_fields.append("modified")
+        self.pending = {}
+
+    def add(self, key, record, **extra):
+        """
+        Buffer a record, a later record with the same natural key replaces it.
+
+        Args:
+            key (tuple): The record's natural key.
+            record (dict): The raw record.
+            **extra: Attributes to set on the instance besides the record's fields.
+        """
+        values = {field: record[field] for field in self.fields if field in record}
+        instance = self.model(**values)
+        for name, value in extra.items():
+            setattr(instance, name, value)
+        self.pending[key] = instance
+
+    def validate(self, instance):
+        """Run the field and model checks that don't need the database."""
+        exclude = [
+            field.name
+            for field in self.model._meta.concrete_fields
+            if field.is_relation or field.name not in self.fields
+        ]
+        instance.clean_fields(exclude=exclude)
+        instance.clean()
+
+    def flush(self, errors):
+        """
+        Validate and upsert the pending batch.
+
+        Args:
+            errors (list): Validation errors are appended here as ``(model, key, message)``.
+
+        Returns:
+            List[Model]: The instances that were written.
+        """
+        valid = []
+        for key, instance in self.pending.items():
+            try:
+                self.validate(instance)
+            except (ValidationError, DjangoValidationError) as e:
+                errors.append((self.model.__name__, key, str(e)))
+                continue
+            valid.append(instance)
+        self.pending = {}
+
+        if valid:
+            self.model.objects.bulk_create(
+                valid,
+                update_conflicts=True,
+                unique_fields=self.unique_fields,
+                update_fields=self.update_fields,
+            )
+        return valid
+
+
+class GameDataImporter:
+    """
+    Import a stream of game data records.
+
+    Args:
+        batch_size (int): How many records of a model to buffer before upserting them.
+        progress (Callable, optional): Called with the importer after every flush.
+    """
+
+    def __init__(self, batch_size=1000, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.importers = {
+            "character": ModelImporter(
+                Character, ["name", "path"], ["name", "path", "type", "rarity"]
+            ),
+            "ability": ModelImporter(
+                Ability,
+                ["character", "name"],
+                [
+                    "name",
+                    "type",
+                    "energy_cost",
+                    "skill_point_cost",
+                    "energy_regeneration",
+                    "break_effect",
+                    "targeting",
+                ],
+            ),
+            "relic": ModelImporter(
+                Relic, ["set_name", "slot"], ["name", "set_name", "slot", "effect"]
+            ),
+            "lightcone": ModelImporter(
+                Lightcone, ["name", "path"], ["name", "path", "rarity", "ability"]
+            ),
+        }
+        # Natural key -> id of every character seen so far, abilities resolve through it
+        self.character_ids = {}
+        self.new_character_ids = []
+        self.updated_character_ids = []
+        self.unindexed_models = set()
+        self.imported = Counter()
+        self.errors = []
+        self.records = 0
+        self.started = None
+
+    def run(self, records, strict=False):
+        """
+        Import every record in one transaction.
+
+        Args:
+            records (Iterable[dict]): The records, for example from ``iter_records``.
+            strict (bool): Roll everything back if any record is invalid.
+
+        Returns:
+            GameDataImporter: The importer, with ``imported``, ``errors`` and ``records`` filled in.
+        """
+        self.started = time.perf_counter()
+        with transaction.atomic():
+            for record in records:
+                self.records += 1
+                self.add(record)
+            for name in self.importers:
+                self.flush(name)
+
+            # Like the post_save signal, only characters created by this import get defaults
+            provision_default_stats(
+                [Character(pk=pk) for pk in self.new_character_ids], DEFAULT_STATS
+            )
+            # Imports send no signals, refresh the summaries of the updated characters
+            if self.updated_character_ids:
+                schedule_summary_refresh(character_ids=self.updated_character_ids)
+            if self.unindexed_models:
+                rebuild_search_index(self.unindexed_models)
+            if strict and self.errors:
+                raise GameDataError(
+                    f"{len(self.errors)} invalid records, nothing was imported"
+                )
+
+        # bulk_create sends no signals, invalidate the catalog caches here
+        for name in ("character", "ability", "relic", "lightcone"):
+            if self.imported[name] or (
+                name == "character" and self.imported["ability"]
+            ):
+                model = self.importers[name].model
+                transaction.on_commit(lambda model=model: bump_catalog_version(model))
+                mark_autocomplete_stale(model)
+        return self
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def add(self, record):
+        name = record.get("model") if isinstance(record, dict) else None
+        if name not in self.importers:
+            self.errors.append((name, None, f"Unknown model: {name!r}"))
+            return
+
+        importer = self.importers[name]
+        if name == "ability":
+            character = record.get("character")
+            if isinstance(character, dict):
+                character = (character.get("name"), character.get("path"))
+            if not isinstance(character, (list, tuple)) or len(character) != 2:
+                self.errors.append(
+                    ("Ability", record.get("name"), "Missing character natural key")
+                )
+                return
+            character = tuple(character)
+            importer.add(
+                (character, record.get("name")), record, character_key=character
+            )
+        else:
+            key = tuple(record.get(field) for field in importer.unique_fields)
+            importer.add(key, record)
+
+        if len(importer.pending) >= self.batch_size:
+            self.flush(name)
+
+    def flush(self, name):
+        if name == "ability":
+            # Abilities need the ids of the characters they belong to
+            self.flush("character")
+            self.resolve_characters()
+
+        if name == "character":
+            existing = self.lookup_characters(self.importers[name].pending)
+        written = self.importers[name].flush(self.errors)
+        self.imported[name] += len(written)
+        if name == "character" and written:
+            self.index_characters(written, existing)
+        if written:
+            self.index_search(name, written)
+        if self.progress and written:
+            self.progress(self)
+
+    def index_search(self, name, written):
+        """
+        Write the search entries of a written batch, bulk_create sends no signals.
+
+        Backends that don't return ids from upserts have the model reindexed at the end.
+        """
+        model = self.importers[name].model
+        if name == "character":
+            for character in written:
+                character.pk = self.character_ids[(character.name, character.path)]
+        elif any(instance.pk is None for instance in written):
+            self.unindexed_models.add(model)
+            return
+        index_objects(model, written)
+
+    def lookup_characters(self, keys):
+        """Get the ids of existing characters by natural key with one query."""
+        keys = set(keys)
+        if not keys:
+            return {}
+        characters = Character.objects.filter(
+            name__in={name for name, _ in keys}
+        ).values_list("name", "path", "pk")
+        return {
+            (name, path): pk for name, path, pk in characters if (name, path) in keys
+        }
+
+    def index_characters(self, characters, existing):
+        """
+        Add the ids of a written character batch to the index.
+
+        Backends that return ids from upserts need no query, others are looked up in one.
+        """
+        if any(character.pk is None for character in characters):
+            ids = self.lookup_characters(
+                (character.name, character.path) for character in characters
+            )
+        else:
+            ids = {(c.name, c.path): c.pk for c in characters}
+        self.character_ids.update(ids)
+        self.new_character_ids.extend(
+            pk for key, pk in ids.items() if key not in existing
+        )
+        self.updated_character_ids.extend(
+            pk for key, pk in ids.items() if key in existing
+        )
+
+    def resolve_characters(self):
+        """Point pending abilities at their characters' ids, looking up unseen ones in one query."""
+        importer = self.importers["ability"]
+        self.character_ids.update(
+            self.lookup_characters(
+                ability.character_key
+                for ability in importer.pending.values()
+                if ability.character_key not in self.character_ids
+            )
+        )
+
+        for key, ability in list(importer.pending.items()):
+            character_id = self.character_ids.get(ability.character_key)
+            if character_id is None:
+                del importer.pending[key]
+                self.errors.append(
+                    ("Ability", key, f"Unknown character {ability.character_key}")
+                )
+                continue
+            ability.character_id = character_id
@@ -0,0 +1,248 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import ExifTags, Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+def get_derivative_formats() -> List[str]:
+    """Get the configured derivative formats this Pillow build can encode."""
+    Image.init()
+    return [
+        fmt for fmt in settings.IMAGE_DERIVATIVE_FORMATS if fmt.upper() in Image.SAVE
+    ]
+
+
+def get_derivative_name(name: str, width: int, fmt: str) -> str:
+    """
+    Get the storage name of a derivative, stored next to its original.
+
+    Args:
+        name (str): The storage name of the original, like ``characters/hunt/seele/main.png``.
+        width (int): The derivative width in pixels.
+        fmt (str): The derivative format, like ``webp``.
+
+    Returns:
+        str: A name like ``characters/hunt/seele/main.png.256w.webp``.
+    """
+    return f"{name}.{width}w.{fmt}"
+
+
+def get_derivative_widths(
+    widths: Iterable[int], original_width: Optional[int] = None
+) -> List[Tuple[int, int]]:
+    """
+    Get the derivatives of an image, as the width in their name and their actual width.
+
+    Images are never upscaled: the smallest width at least as wide as the original
+    holds the original size and larger widths are skipped.
+
+    Args:
+        widths (Iterable[int]): The configured derivative widths.
+        original_width (int, optional): The width of the original, after EXIF
+            rotation. All widths are listed when it isn't known.
+
+    Returns:
+        list: ``(name width, actual width)`` pairs, from the narrowest.
+    """
+    derivatives = []
+    for width in sorted(widths):
+        if original_width is not None and width >= original_width:
+            derivatives.append((width, original_width))
+            break
+        derivatives.append((width, width))
+    return derivatives
+
+
+def get_image_width(file) -> Optional[int]:
+    """
+    Read the width of an image as it is displayed, after EXIF rotation, from its
+    header.
+
+    Returns:
+        int: The width, or None for files Pillow can't read.
+    """
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            width, height = image.size
+            # Orientations that rotate the image by 90 degrees
+            if image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+                width = height
+        return width
+    except Exception:
+        return None
+    finally:
+        file.seek(0)
+
+
+def get_derivative_names(name: str) -> List[str]:
+    """Get the storage names of every configured derivative of a file."""
+    return [
+        get_derivative_name(name, width, fmt)
+        for width in settings.IMAGE_DERIVATIVE_WIDTHS
+        for fmt in get_derivative_formats()
+    ]
+
+
+def render_derivatives(content: bytes, widths, formats, quality) -> Dict[str, bytes]:
+    """
+    Resize and re-encode an image to every width and format.
+
+    Runs in worker processes, so it only takes and returns plain data. Widths are
+    rendered from the largest down, each one resized from the previous one. Widths
+    larger than the original are skipped, see ``get_derivative_widths()``.
+
+    Args:
+        content (bytes): The original image.
+        widths (Iterable[int]): The derivative widths, images are never upscaled.
+        formats (Iterable[str]): The derivative formats.
+        quality (dict): The encoder quality per format.
+
+    Returns:
+        dict: The encoded derivatives, keyed by ``"<width>w.<format>"``.
+    """
+    largest = max(widths)
+    derivatives = {}
+    with Image.open(BytesIO(content)) as original:
+        # Let JPEG decode at a reduced scale when the largest derivative allows it,
+        # square so both sides stay large enough whatever the EXIF orientation.
+        # Reduced images stay wider than every derivative, like their original.
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        for width, actual_width in reversed(get_derivative_widths(widths, image.width)):
+            if image.width > actual_width:
+                height = max(1, round(image.height * actual_width / image.width))
+                image = image.resize((actual_width, height), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                buffer = BytesIO()
+                image.save(buffer, fmt.upper(), quality=quality[fmt])
+                derivatives[f"{width}w.{fmt}"] = buffer.getvalue()
+    return derivatives
+
+
+def _read_file(storage, name: str) -> bytes:
+    with storage.open(name, "rb") as file:
+        return file.read()
+
+
+def _save_derivatives(storage, name: str, derivatives: Dict[str, bytes]):
+    for suffix, data in derivatives.items():
+        derivative_name = f"{name}.{suffix}"
+        # Storages that don't overwrite would save a renamed copy instead
+        storage.delete(derivative_name)
+        storage.save(derivative_name, ContentFile(data))
+
+
+def generate_derivatives(
+    names: Iterable[str], storage=None, workers=None, force=False
+) -> List[str]:
+    """
+    Render and store the derivatives of images.
+
+    Images are resized in a process pool when there is more than one, so a bulk
+    render uses every core. Originals are read and derivatives written in this
+    process, at most ``workers * 2`` images are held in memory at once.
+
+    Args:
+        names (Iterable[str]): The storage names of the originals.
+        storage (Storage, optional): Defaults to the default storage.
+        workers (int, optional): Worker processes, defaults to ``IMAGE_DERIVATIVE_WORKERS``.
+        force (bool): Render images whose derivatives already exist.
+
+    Returns:
+        List[str]: The names that couldn't be rendered.
+    """
+    storage = storage or default_storage
+    widths = settings.IMAGE_DERIVATIVE_WIDTHS
+    formats = get_derivative_formats()
+    if not widths or not formats:
+        return []
+    quality = settings.IMAGE_DERIVATIVE_QUALITY
+    workers = workers or settings.IMAGE_DERIVATIVE_WORKERS
+
+    names = list(dict.fromkeys(names))
+    if not force:
+        # Derivatives are written together, checking the narrowest, which every
+        # image has, is enough
+        names = [
+            name
+            for name in names
+            if not storage.exists(get_derivative_name(name, min(widths), formats[0]))
+        ]
+
+    failed = []
+
+    def read(name):
+        try:
+            return _read_file(storage, name)
+        except Exception as e:
+            logger.error(f"Error reading {name}: {e}")
+            failed.append(name)
+
+    def save(name, result):
+        try:
+            _save_derivatives(storage, name, result())
+        except Exception as e:
+            logger.error(f"Error rendering derivatives of {name}: {e}")
+            failed.append(name)
+
+    if workers <= 1 or len(names) <= 1:
+        for name in names:
+            content = read(name)
+            if content is not None:
+                save(
+                    name, lambda: render_derivatives(content, widths, formats, quality)
+                )
+        return failed
+
+    batch_size = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(names), batch_size):
+            futures = {}
+            for name in names[start : start + batch_size]:
+                content = read(name)
+                if content is not None:
+                    futures[name] = executor.submit(
+                        render_derivatives, content, widths, formats, quality
+                    )
+            for name, future in futures.items():
+                save(name, future.result)
+    return failed
+
+
+def get_srcset(name: str, width: Optional[int] = None, storage=None) -> Dict[str, str]:
+    """
+    Get ``srcset`` attributes for the derivatives of an image, one per format.
+
+    Only builds URLs, storage isn't queried.
+
+    Args:
+        name (str): The storage name of the original.
+        width (int, optional): The width of the original, so derivatives are listed
+            with their actual width. Without it every configured width is listed.
+        storage (Storage, optional): Defaults to the default storage.
+
+    Returns:
+        dict: Like ``{"webp": "<url> 64w, <url> 256w"}``, empty without an image.
+    """
+    if not name:
+        return {}
+    storage = storage or default_storage
+    widths = get_derivative_widths(settings.IMAGE_DERIVATIVE_WIDTHS, width)
+    return {
+        fmt: ", ".join(
+            f"{storage.url(get_derivative_name(name, width, fmt))} {actual_width}w"
+            for width, actual_width in widths
+        )
+        for fmt in get_derivative_formats()
+    }
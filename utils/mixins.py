@@ -1,67 +1,172 @@
-import hashlib
 import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
 from django.db import models
-from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from filestore.references import is_file_referenced
+from utils.files import get_blob_name, get_content_hash
+from utils.images import get_image_width
+from utils.model_utils import bump_catalog_versions_on_commit
 
 logger = logging.getLogger(__name__)
 
+_prevalidated = ContextVar("prevalidated", default=False)
 
-class HashedFileModelMixin(models.Model):
+
+@contextmanager
+def prevalidated():
+    """
+    Skip the database-backed checks of ``ValidatedModelMixin.save`` in this block.
+
+    For callers that already validated the data, like serializers and admin forms,
+    which check foreign keys and unique fields themselves.
     """
-    Not currently in use. Work in progress.
+    token = _prevalidated.set(True)
+    try:
+        yield
+    finally:
+        _prevalidated.reset(token)
 
+
+class HashedFileModelMixin(models.Model):
+    """
     Mixin that adds file hashing capabilities to models with file fields.
-    Add this to any model with file or image fields that need content tracking.
+    Add this to any model with file or image fields that need content tracking, along
+    with a ``<field>_hash`` field for each of them. Image fields with a
+    ``<field>_width`` field get the width of the image recorded with the hash.
+
+    With ``CONTENT_ADDRESSED_MEDIA`` enabled, new files are stored under their digest
+    and content that is already stored is never uploaded again.
     """
 
     class Meta:
         abstract = True
 
+    @classmethod
+    def get_hashed_file_fields(cls):
+        """Get the file fields that have a matching hash field."""
+        return [
+            field
+            for field in cls._meta.get_fields()
+            if isinstance(field, (models.FileField, models.ImageField))
+            and hasattr(cls, f"{field.name}_hash")
+        ]
+
     def generate_file_hash(self, file_field_name):
         """
         Generate hash for a file field.
-        IMPORTANT: Only call this after the file has been saved to storage.
+        New uploads are hashed before they are saved to storage, stored files are read back.
         """
-        field = getattr(self, file_field_name, None)
-        if not field:
+        field_file = getattr(self, file_field_name, None)
+        if not field_file:
             return None
 
         try:
-            field_file = getattr(self, file_field_name)
+            if not field_file._committed:
+                return get_content_hash(field_file.file)
             field_file.open("rb")
-            file_hash = hashlib.sha256()
-            for chunk in iter(lambda: field_file.read(4096), b""):
-                file_hash.update(chunk)
-            field_file.close()
-            return file_hash.hexdigest()
+            try:
+                return get_content_hash(field_file, remember=False)
+            finally:
+                field_file.close()
         except Exception as e:
             logger.error(f"Error generating hash for {file_field_name}: {e}")
             return None
 
-    def update_file_hashes(self, commit=True):
-        """Update hash fields for all file fields in the model"""
-        changed = False
-
-        for field in self._meta.get_fields():
-            if isinstance(field, (models.FileField, models.ImageField)):
-                hash_field_name = f"{field.name}_hash"
-                if hasattr(self, hash_field_name):
-                    field_value = getattr(self, field.name, None)
-                    if field_value:
-                        file_hash = self.generate_file_hash(field.name)
-                        setattr(self, hash_field_name, file_hash)
-                        changed = True
-
-        if changed and commit:
-            # Use update rather than save to avoid recursion
-            type(self).objects.filter(pk=self.pk).update(
-                **{
-                    hash_field_name: getattr(self, hash_field_name)
-                    for field in self._meta.get_fields()
-                    if isinstance(field, (models.FileField, models.ImageField))
-                    and hasattr(self, f"{field.name}_hash")
-                }
+    def generate_image_width(self, file_field_name):
+        """
+        Read the width of an image field, for the srcset of its derivatives.
+        New uploads are read before they are saved to storage, stored files are read back.
+        """
+        field_file = getattr(self, file_field_name, None)
+        if not field_file:
+            return None
+
+        if not field_file._committed:
+            return get_image_width(field_file.file)
+        try:
+            field_file.open("rb")
+        except Exception as e:
+            logger.error(f"Error reading the width of {file_field_name}: {e}")
+            return None
+        try:
+            return get_image_width(field_file)
+        finally:
+            field_file.close()
+
+    def store_content_addressed_file(self, file_field_name, digest):
+        """
+        Store a new upload under its digest, skipping the upload if the blob already exists.
+
+        Args:
+            file_field_name (str): The file field holding the upload.
+            digest (str): The SHA-256 digest of the upload.
+        """
+        field_file = getattr(self, file_field_name)
+        name = get_blob_name(digest, field_file.name)
+
+        # The reference table answers for blobs in use, the storage for released ones
+        if not is_file_referenced(name) and not field_file.storage.exists(name):
+            name = field_file.storage.save(
+                name, field_file.file, max_length=field_file.field.max_length
+            )
+        else:
+            logger.info(f"Reusing stored blob {name} for {file_field_name}")
+
+        field_file.name = name
+        field_file._committed = True
+
+    def update_file_hashes(self, commit=True, defer_stored=False):
+        """
+        Update the hash fields, and width fields of images, for all file fields in the model.
+
+        Args:
+            commit (bool): Write the hashes to the database right away.
+            defer_stored (bool): Leave files that are already in storage unhashed, so a
+                ``hash_file`` job reads them back instead of the current request.
+        """
+        values = {}
+
+        for field in self.get_hashed_file_fields():
+            hash_field_name = f"{field.name}_hash"
+            width_field_name = f"{field.name}_width"
+            has_width = isinstance(field, models.ImageField) and hasattr(
+                type(self), width_field_name
             )
+            field_file = getattr(self, field.name, None)
+            if not field_file:
+                values[hash_field_name] = None
+                if has_width:
+                    values[width_field_name] = None
+                continue
+            if field_file._committed and (
+                getattr(self, hash_field_name) or defer_stored
+            ):
+                continue
+
+            file_hash = self.generate_file_hash(field.name)
+            values[hash_field_name] = file_hash
+            if has_width:
+                values[width_field_name] = self.generate_image_width(field.name)
+            if (
+                settings.CONTENT_ADDRESSED_MEDIA
+                and file_hash
+                and not field_file._committed
+            ):
+                self.store_content_addressed_file(field.name, file_hash)
+
+        for field_name, value in values.items():
+            setattr(self, field_name, value)
+
+        if values and commit:
+            # Use update rather than save to avoid recursion. Hashes are serialized,
+            # so move the timestamp and catalog version like a save would
+            if any(field.name == "modified" for field in self._meta.concrete_fields):
+                self.modified = values["modified"] = timezone.now()
+            type(self).objects.filter(pk=self.pk).update(**values)
+            bump_catalog_versions_on_commit(type(self), using=self._state.db)
 
 
 class TimeStampedModelMixin(models.Model):
@@ -75,3 +180,117 @@ class TimeStampedModelMixin(models.Model):
 
     class Meta:
         abstract = True
+
+
+class ValidatedModelMixin(models.Model):
+    """
+    Mixin that validates instances with ``full_clean`` on every save.
+
+    Inside ``prevalidated()`` only the checks that need no query run: field values and
+    ``clean()``, without foreign key existence, unique or constraint lookups.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if _prevalidated.get():
+            self.full_clean(
+                exclude=[
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if field.is_relation
+                ],
+                validate_unique=False,
+                validate_constraints=False,
+            )
+        else:
+            self.full_clean()
+        super().save(*args, **kwargs)
+
+
+def get_file_name(value):
+    """Get the stored name of a file field value, None when there is no file."""
+    name = value if isinstance(value, str) else getattr(value, "name", None)
+    return name or None
+
+
+class TrackedFieldsModelMixin(models.Model):
+    """
+    Mixin that remembers the values an instance was loaded or last saved with, so
+    changes are detected without fetching the row again.
+
+    File fields are always tracked, by file name. List other fields in
+    ``tracked_fields``.
+    """
+
+    tracked_fields = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_tracked_fields()
+        return instance
+
+    @classmethod
+    def get_tracked_fields(cls):
+        return [
+            field
+            for field in cls._meta.concrete_fields
+            if isinstance(field, models.FileField) or field.name in cls.tracked_fields
+        ]
+
+    def snapshot_tracked_fields(self, field_names=None):
+        """
+        Remember the current values, deferred fields are left untracked.
+
+        Args:
+            field_names (Iterable[str], optional): Only update these fields.
+        """
+        values = {}
+        for field in self.get_tracked_fields():
+            if field.attname not in self.__dict__:
+                continue
+            if field_names is not None and field.name not in field_names:
+                continue
+            value = self.__dict__[field.attname]
+            if isinstance(field, models.FileField):
+                value = get_file_name(value)
+            values[field.name] = value
+        if field_names is None:
+            self._loaded_values = values
+        else:
+            self.__dict__.setdefault("_loaded_values", {}).update(values)
+
+    def get_loaded_values(self, field_names):
+        """
+        Get the values the row has in the database, as of the last load or save.
+
+        Returns:
+            dict: The values by field, file fields by file name, or None if any of the
+            fields isn't tracked.
+        """
+        loaded = getattr(self, "_loaded_values", {})
+        if not all(field_name in loaded for field_name in field_names):
+            return None
+        return {field_name: loaded[field_name] for field_name in field_names}
+
+    def has_changed(self, field_names) -> bool:
+        """Check if any of the fields changed since the last load or save."""
+        loaded = self.get_loaded_values(field_names)
+        if loaded is None:
+            return True
+        return any(
+            getattr(self, field_name) != value for field_name, value in loaded.items()
+        )
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.snapshot_tracked_fields(kwargs.get("update_fields"))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self.snapshot_tracked_fields(fields)
@@ -1,16 +1,47 @@
-from django.db.models import FileField, ImageField, Model
-from django.db.models.signals import pre_delete, pre_save
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import ImageField, Model
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from typing import List, Type
+from typing import List, Optional, Type
 import logging
 
+from filestore.jobs import enqueue_job
+from filestore.references import (
+    FILE_FIELDS,
+    add_file_reference,
+    get_file_refcount,
+    release_file_reference,
+)
+from utils.cache import bump_catalog_version
+
 logger = logging.getLogger(__name__)
 
+# The catalogs whose cached responses include each model
+CATALOG_MODELS = {}
+
+
+def get_model_field(opts, name: str):
+    """
+    Get a model field by name, or a reverse relation by its accessor name like
+    ``teamcharacter_set``.
+    """
+    try:
+        return opts.get_field(name)
+    except FieldDoesNotExist:
+        for related_object in opts.related_objects:
+            if related_object.get_accessor_name() == name:
+                return related_object
+        raise
+
 
 def is_file_referenced_elsewhere(instance: Type[Model], file_field_name: str) -> bool:
     """
     Check if the file referenced by instance.file_field_name is used by any other model instances.
 
+    References are counted across every model with file cleanup signals, so this is a
+    single indexed lookup on the file reference table.
+
     Args:
         instance (Model): The model instance to check for references.
         file_field_name (str): The name of the file field to check.
@@ -26,67 +57,19 @@ def is_file_referenced_elsewhere(instance: Type[Model], file_field_name: str) ->
     if not field_file:
         return False
 
-    # Grab the class
-    model_class = instance.__class__
-
-    # Find all instances with the same file path minus the current instance
-    is_referenced = False
-
-    for field_class in [
-        f
-        for f in model_class._meta.get_fields()
-        if isinstance(f, (FileField, ImageField))
-    ]:
-        if field_class.name != file_field_name:  # Skip if it's not the field we want
-            continue
-
-        lookup = {f"{file_field_name}": field_file.name}
-
-        # Count instances of this file excluding the current instance
-        references = (
-            model_class.objects.filter(**lookup).exclude(pk=instance.pk).count()
-        )
-        if references > 0:
-            is_referenced = True
-            break
-    return is_referenced
-
-
-def delete_file_if_unused(instance: Type[Model], field_name: str):
-    """
-    Delete the file if it's not in use by any other model instances.
-
-    Args:
-        instance (Model): The model instance to check for references.
-        field_name (str): The name of the file field to check.
-    """
-    if not hasattr(instance, field_name):
-        return
-
-    field_file = getattr(instance, field_name, False)
-    if not field_file:
-        return
-
-    # If the file is not used by any other instances, delete it
-    if not is_file_referenced_elsewhere(instance, field_name):
-        try:
-            storage = field_file.storage
-            name = field_file.name
-            if storage.exists(name):
-                logger.info(
-                    f"Deletion of file {name} requested by {instance.__class__.__name__} instance {instance.pk}"
-                )
-                storage.delete(name)
-            else:
-                logger.warning(f"File {name} does not exist in storage.")
-        except Exception as e:
-            logger.error(f"Error deleting file {field_file.name}: {e}")
+    # A saved instance holds one of the references itself
+    own_references = 1 if instance.pk else 0
+    return get_file_refcount(field_file.name) > own_references
 
 
 def register_file_cleanup_signals(model_class: Type[Model], field_names: List[str]):
     """
     Register signals for file cleanup for a model.
 
+    The signals keep the file reference table up to date. Files that lose their last
+    reference are deleted later by the ``sweep_files`` command, never inside the request.
+    New images get their derivatives rendered by an ``image_derivatives`` job.
+
     Args:
         model_class (Type[Model]): The model class to register signals for.
         field_names: List of FileField or ImageField attribute names to clean up.
@@ -99,80 +82,137 @@ def register_file_cleanup_signals(model_class: Type[Model], field_names: List[st
             supports_hash_comparison = False
             break
 
-    @receiver(pre_delete, sender=model_class)
-    def delete_files_on_delete(sender, instance, **kwargs):
+    FILE_FIELDS.extend((model_class, field_name) for field_name in field_names)
+    image_field_names = {
+        field_name
+        for field_name in field_names
+        if isinstance(model_class._meta.get_field(field_name), ImageField)
+    }
+
+    # The receivers are closures, keep strong references so they aren't garbage collected
+    @receiver(pre_delete, sender=model_class, weak=False)
+    def release_files_on_delete(sender, instance, **kwargs):
         for field_name in field_names:
-            delete_file_if_unused(instance, field_name)
+            field_file = getattr(instance, field_name, None)
+            if field_file:
+                release_file_reference(field_file.name)
 
-    @receiver(pre_save, sender=model_class)
+    @receiver(pre_save, sender=model_class, weak=False)
     def manage_files_on_change(sender, instance, **kwargs):
         """
-        Manages file changes for a model instance by comparing old and new file references,
-        and deleting old files if they are no longer used.
+        Remember the files an instance referred to before the save, so ``post_save``
+        can move the references, and hash new files if supported.
 
         Args:
             sender (class): The model class that sent the signal.
             instance (object): The instance of the model being saved.
             **kwargs: Additional keyword arguments.
-
-        Behavior:
-            - If the instance is new (no primary key), it generates hashes for new files if supported.
-            - If the instance is being updated, it retrieves the old instance and compares file fields.
-            - If a file has been replaced or removed, it deletes the old file if it is no longer used.
-            - If hash comparison is supported, it checks if the file content has actually changed before deleting.
-            - Updates hashes for any new files if supported.
-
-        Note:
-            - Assumes `model_class`, `field_names`, `supports_hash_comparison`, `delete_file_if_unused`,
-              and `logger` are defined in the scope where this function is used.
-            - Assumes the instance has methods `update_file_hashes` and `generate_file_hash` if hash comparison is supported.
         """
-        # If this is a new instance, nothing to clean up
-        if not instance.pk:
-            # Generate hashes for new files if supported
-            if supports_hash_comparison and hasattr(instance, "update_file_hashes"):
-                instance.update_file_hashes(commit=False)
-            return
-
-        try:
-            old_instance = model_class.objects.get(pk=instance.pk)
-
+        previous_names = {}
+        if instance.pk:
+            # Instances remember the names they were loaded with, others are fetched
+            old_names = None
+            if hasattr(instance, "get_loaded_values"):
+                old_names = instance.get_loaded_values(field_names)
+            if old_names is None:
+                old_names = (
+                    model_class._default_manager.filter(pk=instance.pk)
+                    .values(*field_names)
+                    .first()
+                    or {}
+                )
             for field_name in field_names:
-                old_file = getattr(old_instance, field_name, None)
+                old_name = old_names.get(field_name)
                 new_file = getattr(instance, field_name, None)
-
-                # No old file or same file reference, nothing to do
-                if not old_file or old_file == new_file:
+                if not old_name:
                     continue
+                previous_names[field_name] = old_name
+
+                # A different stored file was assigned, its hash has to be recomputed
+                if (
+                    supports_hash_comparison
+                    and new_file
+                    and new_file._committed
+                    and new_file.name != old_name
+                ):
+                    setattr(instance, f"{field_name}_hash", None)
+
+        # Generate hashes for new uploads if supported, this stores content-addressed files.
+        # Files already in storage are hashed by a job rather than downloaded here.
+        if supports_hash_comparison and hasattr(instance, "update_file_hashes"):
+            instance.update_file_hashes(commit=False, defer_stored=True)
+
+        instance._previous_file_names = previous_names
+
+    @receiver(post_save, sender=model_class, weak=False)
+    def update_file_references_on_save(sender, instance, **kwargs):
+        previous_names = instance.__dict__.pop("_previous_file_names", {})
+        for field_name in field_names:
+            field_file = getattr(instance, field_name, None)
+            new_name = field_file.name if field_file else None
+            old_name = previous_names.get(field_name)
+            if new_name == old_name:
+                continue
+            if new_name:
+                add_file_reference(new_name)
+            if old_name:
+                logger.info(
+                    f"Release of file {old_name} requested by {model_class.__name__} instance {instance.pk}"
+                )
+                release_file_reference(old_name)
+
+            if (
+                supports_hash_comparison
+                and new_name
+                and not getattr(instance, f"{field_name}_hash")
+            ):
+                label = model_class._meta.label_lower
+                enqueue_job(
+                    "hash_file",
+                    {"model": label, "pk": instance.pk, "field": field_name},
+                    key=f"hash_file:{label}:{instance.pk}:{field_name}:{new_name}",
+                )
+
+            # Images that already have derivatives, like shared blobs, are skipped by the job
+            if new_name and field_name in image_field_names:
+                enqueue_job("image_derivatives", {"path": new_name})
+
+
+def register_catalog_version_signals(
+    model_class: Type[Model], catalog_models: Optional[List[Type[Model]]] = None
+):
+    """
+    Register signals that bump catalog versions whenever a model instance is saved or deleted.
+
+    Args:
+        model_class (Type[Model]): The model class to register signals for.
+        catalog_models (List[Type[Model]], optional): The catalogs whose cached responses
+            include this model. Defaults to the model's own catalog.
+    """
+    CATALOG_MODELS[model_class] = catalog_models or [model_class]
+
+    @receiver(post_save, sender=model_class, weak=False)
+    def bump_catalog_version_on_save(sender, instance, using, **kwargs):
+        bump_catalog_versions_on_commit(model_class, using=using)
+
+    @receiver(post_delete, sender=model_class, weak=False)
+    def bump_catalog_version_on_delete(sender, instance, using, **kwargs):
+        bump_catalog_versions_on_commit(model_class, using=using)
+
+
+def bump_catalog_versions_on_commit(model_class: Type[Model], using=None):
+    """
+    Bump the catalog versions whose cached responses include a model once the current
+    transaction commits, also for writes that send no signals, like ``update()``.
+
+    Versions move after the commit, a request reading the new version before then
+    would cache the old rows under it.
+    """
+    catalog_models = CATALOG_MODELS.get(model_class, ())
+
+    def bump_catalog_versions():
+        for catalog_model in catalog_models:
+            bump_catalog_version(catalog_model)
 
-                # If new file is None or filename changed, we need to check further
-                if not new_file or old_file.name != new_file.name:
-                    if (
-                        supports_hash_comparison
-                    ):  # If hash comparison is supported, check if content actually changed
-                        hash_field_name = f"{field_name}_hash"
-                        old_hash = getattr(old_instance, hash_field_name, None)
-
-                        # If new file exists, get its hash
-                        if new_file:
-                            if hasattr(instance, "generate_file_hash"):
-                                new_hash = instance.generate_file_hash(field_name)
-                            else:
-                                new_hash = None
-
-                            # If hashes match, files are identical despite filename change
-                            if old_hash and new_hash and old_hash == new_hash:
-                                logger.info(
-                                    f"File content unchanged despite filename change. Not deleting: {old_file.name}"
-                                )
-                                continue
-
-                    # Either hash comparison not supported or hashes differ
-                    delete_file_if_unused(old_instance, field_name)
-
-            # Update hashes for any new files
-            if supports_hash_comparison and hasattr(instance, "update_file_hashes"):
-                instance.update_file_hashes(commit=False)
-
-        except model_class.DoesNotExist:
-            pass
+    if catalog_models:
+        transaction.on_commit(bump_catalog_versions, using=using)
@@ -0,0 +1,69 @@
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the primary key.
+
+    Each page is fetched with ``WHERE id > <cursor> ORDER BY id LIMIT n``, which walks
+    the primary key index, so the cost of a page does not depend on how deep it is.
+    The ordering is unique and never changes, so pages stay stable while rows are added.
+    """
+
+    ordering = "id"
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async ``paginate_queryset()``, the page is read with the async ORM.
+
+        Leaves the paginator in the same state, so ``get_paginated_response()`` and the
+        next and previous links work as after a synchronous call.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        # The ordering is always a single ascending field
+        order = self.ordering[0]
+        queryset = queryset.order_by(f"-{order}" if reverse else order)
+        if current_position is not None:
+            lookup = "lt" if reverse else "gt"
+            queryset = queryset.filter(**{f"{order}__{lookup}": current_position})
+
+        results = [
+            obj
+            async for obj in queryset[offset : offset + self.page_size + 1].aiterator()
+        ]
+        self.page = results[: self.page_size]
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            following_position = None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        self.display_page_controls = self.has_previous or self.has_next
+        return self.page
@@ -0,0 +1,88 @@
+"""
+Routing of read-only requests to a read replica.
+
+Requests with a safe method (GET, HEAD, OPTIONS), which covers the ``list`` and
+``retrieve`` actions of every viewset, read from the ``replica`` database alias when
+one is configured. Writes always go to ``default``, and so do the reads of any other
+request, so a request sees its own writes.
+
+With SQLite the replica is a read-only connection to the same file. In WAL mode its
+readers work from the last committed snapshot without waiting for writers.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = "replica"
+
+_read_only = ContextVar("read_only", default=False)
+
+
+@contextmanager
+def read_only():
+    """Send the reads of the block to the read replica, if there is one."""
+    token = _read_only.set(True)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+class ReadReplicaRouter:
+    """Database router sending reads inside ``read_only()`` to the replica."""
+
+    def __init__(self):
+        self.replica_alias = (
+            REPLICA_DB_ALIAS if REPLICA_DB_ALIAS in settings.DATABASES else None
+        )
+
+    def db_for_read(self, model, **hints):
+        if self.replica_alias and _read_only.get():
+            return self.replica_alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DB_ALIAS
+
+
+class ReadReplicaMiddleware:
+    """
+    Serve requests with a safe method from the read replica.
+
+    Supports async requests too, so under ASGI the async views stay async.
+    """
+
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if request.method not in self.SAFE_METHODS:
+            return self.get_response(request)
+        with read_only():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.method not in self.SAFE_METHODS:
+            return await self.get_response(request)
+        with read_only():
+            return await self.get_response(request)
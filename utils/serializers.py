@@ -0,0 +1,456 @@
+import re
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import quote, urljoin, urlsplit
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.core.files.storage import (
+    FileSystemStorage,
+    InMemoryStorage,
+    default_storage,
+)
+from django.db.models import FileField
+from django.utils import timezone
+from rest_framework import ISO_8601, fields, relations, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from storages.backends.s3 import S3Storage
+
+from utils.images import get_derivative_formats, get_derivative_widths, get_srcset
+from utils.model_utils import get_model_field
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ImageSrcsetField(serializers.ReadOnlyField):
+    """
+    Read-only ``srcset`` attributes for the derivatives of an image field, keyed by
+    format, so clients can pick a size instead of downloading the original:
+
+        image_srcset = ImageSrcsetField(source="image")
+
+    Derivatives are listed with their actual width when the model records the width
+    of the image in a ``<source>_width`` field.
+    """
+
+    @property
+    def width_source(self):
+        return f"{self.source}_width"
+
+    def get_attribute(self, instance):
+        image = super().get_attribute(instance)
+        return image, getattr(instance, self.width_source, None)
+
+    def to_representation(self, value):
+        image, width = value
+        return get_srcset(image.name if image else None, width)
+
+
+# Fields that return the values the database gives unchanged
+PASSTHROUGH_METHODS = {
+    fields.CharField.to_representation,
+    fields.IntegerField.to_representation,
+    fields.BooleanField.to_representation,
+    fields.ReadOnlyField.to_representation,
+    relations.PrimaryKeyRelatedField.to_representation,
+}
+
+# Model fields whose values are encoded the same by orjson and the json module
+EXACT_INTERNAL_TYPES = {
+    "AutoField",
+    "BigAutoField",
+    "BigIntegerField",
+    "BooleanField",
+    "CharField",
+    "EmailField",
+    "IntegerField",
+    "PositiveBigIntegerField",
+    "PositiveIntegerField",
+    "PositiveSmallIntegerField",
+    "SlugField",
+    "SmallAutoField",
+    "SmallIntegerField",
+    "TextField",
+    "URLField",
+}
+
+DOT_SEGMENT = re.compile(r"(^|/)\.\.?(/|$)")
+
+# Characters left unquoted in names by filepath_to_uri(), and by botocore in the
+# unsigned URLs of S3 objects
+FILE_PATH_SAFE = "/~!*()'"
+S3_KEY_SAFE = "/~"
+
+
+def get_storage_base_url(storage=None) -> Optional[Tuple[str, str]]:
+    """
+    Get the prefix of the URLs of a storage, when each URL is the prefix followed by
+    the quoted name: the file system and in-memory storages, and S3 storages whose
+    URLs aren't signed.
+
+    Returns:
+        tuple: The base URL and the characters left unquoted in names, or None when
+        the storage has to be asked for each URL.
+    """
+    storage = storage or default_storage
+    if storage.__class__.url in (FileSystemStorage.url, InMemoryStorage.url):
+        base_url = storage.base_url
+        if base_url is None or urljoin(base_url, "name") != f"{base_url}name":
+            return None
+        return base_url, FILE_PATH_SAFE
+
+    if storage.__class__.url is S3Storage.url:
+        if storage.custom_domain:
+            if storage.querystring_auth and storage.cloudfront_signer:
+                return None
+            safe = FILE_PATH_SAFE
+        elif storage.querystring_auth:
+            return None
+        else:
+            safe = S3_KEY_SAFE
+        # The location, bucket and endpoint or domain come before the key
+        url = storage.url("name")
+        if not url.endswith("/name"):
+            return None
+        return url.removesuffix("name"), safe
+    return None
+
+
+def get_url_path(name: str, safe: str = FILE_PATH_SAFE) -> Optional[str]:
+    """
+    Quote a storage name as storages put it after their base URL.
+
+    Args:
+        name (str): The storage name.
+        safe (str): The characters the storage leaves unquoted.
+
+    Returns:
+        str: The quoted name, or None for names that ``urljoin()``,
+        ``build_absolute_uri()`` or S3 storages would normalize, with ``.`` or ``..``
+        segments, a leading slash or repeated slashes.
+    """
+    path = quote(name.replace("\\", "/"), safe=safe)
+    if path.startswith("/") or "//" in path or DOT_SEGMENT.search(path):
+        return None
+    return path
+
+
+def is_absolute_prefix(url: str) -> bool:
+    """
+    Check that ``build_absolute_uri()`` keeps a URL as a prefix, so names can be
+    added after the absolute URL instead of making each of their URLs absolute.
+    """
+    bits = urlsplit(url)
+    if bits.scheme and bits.netloc:
+        return True
+    return (
+        not bits.scheme
+        and not bits.netloc
+        and bits.path.startswith("/")
+        and not url.startswith("//")
+        and not DOT_SEGMENT.search(bits.path)
+    )
+
+
+def render_json(data, exact=False) -> bytes:
+    """
+    Render data to the same bytes as ``JSONRenderer``, with orjson when it's installed
+    (``poetry install --extras orjson``).
+
+    Args:
+        data: The data to render.
+        exact (bool): Whether the data only holds strings, integers, booleans, None,
+            lists and dicts, which orjson encodes exactly like the json module. Floats,
+            for one, don't have the same exponents.
+    """
+    if (
+        orjson is not None
+        and exact
+        and api_settings.UNICODE_JSON
+        and api_settings.COMPACT_JSON
+    ):
+        try:
+            content = orjson.dumps(data)
+        except orjson.JSONEncodeError:
+            # Integers over 64 bits
+            pass
+        else:
+            # Escaped by JSONRenderer for JavaScript
+            return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+    return JSONRenderer().render(data)
+
+
+def get_width_column(opts, field: ImageSrcsetField) -> Optional[str]:
+    """Get the column holding the image width of a srcset field, if the model has one."""
+    try:
+        return get_model_field(opts, field.width_source).name
+    except FieldDoesNotExist:
+        return None
+
+
+class RowSerializer:
+    """
+    Read-only fast path of a ``ModelSerializer``, serializing ``values()`` rows to
+    the same data as the serializer does from model instances:
+
+        rows = RowSerializer(CharacterSerializer, context={"request": request})
+        data = rows.to_representation(queryset.values(*rows.columns))
+
+    Rows skip building model instances, and each field is read straight from its
+    column instead of going through ``get_attribute()`` and ``to_representation()``.
+    Image URLs are built from the storage's base URL, made absolute once per request,
+    instead of asking the storage and the request for each one. Reverse relations
+    nested with ``many=True`` are read with one ``values()`` query per level.
+
+    Only fields reading a model field or a reverse relation of the serializer's
+    model are supported, others raise ``ImproperlyConfigured``.
+    """
+
+    def __init__(self, serializer_class, context=None):
+        self.context = context or {}
+        self.request = self.context.get("request")
+        self.base_url, self.url_safe = get_storage_base_url() or (None, None)
+        self.absolute_base_url = self.base_url
+        if self.request is not None:
+            self.absolute_base_url = (
+                self.request.build_absolute_uri(self.base_url)
+                if self.base_url is not None and is_absolute_prefix(self.base_url)
+                else None
+            )
+        self.srcset_formats = get_derivative_formats()
+        self.srcset_widths = sorted(settings.IMAGE_DERIVATIVE_WIDTHS)
+        # The derivatives of each image width
+        self.derivative_widths = {}
+
+        self.fields, self.columns, self.exact = self.get_fields(
+            serializer_class(context=self.context)
+        )
+
+    def get_fields(self, serializer):
+        """
+        Work out how to read each field of a serializer from a row.
+
+        Returns:
+            tuple: The fields as ``(name, column, convert)``, the columns to pass to
+            ``values()`` and whether the data can be rendered with orjson.
+        """
+        opts = serializer.Meta.model._meta
+        columns = [opts.pk.name]
+        row_fields = []
+        exact = True
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == "*" or "." in field.source:
+                raise ImproperlyConfigured(f"{name} doesn't read a single field.")
+            model_field = get_model_field(opts, field.source)
+
+            if isinstance(field, serializers.ListSerializer):
+                if not model_field.one_to_many or not isinstance(
+                    field.child, serializers.ModelSerializer
+                ):
+                    raise ImproperlyConfigured(f"{name} isn't a reverse relation.")
+                related = RelatedRows(self, model_field, field.child)
+                row_fields.append((name, related.key, related))
+                columns.append(related.key)
+                exact = exact and related.exact
+                continue
+            if not model_field.concrete or model_field.many_to_many:
+                raise ImproperlyConfigured(f"{name} isn't a column.")
+
+            value_field = (
+                model_field.target_field if model_field.is_relation else model_field
+            )
+            convert, field_exact = self.get_converter(field, model_field)
+            column = model_field.name
+            columns.append(column)
+            if isinstance(field, ImageSrcsetField):
+                # Given the image name and width, see serialize()
+                width_column = get_width_column(opts, field)
+                column = (column, width_column)
+                if width_column is not None:
+                    columns.append(width_column)
+            row_fields.append((name, column, convert))
+            exact = exact and (
+                field_exact
+                if convert is not None
+                else value_field.get_internal_type() in EXACT_INTERNAL_TYPES
+            )
+
+        return row_fields, list(dict.fromkeys(columns)), exact
+
+    def get_converter(self, field, model_field):
+        """
+        Get the function turning a column value into the field's representation.
+
+        Returns:
+            tuple: The function, None when values are used as they are, and whether it
+            returns data orjson encodes exactly.
+        """
+        method = type(field).to_representation
+        if method is ImageSrcsetField.to_representation:
+            return (lambda value: self.get_srcset(*value)), True
+        if method is fields.FileField.to_representation:
+            if not getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL):
+                return (lambda name: name or None), True
+            return (lambda name: self.get_image_url(name) if name else None), True
+        if isinstance(model_field, FileField):
+            # Other fields are given the FieldFile, not its name
+            raise ImproperlyConfigured(f"{field.field_name} reads a file.")
+
+        if method in PASSTHROUGH_METHODS and not getattr(field, "pk_field", None):
+            return None, False
+        if method is fields.BigIntegerField.to_representation and not getattr(
+            field, "coerce_to_string", api_settings.COERCE_BIGINT_TO_STRING
+        ):
+            return None, False
+        if method is fields.ChoiceField.to_representation and all(
+            isinstance(key, (str, int)) for key in field.choices
+        ):
+            return None, False
+        if model_field.is_relation:
+            raise ImproperlyConfigured(f"{field.field_name} reads a related object.")
+
+        if method is fields.DateTimeField.to_representation:
+            return self.get_datetime_converter(field)
+
+        to_representation = field.to_representation
+        return (
+            lambda value: None if value is None else to_representation(value)
+        ), False
+
+    def get_datetime_converter(self, field):
+        """
+        Get the converter of a ``DateTimeField``, which looks up the timezone once
+        instead of for each value.
+        """
+        to_representation = field.to_representation
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        field_timezone = (
+            field.timezone if hasattr(field, "timezone") else field.default_timezone()
+        )
+        if output_format is None:
+            return (lambda value: to_representation(value) if value else None), False
+        if output_format.lower() != ISO_8601 or field_timezone is None:
+            return (lambda value: to_representation(value) if value else None), True
+
+        def convert(value):
+            if not value:
+                return None
+            if isinstance(value, str) or not timezone.is_aware(value):
+                return to_representation(value)
+            try:
+                value = value.astimezone(field_timezone).isoformat()
+            except OverflowError:
+                return to_representation(value)
+            return f"{value[:-6]}Z" if value.endswith("+00:00") else value
+
+        return convert, True
+
+    def get_image_url(self, name):
+        path = (
+            None
+            if self.absolute_base_url is None
+            else get_url_path(name, self.url_safe)
+        )
+        if path is not None:
+            return self.absolute_base_url + path
+        url = default_storage.url(name)
+        return url if self.request is None else self.request.build_absolute_uri(url)
+
+    def get_srcset(self, name, width=None):
+        path = (
+            None
+            if self.base_url is None or not name
+            else get_url_path(name, self.url_safe)
+        )
+        if path is None:
+            return get_srcset(name, width)
+        # Derivative names only add a suffix that isn't quoted
+        if width not in self.derivative_widths:
+            self.derivative_widths[width] = get_derivative_widths(
+                self.srcset_widths, width
+            )
+        return {
+            fmt: ", ".join(
+                f"{self.base_url}{path}.{name_width}w.{fmt} {actual_width}w"
+                for name_width, actual_width in self.derivative_widths[width]
+            )
+            for fmt in self.srcset_formats
+        }
+
+    def to_representation(self, rows) -> List[dict]:
+        """
+        Serialize rows read with ``values(*self.columns)``.
+
+        Args:
+            rows (Iterable[dict]): The rows, a queryset is read once.
+
+        Returns:
+            list: The data of each row, as the serializer gives it with ``many=True``.
+        """
+        return self.serialize(list(rows), self.fields)
+
+    def serialize(self, rows, row_fields) -> List[dict]:
+        row_fields = [
+            (
+                name,
+                column,
+                convert.fetch(rows) if isinstance(convert, RelatedRows) else convert,
+            )
+            for name, column, convert in row_fields
+        ]
+        # Fields reading several columns are given their values as a tuple
+        for _, column, _ in row_fields:
+            if isinstance(column, tuple):
+                for row in rows:
+                    row[column] = tuple(
+                        None if key is None else row[key] for key in column
+                    )
+        return [
+            {
+                name: row[column] if convert is None else convert(row[column])
+                for name, column, convert in row_fields
+            }
+            for row in rows
+        ]
+
+
+class RelatedRows:
+    """The rows of a reverse relation nested in a ``RowSerializer``."""
+
+    def __init__(self, row_serializer, model_field, serializer):
+        self.row_serializer = row_serializer
+        self.model = model_field.related_model
+        self.foreign_key = model_field.field.name
+        # The parent column the foreign key points to
+        self.key = model_field.field.target_field.name
+        self.fields, columns, self.exact = row_serializer.get_fields(serializer)
+        self.columns = list(dict.fromkeys([*columns, self.foreign_key]))
+
+    def fetch(self, rows) -> Callable:
+        """
+        Read and serialize the related rows of the parent rows, in the order a
+        prefetch reads them.
+
+        Returns:
+            Callable: Gives the list of related data for a parent's key.
+        """
+        keys = {row[self.key] for row in rows} - {None}
+        related = {}
+        if keys:
+            related_rows = list(
+                self.model._default_manager.filter(
+                    **{f"{self.foreign_key}__in": keys}
+                ).values(*self.columns)
+            )
+            records = self.row_serializer.serialize(related_rows, self.fields)
+            for row, record in zip(related_rows, records):
+                related.setdefault(row[self.foreign_key], []).append(record)
+        return lambda key: related.get(key, [])
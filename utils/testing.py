@@ -0,0 +1,91 @@
+"""
+Helpers shared by the test suites.
+"""
+
+import re
+
+from django.db import connection
+
+from abilities.models import Ability
+from characters.models import Character
+from lightcones.models import Lightcone
+from relics.models import Relic
+from teams.models import Team, TeamCharacter
+
+
+def create_teams(count, start=0, members=4):
+    """
+    Create teams named ``Team {i}``, each with members holding an ability, a
+    lightcone and the same two relics, also added to ``Team.members``.
+
+    Args:
+        count (int): The number of teams.
+        start (int): The index of the first team, to add teams to earlier ones.
+        members (int): The number of members of each team.
+    """
+    relics = [
+        Relic.objects.get_or_create(
+            set_name="Thunder", slot=slot, defaults={"name": f"Relic {slot}"}
+        )[0]
+        for slot in ("head", "hands")
+    ]
+    for i in range(start, start + count):
+        team = Team.objects.create(name=f"Team {i}")
+        for j in range(members):
+            character = Character.objects.create(
+                name=f"Character {i}-{j}",
+                type="fire" if j % 2 else "ice",
+                path="destruction",
+                rarity=5,
+            )
+            Ability.objects.create(character=character, name="Strike", type="basic")
+            lightcone = Lightcone.objects.create(
+                name=f"Lightcone {i}-{j}",
+                rarity=5,
+                path="destruction",
+                ability="Ability",
+            )
+            member = TeamCharacter.objects.create(
+                team=team, character=character, lightcone=lightcone
+            )
+            member.relics.set(relics)
+            team.members.add(character)
+
+
+class QueryPlanAssertionsMixin:
+    """
+    Assertions on the plan the database picks for a queryset, from ``EXPLAIN``.
+
+    SQLite and PostgreSQL are supported. On PostgreSQL sequential scans are disabled
+    while explaining, since the planner prefers them for the small tables of a test
+    database even when a usable index exists.
+    """
+
+    def get_query_plan(self, queryset) -> str:
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, ordered=True):
+        """
+        Assert that the queryset is read through an index instead of a full table scan.
+
+        Args:
+            queryset: The queryset to explain.
+            ordered (bool): Also assert the rows come out of the index in the
+                queryset's order, without a separate sort.
+        """
+        plan = self.get_query_plan(queryset)
+        table = queryset.model._meta.db_table
+        if connection.vendor == "postgresql":
+            self.assertNotIn(f"Seq Scan on {table}", plan, plan)
+            if ordered:
+                self.assertNotIn("Sort Key", plan, plan)
+        else:
+            # "SCAN table USING INDEX" still reads every row, only "SEARCH" seeks
+            self.assertIsNone(
+                re.search(rf"\bSCAN {table}\b", plan), f"Full scan of {table}:\n{plan}"
+            )
+            if ordered:
+                self.assertNotIn("USE TEMP B-TREE", plan, plan)
@@ -0,0 +1,175 @@
+"""
+Upload paths for every file field, built from templates like:
+
+    UploadPath("characters/{character.path}/{character.name}/{type}.{ext}")
+
+Values are slugified, ``ext`` is the extension of the uploaded file. Related rows are
+read from the instance when already loaded, otherwise the columns the template needs
+are fetched with one query, or for a whole batch of instances with
+``prime_upload_paths``, and their slugs are kept on the instance.
+"""
+
+from functools import lru_cache
+from string import Formatter
+from typing import Iterable, List, Tuple
+
+from django.db.models import FileField, Model
+from django.utils.deconstruct import deconstructible
+from django.utils.text import slugify
+
+
+@lru_cache(maxsize=4096)
+def get_slug(value: str) -> str:
+    """Slugify a path component, names repeat a lot across uploads so they are cached."""
+    return slugify(value)
+
+
+@deconstructible
+class UploadPath:
+    """
+    A file field ``upload_to`` callable that fills a path template from the instance.
+
+    Args:
+        template (str): The path, with ``{field}`` or ``{relation.field}`` lookups.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self.parts: List[Tuple[str, Tuple[str, ...]]] = [
+            (literal, tuple(field.split(".")) if field else ())
+            for literal, field, _, _ in Formatter().parse(template)
+        ]
+        self.lookups = [
+            lookup for _, lookup in self.parts if lookup and lookup != ("ext",)
+        ]
+
+    def __eq__(self, other):
+        return isinstance(other, UploadPath) and self.template == other.template
+
+    def __call__(self, instance: Model, filename: str) -> str:
+        self.load_relations(instance)
+        extension = filename.split(".")[-1]
+
+        path = []
+        for literal, lookup in self.parts:
+            path.append(literal)
+            if lookup == ("ext",):
+                path.append(extension)
+            elif lookup:
+                path.append(self.get_value_slug(instance, lookup))
+        return "".join(path)
+
+    def get_value_slug(self, instance: Model, lookup: Tuple[str, ...]) -> str:
+        """Get the slug of a lookup, from the loaded values of an unloaded relation."""
+        if len(lookup) > 1:
+            field = instance._meta.get_field(lookup[0])
+            if not field.is_cached(instance):
+                values = get_loaded_values(instance, field)
+                column = "__".join(lookup[1:])
+                if column in values:
+                    return values[column]
+        value = instance
+        for attr in lookup:
+            value = getattr(value, attr)
+        return get_slug(str(value))
+
+    def get_relations(self) -> List[str]:
+        """The relations of the instance the template reads from."""
+        return list(
+            dict.fromkeys(lookup[0] for lookup in self.lookups if len(lookup) > 1)
+        )
+
+    def get_related_columns(self, relation: str) -> List[str]:
+        """The ``values()`` lookups the template reads below a relation."""
+        return list(
+            dict.fromkeys(
+                "__".join(lookup[1:])
+                for lookup in self.lookups
+                if lookup[0] == relation and len(lookup) > 1
+            )
+        )
+
+    def load_relations(self, instance: Model):
+        """Read the related values the template needs that aren't loaded yet."""
+        for relation in self.get_relations():
+            field = instance._meta.get_field(relation)
+            related_id = getattr(instance, field.attname)
+            if field.is_cached(instance) or related_id is None:
+                continue
+            columns = self.get_related_columns(relation)
+            values = get_loaded_values(instance, field)
+            if all(column in values for column in columns):
+                continue
+            row = (
+                field.related_model._default_manager.filter(pk=related_id)
+                .values(*columns)
+                .first()
+            )
+            if row is not None:
+                set_loaded_values(instance, field, related_id, row)
+
+
+def get_loaded_values(instance: Model, field) -> dict:
+    """The slugs read for the current related row of an unloaded relation."""
+    loaded = instance.__dict__.get("_upload_path_values", {})
+    return loaded.get((field.name, getattr(instance, field.attname)), {})
+
+
+def set_loaded_values(instance: Model, field, related_id, row: dict):
+    """
+    Keep the slugs of the values of a related row on an instance.
+
+    Only slugs are kept, not the rows as model instances, so reading other fields of
+    the relation later doesn't fetch a partly loaded row again.
+    """
+    loaded = instance.__dict__.setdefault("_upload_path_values", {})
+    loaded.setdefault((field.name, related_id), {}).update(
+        (column, get_slug(str(value))) for column, value in row.items()
+    )
+
+
+def prime_upload_paths(instances: Iterable[Model]):
+    """
+    Load what the upload paths of a batch of instances read, for bulk uploads.
+
+    Runs one query per relation for the whole batch instead of one or two per file.
+
+    Args:
+        instances (Iterable[Model]): Instances of one model, before their files are saved.
+    """
+    instances = list(instances)
+    if not instances:
+        return
+
+    model_class = type(instances[0])
+    columns = {}
+    for field in model_class._meta.get_fields():
+        if not isinstance(field, FileField) or not isinstance(
+            field.upload_to, UploadPath
+        ):
+            continue
+        for relation in field.upload_to.get_relations():
+            columns.setdefault(relation, {}).update(
+                dict.fromkeys(field.upload_to.get_related_columns(relation))
+            )
+
+    for relation, relation_columns in columns.items():
+        field = model_class._meta.get_field(relation)
+        unloaded = [
+            instance
+            for instance in instances
+            if not field.is_cached(instance)
+            and getattr(instance, field.attname) is not None
+        ]
+        if not unloaded:
+            continue
+        rows = {
+            row.pop("pk"): row
+            for row in field.related_model._default_manager.filter(
+                pk__in={getattr(instance, field.attname) for instance in unloaded}
+            ).values("pk", *relation_columns)
+        }
+        for instance in unloaded:
+            related_id = getattr(instance, field.attname)
+            if related_id in rows:
+                set_loaded_values(instance, field, related_id, rows[related_id])
@@ -0,0 +1,608 @@
+import asyncio
+import copy
+import hashlib
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections, connections
+from django.db.models import Count, Max, Prefetch, QuerySet, prefetch_related_objects
+from django.db.models.constants import LOOKUP_SEP
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.permissions import IsAdminUser
+from rest_framework.relations import ManyRelatedField
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer, ModelSerializer
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView, exception_handler
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from utils.cache import (
+    get_catalog_cache_key,
+    get_catalog_cache_stats,
+    record_catalog_cache_event,
+)
+from utils.mixins import prevalidated
+from utils.model_utils import get_model_field
+from utils.serializers import (
+    ImageSrcsetField,
+    RowSerializer,
+    get_width_column,
+    render_json,
+)
+
+
+def get_serializer_query_plan(
+    serializer: ModelSerializer,
+) -> Tuple[List[str], List[str], List[Prefetch]]:
+    """
+    Work out which columns and relations a model serializer reads.
+
+    Args:
+        serializer (ModelSerializer): The serializer instance to inspect.
+
+    Returns:
+        tuple: The column names to pass to ``only()``, the lookups to pass to
+        ``select_related()`` and the ``Prefetch`` objects to pass to ``prefetch_related()``.
+    """
+    opts = serializer.Meta.model._meta
+    columns = [opts.pk.name]
+    select_related = []
+    prefetches = []
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*" or "." in field.source:
+            continue
+
+        try:
+            model_field = get_model_field(opts, field.source)
+        except FieldDoesNotExist:
+            continue
+
+        nested = field.child if isinstance(field, ListSerializer) else field
+        if isinstance(nested, ModelSerializer):
+            nested_columns, nested_select, nested_prefetches = (
+                get_serializer_query_plan(nested)
+            )
+            if model_field.many_to_one or (
+                model_field.one_to_one and model_field.concrete
+            ):
+                # Forward relation, join it and load the nested columns in the same row
+                columns.append(model_field.name)
+                select_related.append(field.source)
+                select_related.extend(
+                    f"{field.source}__{lookup}" for lookup in nested_select
+                )
+                columns.extend(f"{field.source}__{column}" for column in nested_columns)
+                for prefetch in nested_prefetches:
+                    prefetch.add_prefix(field.source)
+                    prefetches.append(prefetch)
+            else:
+                # Reverse or many-to-many relation, fetch it with one extra query
+                if model_field.one_to_many:
+                    nested_columns.append(model_field.field.name)
+                queryset = nested.Meta.model._default_manager.only(*nested_columns)
+                if nested_select:
+                    queryset = queryset.select_related(*nested_select)
+                if nested_prefetches:
+                    queryset = queryset.prefetch_related(*nested_prefetches)
+                prefetches.append(Prefetch(field.source, queryset=queryset))
+        elif isinstance(field, ManyRelatedField):
+            related_model = model_field.related_model
+            prefetches.append(
+                Prefetch(
+                    field.source,
+                    queryset=related_model._default_manager.only(
+                        related_model._meta.pk.name
+                    ),
+                )
+            )
+        elif model_field.concrete and not model_field.many_to_many:
+            columns.append(model_field.name)
+            if isinstance(field, ImageSrcsetField):
+                width_column = get_width_column(opts, field)
+                if width_column is not None:
+                    columns.append(width_column)
+
+    return list(dict.fromkeys(columns)), select_related, prefetches
+
+
+def optimize_queryset_for_serializer(queryset, serializer_class):
+    """
+    Restrict a queryset to the columns and relations a serializer needs.
+
+    Args:
+        queryset (QuerySet): The queryset to optimize.
+        serializer_class (Type[ModelSerializer]): The serializer used to render it.
+
+    Returns:
+        QuerySet: The queryset with ``only()``, ``select_related()`` and ``prefetch_related()`` applied.
+    """
+    columns, select_related, prefetches = get_serializer_query_plan(serializer_class())
+    queryset = queryset.only(*columns)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    return queryset
+
+
+def get_prefetched_objects(instances: Sequence, lookup: str) -> list:
+    """Collect the related objects a prefetch stored on a list of instances."""
+    objects = instances
+    for name in lookup.split(LOOKUP_SEP):
+        related = []
+        for obj in objects:
+            value = getattr(obj, name)
+            if value is None:
+                continue
+            if hasattr(value, "all"):
+                value = value.all()
+            if isinstance(value, (list, tuple, QuerySet)):
+                related.extend(value)
+            else:
+                related.append(value)
+        objects = related
+    return objects
+
+
+def _prefetch_on_own_connection(instances, prefetch):
+    close_old_connections()
+    try:
+        prefetch_related_objects(instances, prefetch)
+    finally:
+        close_old_connections()
+
+
+async def prefetch_concurrently(
+    instances: Sequence, prefetches: List[Prefetch], concurrent: Optional[bool] = None
+):
+    """
+    Prefetch the relations of model instances from async code.
+
+    Lookups on the same instances don't depend on each other, so when there are several
+    they run at the same time, each in a thread of its own with its own database
+    connection. The lookups nested in a ``Prefetch`` queryset are fetched the same way,
+    one level at a time, once their parent objects are loaded.
+
+    Args:
+        instances (Sequence[Model]): The instances to prefetch relations of.
+        prefetches (List[Prefetch]): The lookups, as passed to ``prefetch_related()``.
+        concurrent (bool, optional): Whether lookups may run on other connections.
+            By default they do unless the instances were read inside a transaction,
+            whose uncommitted rows another connection wouldn't see.
+    """
+    if not instances or not prefetches:
+        return
+    if concurrent is None:
+        using = instances[0]._state.db
+        concurrent = not await sync_to_async(
+            lambda: connections[using].in_atomic_block
+        )()
+    parallel = concurrent and len(prefetches) > 1
+
+    for instance in instances:
+        # Lookups running in parallel would race to create the cache
+        if not hasattr(instance, "_prefetched_objects_cache"):
+            instance._prefetched_objects_cache = {}
+
+    async def fetch(prefetch):
+        prefetch = copy.copy(prefetch)
+        nested = []
+        if prefetch.queryset is not None:
+            nested = list(prefetch.queryset._prefetch_related_lookups)
+            prefetch.queryset = prefetch.queryset.prefetch_related(None)
+        if parallel:
+            await sync_to_async(_prefetch_on_own_connection, thread_sensitive=False)(
+                instances, prefetch
+            )
+        else:
+            await sync_to_async(prefetch_related_objects)(instances, prefetch)
+        await prefetch_concurrently(
+            get_prefetched_objects(instances, prefetch.prefetch_to),
+            [
+                lookup if isinstance(lookup, Prefetch) else Prefetch(lookup)
+                for lookup in nested
+            ],
+            concurrent=concurrent,
+        )
+
+    await asyncio.gather(*(fetch(prefetch) for prefetch in prefetches))
+
+
+def get_streaming_content(request, chunks: Iterable[bytes]):
+    """
+    Adapt the content of a ``StreamingHttpResponse`` to the handler serving it.
+
+    Under ASGI Django reads a synchronous iterator to the end before sending anything,
+    so the chunks are handed over as an async iterator instead, each one produced in
+    the request's thread.
+
+    Args:
+        request (HttpRequest): The request, or a DRF ``Request`` wrapping it.
+        chunks (Iterable[bytes]): The content.
+    """
+    if not isinstance(getattr(request, "_request", request), ASGIRequest):
+        return chunks
+    return _aiterate(iter(chunks))
+
+
+async def _aiterate(iterator):
+    get_next = sync_to_async(next)
+    try:
+        while (chunk := await get_next(iterator, None)) is not None:
+            yield chunk
+    finally:
+        if hasattr(iterator, "close"):
+            await sync_to_async(iterator.close)()
+
+
+class PrefetchQuerysetMixin:
+    """
+    Mixin for viewsets that builds read querysets from the serializer's declared fields.
+    Nested serializers are prefetched or joined, so the number of queries for a list
+    response stays the same no matter how many rows are returned.
+    """
+
+    optimized_actions = ("list", "retrieve")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.optimized_actions:
+            queryset = optimize_queryset_for_serializer(
+                queryset, self.get_serializer_class()
+            )
+        return queryset
+
+
+class RowListMixin:
+    """
+    Mixin for read-mostly viewsets whose JSON list responses are serialized from
+    ``values()`` rows by a ``RowSerializer`` and rendered with ``render_json()``,
+    without building model instances or going through DRF's fields. Responses are
+    byte for byte the ones the serializer and ``JSONRenderer`` give.
+
+    Other actions, renderers and indented JSON go through the serializer.
+    """
+
+    row_actions = ("list",)
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if (
+            self.action not in self.row_actions
+            or type(renderer) is not JSONRenderer
+            or renderer.get_indent(
+                request.accepted_media_type, self.get_renderer_context()
+            )
+            is not None
+        ):
+            return super().list(request, *args, **kwargs)
+
+        row_serializer = RowSerializer(
+            self.get_serializer_class(), context=self.get_serializer_context()
+        )
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.prefetch_related(None).values(*row_serializer.columns)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            data = self.get_paginated_response(
+                row_serializer.to_representation(page)
+            ).data
+        else:
+            data = row_serializer.to_representation(queryset)
+        return RenderedResponse(data, render_json(data, exact=row_serializer.exact))
+
+
+class RenderedResponse(Response):
+    """A response whose JSON content was rendered ahead, keeping its data."""
+
+    def __init__(self, data, content, **kwargs):
+        super().__init__(data, **kwargs)
+        self.json_content = content
+
+    @property
+    def rendered_content(self):
+        self["Content-Type"] = self.accepted_renderer.media_type
+        return self.json_content
+
+
+class PrevalidatedSaveMixin:
+    """
+    Mixin for model viewsets that saves without repeating the database checks the
+    serializer already ran, see ``utils.mixins.prevalidated``.
+    """
+
+    def perform_create(self, serializer):
+        with prevalidated():
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        with prevalidated():
+            super().perform_update(serializer)
+
+
+class CatalogCacheMixin:
+    """
+    Mixin for read-mostly viewsets that caches rendered JSON responses.
+    Cache keys include the model's catalog version, which is bumped by the signals
+    from ``register_catalog_version_signals``, so edits never serve stale data.
+    """
+
+    cached_actions = ("list", "retrieve")
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if (
+            self.action not in self.cached_actions
+            or request.accepted_renderer.format != "json"
+        ):
+            return handler(request, *args, **kwargs)
+
+        key = get_catalog_cache_key(self.queryset.model, request)
+        cached = cache.get(key)
+        if cached is not None:
+            record_catalog_cache_event("hits")
+            content_type, content = cached
+            response = HttpResponse(content, content_type=content_type)
+            response["X-Cache"] = "HIT"
+            return response
+
+        record_catalog_cache_event("misses")
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            # Render now so the bytes can be stored, finalize_response won't render again
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            cache.set(
+                key,
+                (response["Content-Type"], response.content),
+                settings.CATALOG_CACHE_TIMEOUT,
+            )
+        response["X-Cache"] = "MISS"
+        return response
+
+
+class CatalogCacheStatsView(APIView):
+    """Report the catalog response cache hit and miss counters."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_catalog_cache_stats())
+
+
+class ConditionalGetMixin:
+    """
+    Mixin for viewsets over timestamped models that answers conditional GETs.
+
+    The ETag header is derived from ``MAX(modified)`` and the row count of the
+    requested rows (and of any nested relations listed in ``conditional_relations``)
+    in a single aggregate query, so unchanged data is answered with 304 before
+    anything is serialized.
+
+    Last-Modified is only sent for a single object without nested relations. Deleting
+    a row doesn't move ``MAX(modified)`` of the rows left, so lists and nested
+    relations are only validated by the ETag, whose count does change.
+    """
+
+    conditional_actions = ("list", "retrieve")
+    conditional_relations = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def get_conditional_state(self, request, *args, **kwargs):
+        """
+        Aggregate the row count and latest modification time of the requested rows.
+
+        Returns:
+            dict: The aggregated counts and ``modified`` maxima.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        if self.action == "retrieve":
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+
+        aggregates = {
+            "count": Count("pk", distinct=bool(self.conditional_relations)),
+            "modified": Max("modified"),
+        }
+        for relation in self.conditional_relations:
+            aggregates[f"{relation}_count"] = Count(relation, distinct=True)
+            aggregates[f"{relation}_modified"] = Max(f"{relation}__modified")
+        return queryset.aggregate(**aggregates)
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        if self.action not in self.conditional_actions:
+            return handler(request, *args, **kwargs)
+
+        state = self.get_conditional_state(request, *args, **kwargs)
+        if not state["count"]:
+            return handler(request, *args, **kwargs)
+
+        timestamps = [
+            value
+            for key, value in state.items()
+            if key.endswith("modified") and value is not None
+        ]
+        last_modified = (
+            int(max(timestamps).timestamp())
+            if timestamps
+            and self.action == "retrieve"
+            and not self.conditional_relations
+            else None
+        )
+        raw_etag = "|".join(
+            [
+                self.queryset.model._meta.label_lower,
+                request.accepted_renderer.format,
+                request.get_full_path(),
+                repr(sorted(state.items())),
+            ]
+        )
+        etag = quote_etag(hashlib.md5(raw_etag.encode()).hexdigest())
+
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+
+class AsyncReadOnlyView(View):
+    """
+    Async list and retrieve endpoints of a model, for serving under ASGI.
+
+    Responses have the same JSON as the ``list`` and ``retrieve`` actions of a viewset
+    with the same serializer, filters and pagination, but rows are read with the async
+    ORM, so a request waiting on the database doesn't hold a thread. Columns and joins
+    come from the serializer as in ``PrefetchQuerysetMixin``, and the prefetched
+    relations are fetched concurrently, see ``prefetch_concurrently()``.
+
+    Requests are authenticated, permitted and throttled with the same classes as the
+    viewsets, so they count towards the same throttle rates.
+
+    Responses aren't cached and don't answer conditional GETs, the viewsets do that.
+    """
+
+    queryset = None
+    serializer_class = None
+    filter_fields = ()
+    filter_backends = api_settings.DEFAULT_FILTER_BACKENDS
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    http_method_names = ["get", "head", "options"]
+
+    async def get(self, request, pk=None):
+        request = Request(
+            request,
+            authenticators=[auth() for auth in self.authentication_classes],
+        )
+        headers = {}
+        try:
+            # Authenticators and throttles read the database and the cache
+            await sync_to_async(self.check_request)(request)
+            if pk is None:
+                data = await self.list(request)
+            else:
+                data = await self.retrieve(request, pk)
+            status = 200
+        except Exception as exc:
+            if isinstance(
+                exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+            ):
+                # As in APIView.handle_exception(), 401 needs a challenge or is a 403
+                authenticate_header = (
+                    request.authenticators[0].authenticate_header(request)
+                    if request.authenticators
+                    else None
+                )
+                if authenticate_header:
+                    exc.auth_header = authenticate_header
+                else:
+                    exc.status_code = 403
+            response = exception_handler(exc, {"view": self, "request": request})
+            if response is None:
+                raise
+            data, status = response.data, response.status_code
+            # Like Retry-After and WWW-Authenticate
+            headers = {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() != "content-type"
+            }
+        return HttpResponse(
+            JSONRenderer().render(data),
+            content_type=JSONRenderer.media_type,
+            status=status,
+            headers=headers,
+        )
+
+    def check_request(self, request):
+        """
+        Authenticate the request and check its permissions and throttles, as
+        ``APIView.initial()`` does for the viewsets.
+
+        Raises:
+            NotAuthenticated: If a permission needs a user and none was authenticated.
+            PermissionDenied: If a permission refuses the request.
+            Throttled: If a throttle's rate is exceeded.
+        """
+        request.user
+        for permission in [permission() for permission in self.permission_classes]:
+            if not permission.has_permission(request, self):
+                if request.authenticators and not request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, "message", None))
+
+        durations = [
+            throttle.wait()
+            for throttle in [throttle() for throttle in self.throttle_classes]
+            if not throttle.allow_request(request, self)
+        ]
+        if durations:
+            durations = [duration for duration in durations if duration is not None]
+            raise exceptions.Throttled(max(durations, default=None))
+
+    def get_queryset_and_prefetches(self, request):
+        """
+        Build the filtered queryset of the request, and the lookups to prefetch on
+        its rows.
+        """
+        columns, select_related, prefetches = get_serializer_query_plan(
+            self.serializer_class()
+        )
+        queryset = self.queryset.only(*columns)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(request, queryset, self)
+        return queryset, prefetches
+
+    def get_serializer(self, request, *args, **kwargs):
+        context = {"request": request, "format": None, "view": self}
+        return self.serializer_class(*args, context=context, **kwargs)
+
+    async def list(self, request):
+        queryset, prefetches = self.get_queryset_and_prefetches(request)
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request, view=self)
+        await prefetch_concurrently(page, prefetches)
+        serializer = self.get_serializer(request, page, many=True)
+        return paginator.get_paginated_response(serializer.data).data
+
+    async def retrieve(self, request, pk):
+        queryset, prefetches = self.get_queryset_and_prefetches(request)
+        try:
+            instance = await queryset.aget(pk=pk)
+        except ObjectDoesNotExist:
+            raise Http404(
+                f"No {queryset.model._meta.object_name} matches the given query."
+            )
+        await prefetch_concurrently([instance], prefetches)
+        return self.get_serializer(request, instance).data